@@ -1,3 +1,15 @@
 FORMAT_DATE = "%d.%m.%Y"
 FORMAT_TIME = "{:02}:{:02}"
 FORMAT_DATETIME = "%d.%m.%Y - %H:%M"
+
+ROUTE_FORMAT_POINTS = "points"
+ROUTE_FORMAT_POLYLINE = "polyline"
+ROUTE_FORMAT_NONE = "none"
+ROUTE_FORMATS = (ROUTE_FORMAT_POINTS, ROUTE_FORMAT_POLYLINE, ROUTE_FORMAT_NONE)
+
+# Режимы ROUTE_METRICS_MODE: показатели тренировки по маршруту не считаются,
+# заполняются вместо присланных клиентом или сверяются с присланными.
+ROUTE_METRICS_OFF = "off"
+ROUTE_METRICS_FILL = "fill"
+ROUTE_METRICS_VALIDATE = "validate"
+ROUTE_METRICS_FIELDS = ("distance", "max_speed", "avg_speed", "height_difference")
@@ -1,29 +1,217 @@
 import base64
+import binascii
 import datetime
+from io import BytesIO
 
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile, UploadedFile
 from rest_framework import serializers
 
+from utils.media_urls import get_url_builder
+from utils.route_analytics import analyze_route
+from utils.routes import Route
+
+from .constants import ROUTE_FORMAT_NONE, ROUTE_FORMAT_POINTS, ROUTE_FORMAT_POLYLINE, ROUTE_METRICS_OFF
+
+# Размер порции base64 в символах, кратен 4 для декодирования без остатка.
+BASE64_CHUNK_SIZE = 64 * 1024
+
+IMAGE_SIGNATURES = (
+	(b"\x89PNG\r\n\x1a\n", "png"),
+	(b"\xff\xd8\xff", "jpeg"),
+	(b"GIF87a", "gif"),
+	(b"GIF89a", "gif"),
+)
+
+
+def sniff_image_format(header: bytes) -> str | None:
+	"""Определяет формат изображения по сигнатуре в начале файла."""
+	for signature, image_format in IMAGE_SIGNATURES:
+		if header.startswith(signature):
+			return image_format
+	if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+		return "webp"
+	return None
+
+
+def get_decoded_size(encoded: str) -> int:
+	"""Оценивает сверху размер данных после декодирования base64, не декодируя их."""
+	return (len(encoded) + 3) // 4 * 3 - encoded[-2:].count("=")
+
+
+def iter_base64_chunks(encoded: str):
+	"""Декодирует base64 порциями, пропуская пробельные символы между ними."""
+	tail = ""
+	for start in range(0, len(encoded), BASE64_CHUNK_SIZE):
+		chunk = tail + "".join(encoded[start : start + BASE64_CHUNK_SIZE].split())
+		cut = len(chunk) - len(chunk) % 4
+		tail = chunk[cut:]
+		if cut:
+			yield base64.b64decode(chunk[:cut], validate=True)
+	if tail:
+		raise binascii.Error("Incorrect padding")
+
 
 class Base64ImageField(serializers.ImageField):
 	"""Класс для сериализации изображения и десериализации URI."""
 
+	default_error_messages = {
+		"max_size": "Размер изображения не должен превышать {max_size} байт.",
+	}
+
 	def to_internal_value(self, data):
 		"""Декодирование base64 в файл."""
 		if isinstance(data, str) and data.startswith("data:image"):
-			format, imgstr = data.split(";base64,")
-			ext = format.split("/")[-1]
-			data = ContentFile(
-				base64.b64decode(imgstr),
-				name=str(datetime.datetime.now().timestamp()) + "." + ext,
-			)
-		return super().to_internal_value(data)
+			data = self._decode(data)
+		elif isinstance(data, UploadedFile):
+			self._check_upload(data)
+		else:
+			return super().to_internal_value(data)
+		try:
+			return super().to_internal_value(data)
+		except serializers.ValidationError:
+			data.close()
+			raise
+
+	def _check_upload(self, data: UploadedFile) -> None:
+		"""
+		Проверяет файл из multipart-запроса, уже сохранённый обработчиками загрузки,
+		и именует его так же, как декодированный из base64.
+		"""
+		if data.size > settings.MAX_UPLOAD_IMAGE_SIZE:
+			self.fail("max_size", max_size=settings.MAX_UPLOAD_IMAGE_SIZE)
+		image_format = sniff_image_format(data.read(16))
+		data.seek(0)
+		if image_format is None:
+			self.fail("invalid_image")
+		data.name = f"{datetime.datetime.now().timestamp()}.{image_format}"
+
+	def _decode(self, data: str) -> UploadedFile:
+		"""
+		Потоково декодирует data URI во временный файл.
+		Размер проверяется до выделения памяти, сигнатура - по первой порции.
+		Небольшие файлы остаются в памяти, крупные пишутся на диск,
+		откуда Pillow читает их по пути без копирования.
+		"""
+		try:
+			_, imgstr = data.split(";base64,")
+		except ValueError:
+			self.fail("invalid_image")
+		size = get_decoded_size(imgstr)
+		if size > settings.MAX_UPLOAD_IMAGE_SIZE:
+			self.fail("max_size", max_size=settings.MAX_UPLOAD_IMAGE_SIZE)
+		name = str(datetime.datetime.now().timestamp())
+		if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+			file = TemporaryUploadedFile(name, None, 0, None)
+		else:
+			file = InMemoryUploadedFile(BytesIO(), None, name, None, 0, None)
+		try:
+			for chunk in iter_base64_chunks(imgstr):
+				if file.size == 0:
+					image_format = sniff_image_format(chunk)
+					if image_format is None:
+						self.fail("invalid_image")
+					file.name = f"{name}.{image_format}"
+					file.content_type = f"image/{image_format}"
+				file.write(chunk)
+				file.size += len(chunk)
+			if file.size == 0:
+				self.fail("invalid_image")
+		except binascii.Error:
+			file.close()
+			self.fail("invalid_image")
+		except serializers.ValidationError:
+			file.close()
+			raise
+		file.seek(0)
+		return file
 
 	def to_representation(self, value):
 		"""Возвращает полный url изображения."""
 		if value:
-			uri = self.context["request"].build_absolute_uri(
-				f"{settings.MEDIA_URL}{value}" if isinstance(value, str) else value.url
-			)
-			return uri
+			builder = get_url_builder(self.context["request"])
+			if isinstance(value, str):
+				return builder.build(default_storage, value)
+			return builder.build(value.storage, value.name)
+
+
+class RenditionURLField(serializers.Field):
+	"""Полный url уменьшенной копии изображения. None, пока копия не построена."""
+
+	def __init__(self, rendition: str, **kwargs) -> None:
+		kwargs["read_only"] = True
+		super().__init__(**kwargs)
+		self.rendition = rendition
+
+	def to_representation(self, value: dict[str, str]) -> str | None:
+		name = value.get(self.rendition)
+		if name:
+			return get_url_builder(self.context["request"]).build(default_storage, name)
+		return None
+
+
+def represent_route(route_json, route_polyline: str | None, route_format: str, tolerance: float):
+	"""
+	Отдаёт маршрут в виде route_format, упрощённый с допуском tolerance.
+	Список точек без упрощения отдаётся из route_json, если там сохранён присланный маршрут.
+	"""
+	if route_polyline is None:
+		return route_json
+	if route_json is not None and route_format == ROUTE_FORMAT_POINTS and not tolerance:
+		return route_json
+	if route_format == ROUTE_FORMAT_POLYLINE and not tolerance:
+		route, polyline = Route.decode_header(route_polyline)
+		return polyline_representation(route, polyline)
+	route = Route.decode(route_polyline).simplify(tolerance)
+	if route_format == ROUTE_FORMAT_POLYLINE:
+		return polyline_representation(route, route.encode_polyline())
+	return route.to_json()
+
+
+def polyline_representation(route: Route, polyline: str) -> dict:
+	"""Поля, их точности (0 - целые) и полилиния маршрута."""
+	precisions = [precision or 0 for precision in route.precisions]
+	return {"fields": list(route.fields), "precisions": precisions, "polyline": polyline}
+
+
+class RouteField(serializers.JSONField):
+	"""
+	Маршрут тренировки. Распознанный список точек сохраняется полилинией
+	в route_polyline, прочие данные - как есть в route. Если полилиния
+	не восстанавливает точки без потерь, присланный маршрут сохраняется и в route.
+	При включённом ROUTE_METRICS_MODE показатели маршрута
+	передаются сериализатору в route_metrics.
+	Вид ответа задают route_format и route_tolerance из контекста сериализатора,
+	упрощение маршрута выполняется только при чтении.
+	"""
+
+	def __init__(self, **kwargs) -> None:
+		kwargs["source"] = "*"
+		super().__init__(**kwargs)
+
+	def validate_empty_values(self, data):
+		is_empty, data = super().validate_empty_values(data)
+		if is_empty and data is None:
+			return True, {"route": None, "route_polyline": None}
+		return is_empty, data
+
+	def to_internal_value(self, data) -> dict:
+		data = super().to_internal_value(data)
+		route = Route.from_json(data)
+		if route is None:
+			return {"route": data, "route_polyline": None}
+		value = {}
+		if settings.ROUTE_METRICS_MODE != ROUTE_METRICS_OFF:
+			value["route_metrics"] = analyze_route(route)
+		value["route_polyline"] = route.encode()
+		value["route"] = None if route.is_lossless() else data
+		return value
+
+	def to_representation(self, instance):
+		route_format = self.context.get("route_format", ROUTE_FORMAT_POINTS)
+		if route_format == ROUTE_FORMAT_NONE:
+			return None
+		return represent_route(
+			instance.route, instance.route_polyline, route_format, self.context.get("route_tolerance", 0)
+		)
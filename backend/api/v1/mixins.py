@@ -0,0 +1,87 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import QuerySet
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .read_serializers import ReadSerializer
+
+
+class ReadOptimizedListMixin:
+	"""
+	Отдаёт список через read_serializer_class вместо serializer_class,
+	если включена настройка READ_OPTIMIZED_SERIALIZERS.
+	"""
+
+	read_serializer_class: type[ReadSerializer]
+
+	def list(self, request: Request, *args, **kwargs) -> Response:
+		if not settings.READ_OPTIMIZED_SERIALIZERS:
+			return super().list(request, *args, **kwargs)
+		serializer = self.read_serializer_class(context=self.get_serializer_context())
+		queryset = serializer.prepare(self.filter_queryset(self.get_queryset()))
+		page = self.paginate_queryset(queryset)
+		if page is not None:
+			return self.get_paginated_response(serializer.serialize(page))
+		return Response(serializer.serialize(queryset))
+
+
+class AsyncAPIViewMixin:
+	"""
+	Асинхронный dispatch для APIView при запуске через config.asgi.
+	Обработчик метода ищется как a<метод> (aget) и выполняется в цикле событий,
+	без него синхронный обработчик выполняется в потоке запроса через sync_to_async.
+	Аутентификация, права и тротлинг (initial) читают БД синхронно и тоже выполняются в потоке.
+	"""
+
+	view_is_async = True
+
+	async def dispatch(self, request, *args, **kwargs) -> Response:
+		self.args = args
+		self.kwargs = kwargs
+		request = self.initialize_request(request, *args, **kwargs)
+		self.request = request
+		self.headers = self.default_response_headers
+		try:
+			await sync_to_async(self.initial)(request, *args, **kwargs)
+			handler = self.get_async_handler(request.method.lower())
+			response = await handler(request, *args, **kwargs)
+		except Exception as exc:
+			response = self.handle_exception(exc)
+		self.response = self.finalize_response(request, response, *args, **kwargs)
+		return self.response
+
+	def get_async_handler(self, method: str):
+		"""Отдаёт асинхронный обработчик метода, синхронный оборачивается в sync_to_async."""
+		if method not in self.http_method_names:
+			return sync_to_async(self.http_method_not_allowed)
+		handler = getattr(self, f"a{method}", None)
+		if handler is not None:
+			return handler
+		return sync_to_async(getattr(self, method, self.http_method_not_allowed))
+
+
+class AsyncReadOptimizedListMixin(AsyncAPIViewMixin, ReadOptimizedListMixin):
+	"""
+	Асинхронный GET списка через read_serializer_class. Строки читаются асинхронным ORM
+	из aget_queryset, сериализация с построением url файлов выполняется в потоке.
+	Страницы курсора собираются в потоке, так как CursorPagination читает queryset синхронно.
+	"""
+
+	async def aget(self, request: Request, *args, **kwargs) -> Response:
+		if not settings.READ_OPTIMIZED_SERIALIZERS:
+			return await sync_to_async(self.list)(request, *args, **kwargs)
+		serializer = self.read_serializer_class(context=self.get_serializer_context())
+		queryset = serializer.prepare(self.filter_queryset(await self.aget_queryset()))
+		page = None
+		if self.paginator is not None:
+			page = await sync_to_async(self.paginate_queryset)(queryset)
+		if page is not None:
+			return self.get_paginated_response(await sync_to_async(serializer.serialize)(page))
+		if isinstance(queryset, QuerySet):
+			queryset = [row async for row in queryset]
+		return Response(await sync_to_async(serializer.serialize)(queryset))
+
+	async def aget_queryset(self) -> QuerySet | list[dict]:
+		"""По умолчанию ленивый queryset из get_queryset, строки читаются в aget."""
+		return self.get_queryset()
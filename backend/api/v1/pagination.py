@@ -0,0 +1,21 @@
+from rest_framework.pagination import CursorPagination
+
+
+class HistoryCursorPagination(CursorPagination):
+	"""
+	Постраничная выдача истории по курсору (training_day, id).
+	Включается параметром limit или cursor, без них история отдаётся целиком.
+	"""
+
+	ordering = ("training_day_id", "id")
+	page_size = 20
+	page_size_query_param = "limit"
+	max_page_size = 100
+
+	def paginate_queryset(self, queryset, request, view=None):
+		if (
+			self.cursor_query_param not in request.query_params
+			and self.page_size_query_param not in request.query_params
+		):
+			return None
+		return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,22 @@
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer, orjson
+
+
+class ORJSONParser(JSONParser):
+	"""JSONParser на orjson. Без orjson или для тел не в UTF-8 разбирает стандартным json."""
+
+	renderer_class = ORJSONRenderer
+
+	def parse(self, stream, media_type=None, parser_context=None):
+		encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+		if orjson is None or codecs.lookup(encoding).name != "utf-8":
+			return super().parse(stream, media_type, parser_context)
+		try:
+			return orjson.loads(stream.read())
+		except orjson.JSONDecodeError as exc:
+			raise ParseError(f"JSON parse error - {exc}")
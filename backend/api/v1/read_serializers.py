@@ -0,0 +1,135 @@
+from operator import itemgetter
+from typing import Any, Callable, Iterable
+
+from django.db.models import QuerySet
+from rest_framework import serializers
+
+from running.models import Achievement, History
+from utils.localization import get_localizer
+from utils.media_urls import get_url_builder
+
+from .constants import FORMAT_DATE, FORMAT_DATETIME, FORMAT_TIME, ROUTE_FORMAT_NONE, ROUTE_FORMAT_POINTS
+from .fields import represent_route
+from .serializers import AchievementSerializer, HistorySerializer, TrainingSerializer
+
+Converter = Callable[[dict], Any]
+
+
+class ReadSerializer:
+	"""
+	Сериализатор списков только для чтения. Строит словари ответа из строк values()
+	преобразователями полей, подготовленными один раз на запрос.
+	Состав и порядок полей берутся из serializer_class, вывод совпадает с ним.
+	Поля, которые приходят из БД в готовом виде, копируются как есть,
+	для остальных нужен метод get_<поле>_converter.
+	"""
+
+	serializer_class: type[serializers.Serializer]
+
+	def __init__(self, context: dict) -> None:
+		self.context = context
+		self.serializer = self.serializer_class(context=context)
+		self.readable_fields = {name: field for name, field in self.serializer.fields.items() if not field.write_only}
+		self.converters = tuple((name, self.get_converter(name)) for name in self.readable_fields)
+
+	def get_converter(self, name: str) -> Converter:
+		factory = getattr(self, f"get_{name}_converter", None)
+		return factory() if factory else itemgetter(name)
+
+	def get_columns(self) -> set[str]:
+		"""Отдаёт колонки values(), нужные преобразователям."""
+		return {field.source for field in self.readable_fields.values()}
+
+	def prepare(self, queryset: QuerySet | list[dict]) -> QuerySet | list[dict]:
+		"""Переводит queryset на строки values() с нужными колонками."""
+		if isinstance(queryset, QuerySet):
+			return queryset.values(*self.get_columns())
+		return queryset
+
+	def serialize(self, rows: Iterable[dict]) -> list[dict]:
+		converters = self.converters
+		return [{name: convert(row) for name, convert in converters} for row in rows]
+
+	def get_url_converter(self, column: str, model, field_name: str, rendition: str | None = None) -> Converter:
+		"""Собирает url файла или его уменьшенной копии из имени в колонке."""
+		builder = get_url_builder(self.context["request"])
+		storage = model._meta.get_field(field_name).storage
+
+		def convert(row: dict) -> str | None:
+			name = row[column]
+			if rendition is not None and name:
+				name = name.get(rendition)
+			return builder.build(storage, name) if name else None
+
+		return convert
+
+
+class TrainingReadSerializer(ReadSerializer):
+	"""Быстрый вывод TrainingSerializer из словарей плана тренировок."""
+
+	serializer_class = TrainingSerializer
+
+
+class AchievementReadSerializer(ReadSerializer):
+	"""Быстрый вывод AchievementSerializer."""
+
+	serializer_class = AchievementSerializer
+
+	def get_icon_converter(self) -> Converter:
+		return self.get_url_converter("icon", Achievement, "icon")
+
+	def get_icon_thumbnail_converter(self) -> Converter:
+		return self.get_url_converter("icon_renditions", Achievement, "icon", "thumbnail")
+
+	def get_icon_detail_converter(self) -> Converter:
+		return self.get_url_converter("icon_renditions", Achievement, "icon", "detail")
+
+	def get_achievement_date_converter(self) -> Converter:
+		localizer = get_localizer(self.context["request"])
+
+		def convert(row: dict) -> str | None:
+			achievement_date = row["achievement_date"]
+			return achievement_date and localizer.format(achievement_date, FORMAT_DATE)
+
+		return convert
+
+
+class HistoryReadSerializer(ReadSerializer):
+	"""Быстрый вывод HistorySerializer с учётом fields и вида маршрута из контекста."""
+
+	serializer_class = HistorySerializer
+
+	def get_columns(self) -> set[str]:
+		# Колонки курсора постраничной выдачи.
+		return self.serializer.get_columns() | {"training_day_id", "id"}
+
+	def get_training_start_converter(self) -> Converter:
+		localizer = get_localizer(self.context["request"])
+
+		def convert(row: dict) -> list[str]:
+			return localizer.format_pair(row["training_start"], FORMAT_DATE, FORMAT_DATETIME)
+
+		return convert
+
+	def get_image_converter(self) -> Converter:
+		return self.get_url_converter("image", History, "image")
+
+	def get_image_thumbnail_converter(self) -> Converter:
+		return self.get_url_converter("image_renditions", History, "image", "thumbnail")
+
+	def get_image_detail_converter(self) -> Converter:
+		return self.get_url_converter("image_renditions", History, "image", "detail")
+
+	def get_route_converter(self) -> Converter:
+		route_format = self.context.get("route_format", ROUTE_FORMAT_POINTS)
+		tolerance = self.context.get("route_tolerance", 0)
+		if route_format == ROUTE_FORMAT_NONE:
+			return lambda row: None
+		return lambda row: represent_route(row["route"], row["route_polyline"], route_format, tolerance)
+
+	def get_time_converter(self) -> Converter:
+		def convert(row: dict) -> str:
+			seconds = (row["training_end"] - row["training_start"]).total_seconds()
+			return FORMAT_TIME.format(int(seconds // 60), int(seconds % 60))
+
+		return convert
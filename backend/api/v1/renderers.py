@@ -0,0 +1,39 @@
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+# Разделители строк, которые JSONRenderer экранирует для совместимости с JavaScript.
+LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+
+class ORJSONRenderer(JSONRenderer):
+	"""
+	JSONRenderer на orjson, включается настройкой ORJSON_RENDERING. Без orjson, с отступами
+	или с COMPACT_JSON/UNICODE_JSON, которые orjson не поддерживает, рендерит стандартным json.
+	Даты, Decimal и прочие типы вне JSON кодируются так же, как JSONEncoder DRF.
+	В отличие от JSONRenderer NaN и бесконечность выводятся как null, а не ошибкой,
+	float пишутся короче (1e16 вместо 1e+16), ключи не-строки приводятся к строкам.
+	"""
+
+	options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+	def render(self, data, accepted_media_type=None, renderer_context=None):
+		if orjson is None or self.ensure_ascii or not self.compact:
+			return super().render(data, accepted_media_type, renderer_context)
+		if data is None:
+			return b""
+		if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+			return super().render(data, accepted_media_type, renderer_context)
+		try:
+			ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+		except orjson.JSONEncodeError:
+			# Целые вне 64 бит и прочие значения, которые orjson не кодирует.
+			return super().render(data, accepted_media_type, renderer_context)
+		for separator, escaped in LINE_SEPARATORS:
+			if separator in ret:
+				ret = ret.replace(separator, escaped)
+		return ret
@@ -2,20 +2,36 @@ from collections import OrderedDict
 from datetime import datetime
 
 import pytz
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from running.models import Achievement, Day, History, MotivationalPhrase
+from running.models import Achievement, Day, History
 from users.constants import GENDER_CHOICES, MAX_LEN_NAME
 from users.models import User as ClassUser
+from utils.achievements import get_achievement_catalog
 from utils.authcode import AuthCode
+from utils.localization import get_localizer, get_timezone
+from utils.motivation_phrase import get_phrase_set
+from utils.route_analytics import RouteMetrics
 from utils.users import get_user_by_email_or_404
 from utils.amount_skips import counts_missed_days
 
-from .constants import FORMAT_DATE, FORMAT_DATETIME, FORMAT_TIME
-from .fields import Base64ImageField
+from .constants import (
+	FORMAT_DATE,
+	FORMAT_DATETIME,
+	FORMAT_TIME,
+	ROUTE_FORMAT_NONE,
+	ROUTE_FORMAT_POINTS,
+	ROUTE_FORMATS,
+	ROUTE_METRICS_FIELDS,
+	ROUTE_METRICS_FILL,
+	ROUTE_METRICS_VALIDATE,
+)
+from .fields import Base64ImageField, RenditionURLField, RouteField
 from .validators import CustomUniqueValidator
 
 User = get_user_model()
@@ -61,6 +77,8 @@ class MeSerializer(serializers.ModelSerializer):
 	date_last_skips = serializers.DateTimeField(required=False)
 	amount_of_skips = serializers.IntegerField(required=False)
 	avatar = Base64ImageField(allow_null=True, required=False)
+	avatar_thumbnail = RenditionURLField("thumbnail", source="avatar_renditions")
+	avatar_detail = RenditionURLField("detail", source="avatar_renditions")
 
 	class Meta:
 		model = User
@@ -75,14 +93,16 @@ class MeSerializer(serializers.ModelSerializer):
 			"date_last_skips",
 			"amount_of_skips",
 			"avatar",
+			"avatar_thumbnail",
+			"avatar_detail",
 		)
 
 	def to_representation(self, instance: ClassUser) -> dict:
 		representation = super().to_representation(instance)
 		date_last_skips = instance.date_last_skips
 		if date_last_skips:
-			user_timezone = pytz.timezone(self.context["request"].user.timezone)
-			representation["date_last_skips"] = date_last_skips.astimezone(user_timezone).strftime(FORMAT_DATE)
+			localizer = get_localizer(self.context["request"])
+			representation["date_last_skips"] = localizer.format(date_last_skips, FORMAT_DATE)
 		return representation
 
 	def validate(self, data: OrderedDict) -> OrderedDict:
@@ -106,7 +126,7 @@ class MeSerializer(serializers.ModelSerializer):
 	def validate_date_last_skips(self, value: datetime) -> datetime:
 		user: ClassUser = self.context["request"].user
 		date_last_skips = user.date_last_skips
-		user_timezone = pytz.timezone(user.timezone)
+		user_timezone = get_timezone(user.timezone)
 		localdate = timezone.localdate(timezone=user_timezone)
 		user_timezone_value = value.astimezone(user_timezone).date()
 		if localdate != user_timezone_value:
@@ -139,7 +159,12 @@ class MeSerializer(serializers.ModelSerializer):
 				gender = self.context["request"].user.gender
 			validated_data["avatar"] = "avatars/women.png" if gender == "F" else "avatars/men.png"
 
-		return super().update(instance, validated_data)
+		# Сохраняются только переданные поля: объект пользователя загружен до запроса
+		# и не должен затирать путь к аватару, подменённый задачей выгрузки.
+		for attr, value in validated_data.items():
+			setattr(instance, attr, value)
+		instance.save(update_fields=validated_data.keys())
+		return instance
 
 
 class CustomTokenObtainSerializer(serializers.Serializer):
@@ -186,12 +211,16 @@ class AchievementSerializer(serializers.ModelSerializer):
 	achievement_date = serializers.DateTimeField(format=FORMAT_DATE)
 	received = serializers.BooleanField()
 	icon = Base64ImageField()
+	icon_thumbnail = RenditionURLField("thumbnail", source="icon_renditions")
+	icon_detail = RenditionURLField("detail", source="icon_renditions")
 
 	class Meta:
 		model = Achievement
 		fields = (
 			"id",
 			"icon",
+			"icon_thumbnail",
+			"icon_detail",
 			"title",
 			"description",
 			"reward_points",
@@ -199,12 +228,12 @@ class AchievementSerializer(serializers.ModelSerializer):
 			"received",
 		)
 
-	def to_representation(self, instance: Achievement) -> dict:
+	def to_representation(self, instance: Achievement | dict) -> dict:
 		representation = super().to_representation(instance)
-		achievement_date = instance.achievement_date
+		achievement_date = self.fields["achievement_date"].get_attribute(instance)
 		if achievement_date:
-			user_timezone = pytz.timezone(self.context["request"].user.timezone)
-			representation["achievement_date"] = achievement_date.astimezone(user_timezone).strftime(FORMAT_DATE)
+			localizer = get_localizer(self.context["request"])
+			representation["achievement_date"] = localizer.format(achievement_date, FORMAT_DATE)
 		return representation
 
 
@@ -221,13 +250,35 @@ class AchievementEndTrainingSerializer(serializers.ModelSerializer):
 		)
 
 
+class HistoryQuerySerializer(serializers.Serializer):
+	"""Параметры запроса истории тренировок."""
+
+	route_format = serializers.ChoiceField(choices=ROUTE_FORMATS, default=ROUTE_FORMAT_POINTS)
+	route_tolerance = serializers.FloatField(min_value=0, default=0)
+	fields = serializers.CharField(required=False, help_text="Поля ответа через запятую, по умолчанию все.")
+
+	def validate_fields(self, value: str) -> tuple[str, ...]:
+		fields = tuple(field for field in value.split(",") if field)
+		readable = {name for name, field in HistorySerializer().fields.items() if not field.write_only}
+		unknown = [field for field in fields if field not in readable]
+		if unknown:
+			raise serializers.ValidationError(f"Неизвестные поля: {', '.join(unknown)}.")
+		return fields
+
+
 class HistorySerializer(serializers.ModelSerializer):
 	"""Сериализатор историй тренировок."""
 
 	image = Base64ImageField(required=False)
+	image_thumbnail = RenditionURLField("thumbnail", source="image_renditions")
+	image_detail = RenditionURLField("detail", source="image_renditions")
+	route = RouteField(required=False, allow_null=True)
 	time = serializers.SerializerMethodField(read_only=True)
 	achievements = serializers.ListField(required=False, write_only=True, child=serializers.IntegerField())
 
+	# Колонки модели для полей, читающих весь объект.
+	source_columns = {"route": ("route", "route_polyline"), "time": ("training_start", "training_end")}
+
 	class Meta:
 		model = History
 		fields = (
@@ -235,6 +286,8 @@ class HistorySerializer(serializers.ModelSerializer):
 			"training_end",
 			"training_day",
 			"image",
+			"image_thumbnail",
+			"image_detail",
 			"motivation_phrase",
 			"cities",
 			"route",
@@ -252,18 +305,39 @@ class HistorySerializer(serializers.ModelSerializer):
 			"max_speed": {"write_only": True, "min_value": 0},
 			"distance": {"min_value": 0},
 			"avg_speed": {"min_value": 0},
-			"route": {"required": False},
 		}
 
+	def __init__(self, *args, **kwargs) -> None:
+		"""Оставляет для чтения только поля из fields контекста, если они заданы."""
+		super().__init__(*args, **kwargs)
+		selected = self.context.get("fields")
+		if selected:
+			for name in [name for name, field in self.fields.items() if not field.write_only and name not in selected]:
+				del self.fields[name]
+
+	def get_extra_kwargs(self) -> dict:
+		"""Делает показатели тренировки необязательными, если они вычисляются по маршруту."""
+		extra_kwargs = super().get_extra_kwargs()
+		if settings.ROUTE_METRICS_MODE == ROUTE_METRICS_FILL:
+			for field in ROUTE_METRICS_FIELDS:
+				extra_kwargs[field] = {**extra_kwargs.get(field, {}), "required": False}
+		return extra_kwargs
+
+	def get_columns(self) -> set[str]:
+		"""Отдаёт колонки модели, нужные для вывода выбранных полей."""
+		columns = set()
+		for name, field in self.fields.items():
+			if field.write_only or name == "route" and self.context.get("route_format") == ROUTE_FORMAT_NONE:
+				continue
+			columns.update(self.source_columns.get(name, (field.source,)))
+		return columns
+
 	def to_representation(self, instance: History) -> dict:
 		representation = super().to_representation(instance)
-		training_start = instance.training_start
-		user = self.context["request"].user
-		user_timezone = pytz.timezone(user.timezone)
-		representation["training_start"] = [
-			training_start.astimezone(user_timezone).strftime(FORMAT_DATE),
-			training_start.astimezone(user_timezone).strftime(FORMAT_DATETIME),
-		]
+		if "training_start" not in representation:
+			return representation
+		localizer = get_localizer(self.context["request"])
+		representation["training_start"] = localizer.format_pair(instance.training_start, FORMAT_DATE, FORMAT_DATETIME)
 		return representation
 
 	def validate(self, data: OrderedDict) -> OrderedDict:
@@ -271,12 +345,31 @@ class HistorySerializer(serializers.ModelSerializer):
 			raise serializers.ValidationError(
 				{"training_start_training_end": ["Время начала тренировки должно быть раньше конца."]}
 			)
+		self._apply_route_metrics(data, data.pop("route_metrics", None))
 		return data
 
+	def _apply_route_metrics(self, data: OrderedDict, metrics: RouteMetrics | None) -> None:
+		"""
+		Заполняет или сверяет показатели тренировки по маршруту согласно ROUTE_METRICS_MODE.
+		Показатели, которые не прислал клиент и не удалось вычислить, обязательны.
+		"""
+		if metrics is not None and settings.ROUTE_METRICS_MODE == ROUTE_METRICS_FILL:
+			data.update(metrics.as_history_fields())
+		elif metrics is not None and settings.ROUTE_METRICS_MODE == ROUTE_METRICS_VALIDATE and "distance" in data:
+			if abs(data["distance"] - metrics.distance) > settings.ROUTE_METRICS_TOLERANCE * max(metrics.distance, 1):
+				raise serializers.ValidationError({"distance": ["Дистанция не совпадает с маршрутом."]})
+		missing = {
+			field: [self.fields[field].error_messages["required"]]
+			for field in ROUTE_METRICS_FIELDS
+			if field not in data
+		}
+		if missing:
+			raise serializers.ValidationError(missing)
+
 	def _validate_date(self, value: datetime, name_field: str) -> datetime:
 		user = self.context["request"].user
 		last_completed_training = user.last_completed_training
-		user_timezone = pytz.timezone(user.timezone)
+		user_timezone = get_timezone(user.timezone)
 		if (
 			last_completed_training
 			and value.astimezone(user_timezone).date()
@@ -290,7 +383,7 @@ class HistorySerializer(serializers.ModelSerializer):
 		user: ClassUser = self.context["request"].user
 		if not user.last_completed_training:
 			return
-		now = value.astimezone(pytz.timezone(user.timezone))
+		now = value.astimezone(get_timezone(user.timezone))
 		days_missed, *_ = counts_missed_days(user, user.timezone, now)
 		if user.blocked_training or user.amount_of_skips < days_missed:
 			raise serializers.ValidationError("Невозможно сохранить тренировку при заблокированном челлендже.")
@@ -303,7 +396,7 @@ class HistorySerializer(serializers.ModelSerializer):
 		return self._validate_date(value, "training_end")
 
 	def validate_motivation_phrase(self, value: str) -> str:
-		if not MotivationalPhrase.objects.filter(text=value).exists():
+		if value not in get_phrase_set():
 			raise serializers.ValidationError("Данной мотивационной фразы не существует.")
 		return value
 
@@ -318,7 +411,7 @@ class HistorySerializer(serializers.ModelSerializer):
 		return value
 
 	def validate_achievements(self, value: list) -> list:
-		if value and len(value) > Achievement.objects.filter(id__in=value).count():
+		if value and not get_achievement_catalog().keys() >= set(value):
 			raise serializers.ValidationError("Некорректные ачивки.")
 		return value
 
@@ -331,7 +424,12 @@ class HistorySerializer(serializers.ModelSerializer):
 
 	def create(self, validated_data: dict) -> History:
 		validated_data["user_id"] = self.context["request"].user
-		return super().create(validated_data)
+		try:
+			with transaction.atomic():
+				return super().create(validated_data)
+		except IntegrityError:
+			# Параллельный запрос успел сохранить этот день тренировки (unique_user_training_day).
+			raise serializers.ValidationError({"training_day": ["Этот день тренировки уже сохранён."]})
 
 
 class ResponseUserDefaultSerializer(serializers.Serializer):
@@ -353,6 +451,13 @@ class ResponseResendCodeSerializer(serializers.Serializer):
 	result = serializers.CharField(default="Код создан и отправлен")
 
 
+class ResponseAchievementsJobSerializer(serializers.Serializer):
+	"""Сериализатор возрващаемого значения асинхронной проверки ачивок."""
+
+	job_id = serializers.IntegerField()
+	status = serializers.CharField()
+
+
 class ResponseHealthCheckSerializer(serializers.Serializer):
 	"""Сериализатор возрващаемого значения HealthCheckView."""
 
@@ -2,6 +2,9 @@ from django.conf import settings
 from django.core.mail import send_mail
 
 from config.celery import app
+from utils.achievements import run_achievements_job
+from utils.media_offload import offload
+from utils.renditions import update_renditions
 
 
 @app.task
@@ -15,3 +18,21 @@ def send_code(message, recipient_list, html_message):
 		html_message=html_message,
 		fail_silently=False,
 	)
+
+
+@app.task
+def update_achievements(history_id: int, ios_achievements: list[int] | None = None) -> list[int]:
+	"""Проверяет достижения по сохранённой тренировке."""
+	return run_achievements_job(history_id, ios_achievements)
+
+
+@app.task
+def generate_renditions(model_label: str, pk: int) -> dict[str, str] | None:
+	"""Строит уменьшенные копии изображения объекта."""
+	return update_renditions(model_label, pk)
+
+
+@app.task
+def offload_media(model_label: str, pk: int) -> str | None:
+	"""Переносит изображение объекта в удалённое хранилище."""
+	return offload(model_label, pk)
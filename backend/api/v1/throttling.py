@@ -1,41 +1,111 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+
+import redis
 from django.conf import settings
-from django.utils import timezone
+from django.utils.module_loading import import_string
 from rest_framework import throttling
 
+# Префикс ключей истории запросов кода.
+KEY_PREFIX = "throttle:access_code:"
+
+# Число ключей, которые хранит MemoryThrottleStorage до вытеснения самых давних.
+MEMORY_MAX_KEYS = 10_000
+
+
+class MemoryThrottleStorage:
+	"""
+	История запросов в памяти процесса с вытеснением давно не использованных ключей (LRU).
+	Не разделяется между процессами, предназначена для тестов и разработки.
+	"""
+
+	def __init__(self, max_keys: int = MEMORY_MAX_KEYS) -> None:
+		self._max_keys = max_keys
+		self._history: OrderedDict[str, list[int]] = OrderedDict()
+		self._lock = threading.Lock()
+
+	def hit(self, key: str, now: int, duration: int, num_requests: int, cooldown: int) -> int:
+		"""Регистрирует запрос, отдаёт 0 или оставшееся время запрета в миллисекундах."""
+		with self._lock:
+			history = [t for t in self._history.pop(key, ()) if t >= now - duration]
+			self._history[key] = history
+			if len(self._history) > self._max_keys:
+				self._history.popitem(last=False)
+			if len(history) >= num_requests:
+				wait = cooldown - (now - history[-1])
+				if wait > 0:
+					return wait
+				history.clear()
+			history.append(now)
+			return 0
+
+
+class RedisThrottleStorage:
+	"""
+	История запросов в sorted set Redis, общая для всех процессов.
+	Хранится в отдельной базе ACCESS_RESTORE_CODE_THROTTLING_REDIS, вне ключей брокера Celery.
+	Проверка и запись выполняются одним Lua-скриптом, ключ живёт не дольше окна и запрета.
+	"""
+
+	SCRIPT = """
+		local key = KEYS[1]
+		local now = tonumber(ARGV[1])
+		local duration = tonumber(ARGV[2])
+		local num_requests = tonumber(ARGV[3])
+		local cooldown = tonumber(ARGV[4])
+		redis.call("ZREMRANGEBYSCORE", key, "-inf", "(" .. (now - duration))
+		if redis.call("ZCARD", key) >= num_requests then
+			local last = tonumber(redis.call("ZRANGE", key, -1, -1, "WITHSCORES")[2])
+			local wait = cooldown - (now - last)
+			if wait > 0 then
+				return wait
+			end
+			redis.call("DEL", key)
+		end
+		redis.call("ZADD", key, now, ARGV[5])
+		redis.call("PEXPIRE", key, math.max(duration, cooldown))
+		return 0
+	"""
+
+	def __init__(self) -> None:
+		self._script = redis.Redis.from_url(settings.ACCESS_RESTORE_CODE_THROTTLING_REDIS).register_script(self.SCRIPT)
+
+	def hit(self, key: str, now: int, duration: int, num_requests: int, cooldown: int) -> int:
+		"""Регистрирует запрос, отдаёт 0 или оставшееся время запрета в миллисекундах."""
+		return self._script(keys=(key,), args=(now, duration, num_requests, cooldown, uuid.uuid4().hex))
+
+
+@lru_cache
+def get_throttle_storage(path: str) -> MemoryThrottleStorage | RedisThrottleStorage:
+	"""Отдаёт хранилище истории запросов, одно на процесс."""
+	return import_string(path)()
+
+
+def to_milliseconds(value) -> int:
+	return int(value.total_seconds() * 1000)
+
 
 class DurationCooldownRequestThrottle(throttling.BaseThrottle):
 	"""Класс для тротлинга запросов и вводов кода.
 	Настраиваемое решение со следующей логикой: если код запрашивается
 	больше num_requests раз в течение duration минут, включается запрет
-	на дельнейшие запросы, который длится cooldown минут."""
-
-	_history = {}
+	на дельнейшие запросы, который длится cooldown минут.
+	История хранится в ACCESS_RESTORE_CODE_THROTTLING_STORAGE."""
 
 	def __init__(self) -> None:
-		self._duration = settings.ACCESS_RESTORE_CODE_THROTTLING["duration"]
+		self._duration = to_milliseconds(settings.ACCESS_RESTORE_CODE_THROTTLING["duration"])
 		self._num_requests = settings.ACCESS_RESTORE_CODE_THROTTLING["num_requests"]
-		self._cooldown = settings.ACCESS_RESTORE_CODE_THROTTLING["cooldown"]
-		self._user_email = None
-		self._now = None
+		self._cooldown = to_milliseconds(settings.ACCESS_RESTORE_CODE_THROTTLING["cooldown"])
+		self._wait = 0
 
 	def allow_request(self, request, view):
-		self._now = timezone.localtime()
-		self._user_email = request.data.get("email")
-		self._refresh_history()
-		if len(self._history[self._user_email]) < self._num_requests:
-			self._history[self._user_email].append(self._now)
-			return True
-		if self.wait() > 0:
-			return False
-		self._history[self._user_email] = [self._now]
-		return True
+		storage = get_throttle_storage(settings.ACCESS_RESTORE_CODE_THROTTLING_STORAGE)
+		key = f"{KEY_PREFIX}{request.data.get('email')}"
+		self._wait = storage.hit(key, time.time_ns() // 1_000_000, self._duration, self._num_requests, self._cooldown)
+		return self._wait <= 0
 
 	def wait(self):
-		return (self._cooldown - (self._now - self._history[self._user_email][-1])).total_seconds()
-
-	def _refresh_history(self):
-		if self._user_email not in self._history:
-			self._history[self._user_email] = []
-		self._history[self._user_email] = [
-			t for t in self._history[self._user_email] if t >= self._now - self._duration
-		]
+		return self._wait / 1000
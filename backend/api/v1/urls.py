@@ -1,9 +1,15 @@
+from django.conf import settings
 from django.urls import path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 from .views import (
 	AchievementView,
+	AsyncAchievementView,
+	AsyncHistoryView,
+	AsyncMyInfoView,
+	AsyncTrainingView,
 	HealthCheckView,
+	HistoryAchievementsView,
 	HistoryView,
 	MyInfoView,
 	RegisterUserView,
@@ -14,17 +20,24 @@ from .views import (
 	UserDefaultView,
 )
 
+
+def read_view(view, async_view):
+	"""Выбирает асинхронное представление чтения, если включена настройка ASYNC_VIEWS."""
+	return (async_view if settings.ASYNC_VIEWS else view).as_view()
+
+
 urlpatterns = (
-	path("achievements/", AchievementView.as_view(), name="achievements"),
+	path("achievements/", read_view(AchievementView, AsyncAchievementView), name="achievements"),
 	path("health/", HealthCheckView.as_view(), name="health"),
 	path("schema/", SpectacularAPIView.as_view(), name="schema"),
 	path("docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="docs"),
 	path("user/", RegisterUserView.as_view(), name="user-register"),
 	path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
-	path("me/", MyInfoView.as_view(), name="me"),
+	path("me/", read_view(MyInfoView, AsyncMyInfoView), name="me"),
 	path("resend_code/", ResendCodeView.as_view(), name="code-resend"),
-	path("training/", TrainingView.as_view(), name="training"),
-	path("history/", HistoryView.as_view(), name="history"),
+	path("training/", read_view(TrainingView, AsyncTrainingView), name="training"),
+	path("history/", read_view(HistoryView, AsyncHistoryView), name="history"),
+	path("history/<int:pk>/achievements/", HistoryAchievementsView.as_view(), name="history-achievements"),
 	path("update/", UpdateView.as_view(), name="update"),
 	path("user-default/", UserDefaultView.as_view(), name="user-default"),
 )
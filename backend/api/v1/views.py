@@ -1,30 +1,48 @@
 from datetime import datetime
+from functools import partial
 
-import pytz
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Case, DateTimeField, Exists, F, OuterRef, When
+from django.db import transaction
 from django.db.models.query import QuerySet
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.module_loading import import_string
 from drf_spectacular.utils import extend_schema, extend_schema_view
 from rest_framework import generics, status
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.serializers import TokenRefreshSerializer
-from running.models import Achievement, Day, History, UserAchievement
+from running.models import AchievementsJob, Day, History, UserAchievement
 from users.constants import DEFAULT_AMOUNT_OF_SKIPS
 from users.models import User as ClassUser
-from utils import authcode, mailsender, motivation_phrase, users
-from utils.achievements import AchievementUpdater
+from utils import authcode, mailsender, motivation_phrase, training, users, week_stats
+from utils.achievements import (
+	AchievementUpdater,
+	aget_user_achievement_dates,
+	build_user_achievements,
+	get_achievement_catalog,
+	get_achievements_job_status,
+	get_user_achievements,
+)
 from utils.amount_skips import counts_missed_days
+from utils.localization import get_timezone
 
+from .mixins import AsyncAPIViewMixin, AsyncReadOptimizedListMixin, ReadOptimizedListMixin
+from .pagination import HistoryCursorPagination
+from .read_serializers import AchievementReadSerializer, HistoryReadSerializer, TrainingReadSerializer
 from .serializers import (
 	AchievementEndTrainingSerializer,
 	AchievementSerializer,
 	CustomTokenObtainSerializer,
+	HistoryQuerySerializer,
 	HistorySerializer,
 	MeSerializer,
+	ResponseAchievementsJobSerializer,
 	ResponseHealthCheckSerializer,
 	ResponseResendCodeSerializer,
 	ResponseUpdateSerializer,
@@ -33,6 +51,7 @@ from .serializers import (
 	UserSerializer,
 	UserTimezoneSerializer,
 )
+from .tasks import update_achievements
 from .throttling import DurationCooldownRequestThrottle
 
 User = get_user_model()
@@ -129,7 +148,10 @@ class TokenRefreshView(APIView):
 	patch=extend_schema(
 		responses={200: MeSerializer()},
 		summary="Обновляет данные пользователя",
-		description="Обновляет данные пользователя",
+		description=(
+			"Обновляет данные пользователя. Аватар передаётся base64 data URI в JSON "
+			"либо файлом в multipart/form-data"
+		),
 		tags=("User",),
 	),
 	put=extend_schema(exclude=True),
@@ -142,6 +164,7 @@ class TokenRefreshView(APIView):
 )
 class MyInfoView(generics.RetrieveUpdateDestroyAPIView):
 	serializer_class = MeSerializer
+	parser_classes = (import_string(settings.JSON_PARSER_CLASS), MultiPartParser)
 
 	def get_object(self) -> ClassUser:
 		"""Отдаёт объект пользователя."""
@@ -156,26 +179,30 @@ class MyInfoView(generics.RetrieveUpdateDestroyAPIView):
 		tags=("Run",),
 	),
 )
-class TrainingView(generics.ListAPIView):
+class TrainingView(ReadOptimizedListMixin, generics.ListAPIView):
 	queryset = Day.objects.all()
 	serializer_class = TrainingSerializer
+	read_serializer_class = TrainingReadSerializer
 
-	def get_queryset(self) -> QuerySet[History]:
+	def get_queryset(self) -> list[dict]:
 		"""
 		Формирует список тренировок с динамическими фразами
 		и флагом завершения тренировки.
 		"""
-		user = self.request.user
-		sub_queryset = History.objects.filter(user_id=user).values("training_day")
-		queryset = (
-			self.queryset.annotate(completed=Exists(sub_queryset.filter(training_day=OuterRef("day_number"))))
-			.all()
-			.order_by("day_number")
-		)
-		dynamic_motivation_phrase = motivation_phrase.get_dynamic_list_motivation_phrase(user)
-		for i in range(len(queryset)):
-			queryset[i].motivation_phrase = dynamic_motivation_phrase[i]
-		return queryset
+		return self.build_training_list(training.get_completed_days(self.request.user))
+
+	def build_training_list(self, completed_days: int) -> list[dict]:
+		"""Собирает список тренировок из плана, фраз и битовой маски пройденных дней."""
+		motivational_phrases, _ = motivation_phrase.get_phrase_table()
+		rest_phrase_overlay = motivation_phrase.get_rest_phrase_overlay(self.request.user)
+		return [
+			{
+				**day,
+				"motivation_phrase": rest_phrase_overlay.get(i, motivational_phrases[i]),
+				"completed": training.is_day_completed(completed_days, day["day_number"]),
+			}
+			for i, day in enumerate(training.get_training_catalog())
+		]
 
 
 @extend_schema_view(
@@ -186,49 +213,62 @@ class TrainingView(generics.ListAPIView):
 		tags=("Run",),
 	),
 )
-class AchievementView(generics.ListAPIView):
+class AchievementView(ReadOptimizedListMixin, generics.ListAPIView):
 	serializer_class = AchievementSerializer
+	read_serializer_class = AchievementReadSerializer
 
-	def get_queryset(self) -> QuerySet[Achievement]:
-		"""Формирует список ачивок c флагом получения и датой."""
-		user = self.request.user
-		sub_queryset = UserAchievement.objects.filter(user_id=user).values("achievement_id", "achievement_date")
-		queryset = (
-			Achievement.objects.annotate(
-				received=Exists(sub_queryset.filter(achievement_id=OuterRef("id"))),
-				achievement_date=Case(
-					When(user_achievements__user_id=user, then=F("user_achievements__achievement_date")),
-					default=None,
-					output_field=DateTimeField(),
-				),
-			)
-			.all()
-			.order_by("id")
-			.distinct("id")
-		)
-		return queryset
+	def get_queryset(self) -> list[dict]:
+		"""Формирует список ачивок c флагом получения и датой последнего получения."""
+		return get_user_achievements(self.request.user)
 
 
 @extend_schema_view(
 	get=extend_schema(
+		parameters=[HistoryQuerySerializer],
 		responses={200: HistorySerializer(many=True)},
 		summary="История тренировок",
-		description="Выводит историю тренировок",
+		description=(
+			"Выводит историю тренировок. route_format: points - список точек, "
+			"polyline - поля, их точности и закодированная полилиния, none - без маршрута. "
+			"route_tolerance - допуск упрощения маршрута в метрах. "
+			"fields - поля ответа через запятую. С параметром limit или cursor "
+			"история отдаётся страницами по курсору next"
+		),
 		tags=("Run",),
 	),
 	post=extend_schema(
-		responses={201: AchievementEndTrainingSerializer(many=True)},
+		responses={201: AchievementEndTrainingSerializer(many=True), 202: ResponseAchievementsJobSerializer()},
 		summary="Сохранение выполненной тренировки",
-		description="Сохраняет выполненную тренировку",
+		description=(
+			"Сохраняет выполненную тренировку. Изображение маршрута передаётся "
+			"base64 data URI в JSON либо файлом в multipart/form-data. "
+			"В асинхронном режиме отдаёт job_id для получения ачивок через /history/{job_id}/achievements/"
+		),
 		tags=("Run",),
 	),
 )
-class HistoryView(generics.ListCreateAPIView):
+class HistoryView(ReadOptimizedListMixin, generics.ListCreateAPIView):
 	serializer_class = HistorySerializer
+	read_serializer_class = HistoryReadSerializer
+	parser_classes = (import_string(settings.JSON_PARSER_CLASS), MultiPartParser)
+	pagination_class = HistoryCursorPagination
 
 	def get_queryset(self) -> QuerySet[History]:
-		"""Формирует список историй тренировок пользователя."""
-		return self.request.user.user_history.order_by("training_day")
+		"""Формирует список историй тренировок пользователя, читая только колонки выбранных полей."""
+		queryset = self.request.user.user_history.order_by("training_day", "id")
+		if self.request.method == "GET":
+			columns = self.get_serializer().get_columns()
+			queryset = queryset.only("training_day", *columns)
+		return queryset
+
+	def get_serializer_context(self) -> dict:
+		"""Добавляет в контекст вид маршрута из параметров запроса."""
+		context = super().get_serializer_context()
+		if self.request.method == "GET":
+			query = HistoryQuerySerializer(data=self.request.query_params)
+			query.is_valid(raise_exception=True)
+			context.update(query.validated_data)
+		return context
 
 	def perform_create(self, serializer: HistorySerializer) -> History:
 		"""Создаёт новую историю."""
@@ -237,20 +277,25 @@ class HistoryView(generics.ListCreateAPIView):
 	def _update_data_user(self, user: ClassUser, history: History) -> None:
 		user.last_completed_training = history
 		user.total_m_run += history.distance
-		user.save()
+		user.save(update_fields=("last_completed_training", "total_m_run"))
+		week_stats.register_training(user, history)
 
 	def create(self, request: Request, *args, **kwargs) -> Response:
 		serializer = self.get_serializer(data=request.data)
 		serializer.is_valid(raise_exception=True)
-		if "achievements" in serializer._validated_data.keys():
-			serializer._validated_data.pop("achievements")
+		achievements = serializer.validated_data.pop("achievements", None)
 		history = self.perform_create(serializer)
 		user = self.request.user
-		achievements = request.data.get("achievements")
 		self._update_data_user(user, history)
+		headers = self.get_success_headers(serializer.data)
+		if settings.ACHIEVEMENTS_ASYNC:
+			job = AchievementsJob.objects.create(history=history)
+			transaction.on_commit(partial(update_achievements.delay, history.id, achievements))
+			return Response(
+				{"job_id": history.id, "status": job.status}, status=status.HTTP_202_ACCEPTED, headers=headers
+			)
 		updater = AchievementUpdater(user, achievements, history)
 		updater.update_achievements()
-		headers = self.get_success_headers(serializer.data)
 
 		new_achievements = AchievementEndTrainingSerializer(
 			updater.new_achievements, many=True, context={"request": request}
@@ -258,6 +303,40 @@ class HistoryView(generics.ListCreateAPIView):
 		return Response(new_achievements, status=status.HTTP_201_CREATED, headers=headers)
 
 
+@extend_schema_view(
+	get=extend_schema(
+		responses={
+			200: AchievementEndTrainingSerializer(many=True),
+			202: ResponseAchievementsJobSerializer(),
+			410: ResponseAchievementsJobSerializer(),
+		},
+		summary="Ачивки, полученные за тренировку",
+		description=(
+			"Отдаёт ачивки, полученные за тренировку, после асинхронной проверки. "
+			"Пока проверка не завершена - 202 со статусом pending, "
+			"если она завершилась ошибкой или не выполнена вовремя - 410 со статусом failed или expired"
+		),
+		tags=("Run",),
+	),
+)
+class HistoryAchievementsView(APIView):
+	def get(self, request: Request, pk: int) -> Response:
+		"""Отдаёт ачивки по тренировке или статус проверки, пока она не завершена успешно."""
+		job = get_object_or_404(AchievementsJob, history_id=pk, history__user_id=request.user)
+		job_status = get_achievements_job_status(job)
+		if job_status == AchievementsJob.PENDING:
+			return Response({"job_id": pk, "status": job_status}, status=status.HTTP_202_ACCEPTED)
+		if job_status != AchievementsJob.DONE:
+			return Response({"job_id": pk, "status": job_status}, status=status.HTTP_410_GONE)
+		catalog = get_achievement_catalog()
+		new_achievements = AchievementEndTrainingSerializer(
+			[catalog[_id].to_model() for _id in job.achievement_ids if _id in catalog],
+			many=True,
+			context={"request": request},
+		).data
+		return Response(new_achievements, status=status.HTTP_200_OK)
+
+
 @extend_schema_view(
 	patch=extend_schema(
 		responses={200: ResponseUpdateSerializer()},
@@ -275,7 +354,7 @@ class UpdateView(APIView):
 		"""Обновляет данные по заморозкам пользователя."""
 		user.amount_of_skips = amount_of_skips - days_missed
 		user.date_last_skips = date_day_ago
-		user.save()
+		user.save(update_fields=("timezone", "amount_of_skips", "date_last_skips"))
 
 	def _set_null_amount_of_skip(self, user: ClassUser) -> None:
 		"""
@@ -284,13 +363,13 @@ class UpdateView(APIView):
 		"""
 		user.amount_of_skips = 0
 		user.blocked_training = True
-		user.save()
+		user.save(update_fields=("timezone", "amount_of_skips", "blocked_training"))
 
 	def _update_user_timezone_data(self, user: ClassUser, user_timezone: str) -> None:
 		"""Обновляет timezone ползователя."""
 		if user.timezone != user_timezone:
 			user.timezone = user_timezone
-			user.save()
+			user.save(update_fields=("timezone",))
 
 	def patch(self, request: Request, *args, **kwargs) -> Response:
 		"""Обновляет timezone пользователя и просчитывает пропуски тренировок."""
@@ -313,7 +392,7 @@ class UpdateView(APIView):
 		if not last_traning or last_traning.training_day.day_number == 100:
 			self._update_user_timezone_data(user, user_timezone)
 			return Response(**response_data)
-		now = timezone.localtime(timezone=pytz.timezone(user_timezone))
+		now = timezone.localtime(timezone=get_timezone(user_timezone))
 		days_missed, date_day_ago, amount_of_skips = counts_missed_days(user, user_timezone, now)
 		if days_missed <= 0:
 			self._update_user_timezone_data(user, user_timezone)
@@ -345,9 +424,43 @@ class UserDefaultView(APIView):
 		user.amount_of_skips = DEFAULT_AMOUNT_OF_SKIPS
 		user.total_m_run = 0
 		user.blocked_training = False
-		user.save()
+		user.save(update_fields=("date_last_skips", "amount_of_skips", "total_m_run", "blocked_training"))
 		user_history: QuerySet[History] = user.user_history.all()
 		user_history.delete()
 		user_achievements: QuerySet[UserAchievement] = user.user_achievements.all()
 		user_achievements.delete()
+		transaction.on_commit(partial(week_stats.reset, user))
 		return Response({"default": True}, status=status.HTTP_200_OK)
+
+
+class AsyncMyInfoView(AsyncAPIViewMixin, MyInfoView):
+	"""MyInfoView для config.asgi: последняя тренировка читается асинхронным ORM, изменения - в потоке."""
+
+	async def aget(self, request: Request, *args, **kwargs) -> Response:
+		user = self.get_object()
+		if user.last_completed_training_id is not None:
+			user.last_completed_training = await History.objects.select_related("training_day").aget(
+				pk=user.last_completed_training_id
+			)
+		serializer = self.get_serializer(user)
+		return Response(await sync_to_async(lambda: serializer.data)())
+
+
+class AsyncTrainingView(AsyncReadOptimizedListMixin, TrainingView):
+	"""TrainingView для config.asgi."""
+
+	async def aget_queryset(self) -> list[dict]:
+		completed_days = await training.aget_completed_days(self.request.user)
+		return await sync_to_async(self.build_training_list)(completed_days)
+
+
+class AsyncAchievementView(AsyncReadOptimizedListMixin, AchievementView):
+	"""AchievementView для config.asgi."""
+
+	async def aget_queryset(self) -> list[dict]:
+		dates = await aget_user_achievement_dates(self.request.user)
+		return await sync_to_async(build_user_achievements)(dates)
+
+
+class AsyncHistoryView(AsyncReadOptimizedListMixin, HistoryView):
+	"""HistoryView для config.asgi: GET асинхронный, сохранение тренировки - в потоке."""
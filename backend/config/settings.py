@@ -3,6 +3,8 @@ from datetime import timedelta
 from distutils.util import strtobool
 from pathlib import Path
 
+import django
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 from .logs import LOGGING_SETTINGS
@@ -71,6 +73,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+ASGI_APPLICATION = "config.asgi.application"
+
+# Асинхронные представления чтения для запуска через config.asgi (uvicorn).
+ASYNC_VIEWS = strtobool(os.getenv("ASYNC_VIEWS", default="False"))
+
 TIME_ZONE = "UTC"
 
 DATABASES = {
@@ -83,9 +90,31 @@ DATABASES = {
 		"PORT": os.getenv("DB_PORT", default=5432),
 		"PG_USER": os.getenv("PG_USER", default="user"),
 		"TIME_ZONE": TIME_ZONE,
+		# Соединение живёт DB_CONN_MAX_AGE секунд и переиспользуется запросами
+		# и задачами Celery, перед переиспользованием проверяется на живость.
+		# Под ASGI каждый запрос работает с БД в своём потоке, постоянные соединения
+		# там копятся, поэтому по умолчанию выключены, переиспользованием занимается PgBouncer.
+		"CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", default=0 if ASYNC_VIEWS else 60)),
+		"CONN_HEALTH_CHECKS": strtobool(os.getenv("DB_CONN_HEALTH_CHECKS", default="True")),
+		# PgBouncer в режиме transaction не держит курсоры сервера между транзакциями.
+		"DISABLE_SERVER_SIDE_CURSORS": strtobool(os.getenv("DB_PGBOUNCER", default="False")),
+		"OPTIONS": {},
 	}
 }
 
+# Пул соединений psycopg 3 внутри процесса, заменяет постоянные соединения.
+DB_POOL = strtobool(os.getenv("DB_POOL", default="False"))
+
+if DB_POOL:
+	if django.VERSION < (5, 1):
+		raise ImproperlyConfigured("DB_POOL требует Django 5.1+ и psycopg[pool] 3.")
+	DATABASES["default"]["CONN_MAX_AGE"] = 0
+	DATABASES["default"]["OPTIONS"]["pool"] = {
+		"min_size": int(os.getenv("DB_POOL_MIN_SIZE", default=2)),
+		"max_size": int(os.getenv("DB_POOL_MAX_SIZE", default=10)),
+		"timeout": int(os.getenv("DB_POOL_TIMEOUT", default=10)),
+	}
+
 AUTH_PASSWORD_VALIDATORS = [
 	{
 		"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -143,11 +172,31 @@ if IS_AWS_ACTIVE:
 	AWS_S3_SECURE_URLS = os.getenv("AWS_S3_SECURE_URLS", False) == "True"
 	AWS_S3_URL_PROTOCOL = os.getenv("AWS_S3_URL_PROTOCOL", "http:")
 
+	# Отложенная выгрузка: файлы пишутся в MEDIA_ROOT и переносятся в S3 задачей Celery.
+	# MEDIA_ROOT должен быть общим для веб-приложения и воркеров.
+	MEDIA_STAGED_UPLOADS = strtobool(os.getenv("MEDIA_STAGED_UPLOADS", default="False"))
+	if MEDIA_STAGED_UPLOADS:
+		STORAGES["remote"] = STORAGES["default"]
+		STORAGES["default"] = {
+			"BACKEND": "config.staged_storage.StagedMediaStorage",
+		}
+
 MEDIA_URL = "/media/"
 STATIC_URL = "/static/"
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Построитель абсолютных url медиафайлов в ответах API.
+MEDIA_URL_BUILDER = "utils.media_urls.PrefixURLBuilder"
+
+MAX_UPLOAD_IMAGE_SIZE = int(os.getenv("MAX_UPLOAD_IMAGE_SIZE", default=10 * 1024 * 1024))
+
+FILE_UPLOAD_HANDLERS = [
+	"config.upload_handlers.MaxSizeUploadHandler",
+	"django.core.files.uploadhandler.MemoryFileUploadHandler",
+	"django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
 
 if DEBUG is True:
 	STATICFILES_DIRS = (os.path.join(BASE_DIR, "static/"),)
@@ -158,12 +207,28 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 FORM_RENDERER = "django.forms.renderers.TemplatesSetting"
 
+# JSON API рендерится и разбирается orjson вместо стандартного json. Вывод отличается в крайних случаях:
+# NaN и бесконечность становятся null вместо ошибки, 1e16 пишется как 1e16, а не 1e+16,
+# ключи словарей не-строки (даты, UUID) приводятся к строкам вместо ошибки.
+ORJSON_RENDERING = strtobool(os.getenv("ORJSON_RENDERING", default="False"))
+JSON_RENDERER_CLASS = "api.v1.renderers.ORJSONRenderer" if ORJSON_RENDERING else "rest_framework.renderers.JSONRenderer"
+JSON_PARSER_CLASS = "api.v1.parsers.ORJSONParser" if ORJSON_RENDERING else "rest_framework.parsers.JSONParser"
+
 REST_FRAMEWORK = {
 	"DATETIME_INPUT_FORMATS": ["%Y-%m-%d %H:%M:%S"],
 	"DEFAULT_PERMISSION_CLASSES": [
 		"rest_framework.permissions.IsAuthenticated",
 	],
 	"DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+	"DEFAULT_RENDERER_CLASSES": [
+		JSON_RENDERER_CLASS,
+		"rest_framework.renderers.BrowsableAPIRenderer",
+	],
+	"DEFAULT_PARSER_CLASSES": [
+		JSON_PARSER_CLASS,
+		"rest_framework.parsers.FormParser",
+		"rest_framework.parsers.MultiPartParser",
+	],
 	"DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
 	"DEFAULT_THROTTLE_CLASSES": [
 		"rest_framework.throttling.UserRateThrottle",
@@ -216,6 +281,35 @@ ACCESS_RESTORE_CODE_THROTTLING = {
 	"cooldown": timedelta(minutes=5),
 }
 
+# Хранилище истории запросов кода: RedisThrottleStorage общая для всех процессов,
+# MemoryThrottleStorage - в памяти процесса с вытеснением LRU.
+ACCESS_RESTORE_CODE_THROTTLING_STORAGE = "api.v1.throttling.RedisThrottleStorage"
+
+# База Redis истории запросов кода, отдельная от брокера Celery и кэша (база 0).
+ACCESS_RESTORE_CODE_THROTTLING_REDIS = f"{REDIS_LOCATION}/{os.getenv('REDIS_THROTTLING_DB', default='1')}"
+
+# Списки тренировок, истории и ачивок собираются из строк values()
+# без полей DRF, вывод совпадает с сериализаторами.
+READ_OPTIMIZED_SERIALIZERS = strtobool(os.getenv("READ_OPTIMIZED_SERIALIZERS", default="True"))
+
+# achievements
+
+ACHIEVEMENTS_ASYNC = strtobool(os.getenv("ACHIEVEMENTS_ASYNC", default="False"))
+
+# Проверка достижений, не выполненная за это время, отдаётся как просроченная.
+ACHIEVEMENTS_JOB_TIMEOUT_SECONDS = int(os.getenv("ACHIEVEMENTS_JOB_TIMEOUT_SECONDS", default=60 * 60))
+
+# routes
+
+# Показатели тренировки по маршруту с отметками времени при сохранении:
+# off - не считаются, fill - заменяют присланные клиентом, validate - сверяются с ними.
+ROUTE_METRICS_MODE = os.getenv("ROUTE_METRICS_MODE", default="off")
+if ROUTE_METRICS_MODE not in ("off", "fill", "validate"):
+	raise ImproperlyConfigured("ROUTE_METRICS_MODE должен быть off, fill или validate.")
+
+# Допустимое относительное расхождение дистанции клиента и маршрута в режиме validate.
+ROUTE_METRICS_TOLERANCE = float(os.getenv("ROUTE_METRICS_TOLERANCE", default=0.1))
+
 # email send
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.yandex.ru")
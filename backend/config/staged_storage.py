@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, Storage, storages
+from django.utils.functional import cached_property
+
+
+class StagedMediaStorage(Storage):
+	"""
+	Хранилище отложенной выгрузки медиа.
+	Новые файлы пишутся в локальный каталог под префиксом staged/, откуда
+	задача Celery переносит их в удалённое хранилище и подменяет путь в записи.
+	Файлы с префиксом отдаются из локального каталога, остальные - из удалённого.
+	"""
+
+	prefix = "staged/"
+
+	def __init__(self, remote: str = "remote", location: str | None = None, base_url: str | None = None) -> None:
+		self._remote_alias = remote
+		self.local = FileSystemStorage(location or settings.MEDIA_ROOT, base_url or settings.MEDIA_URL)
+
+	@cached_property
+	def remote(self) -> Storage:
+		return storages[self._remote_alias]
+
+	def is_staged(self, name: str | None) -> bool:
+		return bool(name) and name.startswith(self.prefix)
+
+	def get_remote_name(self, name: str) -> str:
+		"""Отдаёт имя файла в удалённом хранилище без префикса."""
+		return name.removeprefix(self.prefix)
+
+	def get_storage(self, name: str) -> Storage:
+		"""Отдаёт хранилище, в котором лежит файл."""
+		return self.local if self.is_staged(name) else self.remote
+
+	def get_available_name(self, name: str, max_length: int | None = None) -> str:
+		if not self.is_staged(name):
+			name = self.prefix + name
+		return self.local.get_available_name(name, max_length=max_length)
+
+	def _open(self, name: str, mode: str = "rb"):
+		return self.get_storage(name).open(name, mode)
+
+	def _save(self, name: str, content) -> str:
+		return self.local.save(name, content)
+
+	def delete(self, name: str) -> None:
+		self.get_storage(name).delete(name)
+
+	def exists(self, name: str) -> bool:
+		return self.get_storage(name).exists(name)
+
+	def size(self, name: str) -> int:
+		return self.get_storage(name).size(name)
+
+	def url(self, name: str) -> str:
+		return self.get_storage(name).url(name)
+
+	def path(self, name: str) -> str:
+		return self.get_storage(name).path(name)
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class OversizedUploadedFile(UploadedFile):
+	"""Заглушка файла, превысившего лимит. Содержимое не сохраняется, известен только размер."""
+
+	def __init__(self, name, content_type, size, charset, content_type_extra=None):
+		super().__init__(None, name, content_type, size, charset, content_type_extra)
+
+	def open(self, mode=None):
+		raise ValueError("Содержимое файла, превысившего лимит, не сохранено.")
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+	"""
+	Ограничивает размер файлов multipart-запроса.
+	Стоит первым в FILE_UPLOAD_HANDLERS: после превышения MAX_UPLOAD_IMAGE_SIZE
+	перестаёт передавать порции следующим обработчикам, а по завершении
+	отдаёт заглушку с полным размером, по которой поле вернёт ошибку валидации.
+	"""
+
+	def new_file(self, *args, **kwargs):
+		super().new_file(*args, **kwargs)
+		self.size = 0
+
+	def receive_data_chunk(self, raw_data, start):
+		self.size += len(raw_data)
+		if self.size > settings.MAX_UPLOAD_IMAGE_SIZE:
+			return None
+		return raw_data
+
+	def file_complete(self, file_size):
+		if self.size > settings.MAX_UPLOAD_IMAGE_SIZE:
+			return OversizedUploadedFile(
+				self.file_name, self.content_type, self.size, self.charset, self.content_type_extra
+			)
+		return None
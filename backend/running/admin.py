@@ -1,14 +1,18 @@
 import json
 import re
+from functools import partial
 
 from django.conf import settings
 from django.contrib import admin, messages
 from django.contrib.messages.storage import default_storage
 from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
 from django.http import HttpResponse, HttpResponseRedirect
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
+from utils import week_stats
+
 from .forms import DayForm, HistoryForm
 from .models import Achievement, Day, History, MotivationalPhrase, UserAchievement
 
@@ -175,8 +179,10 @@ class HistoryAdmin(admin.ModelAdmin):
 			user = obj.user_id
 			user.last_completed_training = obj
 			user.save()
+			transaction.on_commit(partial(week_stats.reset, user))
 			return
 		obj.save()
+		transaction.on_commit(partial(week_stats.reset, obj.user_id))
 
 	def delete_model(self, request: WSGIRequest, obj: History) -> None:
 		"""Удаляет объект и обновляет последнюю тренировку пользователя."""
@@ -192,6 +198,7 @@ class HistoryAdmin(admin.ModelAdmin):
 				)
 				user.save()
 		obj.delete()
+		transaction.on_commit(partial(week_stats.reset, obj.user_id))
 
 	def response_delete(self, request: WSGIRequest, obj_display: str, obj_id: int) -> HttpResponseRedirect:
 		"""Меняет сообщение об удалении в случае ошибки."""
@@ -5,3 +5,6 @@ class RunningConfig(AppConfig):
 	default_auto_field = "django.db.models.BigAutoField"
 	name = "running"
 	verbose_name = "Бег"
+
+	def ready(self) -> None:
+		from . import signals  # noqa
@@ -0,0 +1,37 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from api.v1.tasks import generate_renditions
+from utils.constants import IMAGE_FIELDS
+from utils.renditions import get_renditions_field, needs_update, update_renditions
+
+
+class Command(BaseCommand):
+	help = "Строит уменьшенные копии для изображений, у которых их ещё нет."
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			"--async",
+			action="store_true",
+			dest="use_celery",
+			help="Ставить задачи в очередь Celery вместо построения в текущем процессе.",
+		)
+
+	def handle(self, *args, use_celery=False, **options):
+		for model_label, field_name in IMAGE_FIELDS.items():
+			model = apps.get_model(model_label)
+			queryset = (
+				model.objects.exclude(**{f"{field_name}__isnull": True})
+				.exclude(**{field_name: ""})
+				.only(field_name, get_renditions_field(field_name))
+			)
+			count = 0
+			for instance in queryset.iterator():
+				if not needs_update(instance):
+					continue
+				if use_celery:
+					generate_renditions.delay(model_label, instance.pk)
+					count += 1
+				elif update_renditions(model_label, instance.pk) is not None:
+					count += 1
+			self.stdout.write(f"{model_label}: {count}")
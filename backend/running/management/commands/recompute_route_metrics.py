@@ -0,0 +1,84 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from running.models import History
+from users.models import User
+from utils.route_analytics import analyze_routes, route_to_array
+from utils.routes import Route
+
+# Поля истории, пересчитываемые по маршруту.
+METRIC_FIELDS = ("distance", "max_speed", "avg_speed", "height_difference")
+
+
+def get_exact_route(history: History) -> Route:
+	"""
+	Отдаёт маршрут в том виде, в котором его прислал клиент.
+	Если полилиния кодирует точки с потерями, маршрут берётся из route.
+	"""
+	if history.route is not None:
+		return Route.from_json(history.route)
+	return Route.decode(history.route_polyline)
+
+
+class Command(BaseCommand):
+	help = (
+		"Пересчитывает дистанцию, скорости и перепад высот тренировок по сохранённым маршрутам. "
+		"Без --apply только выводит, сколько тренировок изменится."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument("--batch-size", type=int, default=1000, help="Количество маршрутов в одной пачке.")
+		parser.add_argument(
+			"--apply", action="store_true", help="Сохранить показатели и пересчитать общий пробег пользователей."
+		)
+
+	def handle(self, *args, batch_size=1000, apply=False, **options):
+		queryset = (
+			History.objects.filter(route_polyline__isnull=False)
+			.only("route", "route_polyline", "user_id", *METRIC_FIELDS)
+			.order_by("pk")
+		)
+		total = updated = 0
+		started = time.perf_counter()
+		batch = []
+		for history in queryset.iterator(chunk_size=batch_size):
+			batch.append((history, get_exact_route(history)))
+			if len(batch) == batch_size:
+				updated += self._process(batch, apply)
+				total += len(batch)
+				batch = []
+		if batch:
+			updated += self._process(batch, apply)
+			total += len(batch)
+		elapsed = time.perf_counter() - started
+		self.stdout.write(
+			f"Маршрутов: {total}, {'изменено' if apply else 'изменится'}: {updated}, "
+			f"{total / elapsed if elapsed else 0:.0f} маршрутов/с"
+		)
+		if not apply:
+			self.stdout.write("Изменения не сохранены, для сохранения запустите с --apply.")
+
+	def _process(self, batch: list[tuple[History, Route]], apply: bool) -> int:
+		"""Пересчитывает пачку маршрутов и сохраняет изменившиеся показатели и общий пробег пользователей."""
+		metrics = analyze_routes([route_to_array(route) for _, route in batch])
+		changed = []
+		distance_deltas = defaultdict(float)
+		for (history, _), route_metrics in zip(batch, metrics):
+			fields = route_metrics.as_history_fields()
+			if all(getattr(history, field) == value for field, value in fields.items()):
+				continue
+			distance_deltas[history.user_id_id] += fields["distance"] - history.distance
+			for field, value in fields.items():
+				setattr(history, field, value)
+			changed.append(history)
+		if changed and apply:
+			with transaction.atomic():
+				History.objects.bulk_update(changed, METRIC_FIELDS)
+				for user_id, delta in distance_deltas.items():
+					if delta:
+						User.objects.filter(pk=user_id).update(total_m_run=F("total_m_run") + delta)
+		return len(changed)
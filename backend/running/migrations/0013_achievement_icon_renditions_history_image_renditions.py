@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 07:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('running', '0012_achievement_recurring'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='achievement',
+            name='icon_renditions',
+            field=models.JSONField(db_comment='Имена файлов уменьшенных копий иконки и исходного файла.', default=dict, editable=False, help_text='Уменьшенные копии иконки.', verbose_name='Варианты иконки'),
+        ),
+        migrations.AddField(
+            model_name='history',
+            name='image_renditions',
+            field=models.JSONField(db_comment='Имена файлов уменьшенных копий изображения и исходного файла.', default=dict, editable=False, help_text='Уменьшенные копии изображения маршрута.', verbose_name='Варианты изображения маршрута'),
+        ),
+    ]
@@ -0,0 +1,166 @@
+# Generated by Django 5.0.2 on 2026-10-18 07:22
+
+from django.db import migrations, models
+
+# Замороженная копия кодека utils.routes на момент миграции: формат «1;форма;поле:точность,...;полилиния».
+# Маршрут переносится в полилинию, только если она восстанавливает точки без потерь.
+
+FIELDS = ("latitude", "longitude", "altitude", "timestamp")
+MAX_PRECISION = 10
+
+
+def field_precision(values):
+    if all(isinstance(value, int) for value in values):
+        return None
+    precision = 0
+    for value in values:
+        text = repr(float(value))
+        if "e" in text or "." not in text:
+            return MAX_PRECISION
+        precision = max(precision, len(text.split(".")[1].rstrip("0")))
+    return min(precision, MAX_PRECISION)
+
+
+def parse_route(value):
+    """Отдаёт (форма, поля, точки) или None, если формат не распознан."""
+    if not isinstance(value, list) or not value:
+        return None
+    first = value[0]
+    if isinstance(first, dict):
+        fields = tuple(field for field in FIELDS if field in first)
+        if fields[:2] != ("latitude", "longitude") or len(fields) != len(first):
+            return None
+        if not all(isinstance(point, dict) and point.keys() == first.keys() for point in value):
+            return None
+        points = [tuple(point[field] for field in fields) for point in value]
+    elif isinstance(first, list):
+        fields = FIELDS[: len(first)]
+        if len(fields) < 2 or len(fields) != len(first):
+            return None
+        if not all(isinstance(point, list) and len(point) == len(fields) for point in value):
+            return None
+        points = [tuple(point) for point in value]
+    else:
+        return None
+    if not all(
+        isinstance(coordinate, (int, float)) and not isinstance(coordinate, bool) for p in points for coordinate in p
+    ):
+        return None
+    return "dict" if isinstance(first, dict) else "list", fields, points
+
+
+def encode_polyline(points, precisions):
+    factors = [1 if precision is None else 10**precision for precision in precisions]
+    previous = [0] * len(factors)
+    chunks = []
+    for point in points:
+        for index, (coordinate, factor) in enumerate(zip(point, factors)):
+            value = round(coordinate * factor)
+            delta = value - previous[index]
+            previous[index] = value
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                chunks.append(chr((0x20 | (delta & 0x1F)) + 63))
+                delta >>= 5
+            chunks.append(chr(delta + 63))
+    return "".join(chunks)
+
+
+def decode_polyline(encoded, precisions):
+    factors = [None if precision is None else 10**precision for precision in precisions]
+    values = [0] * len(factors)
+    points, point = [], []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte >= 0x20:
+            continue
+        index = len(point)
+        values[index] += ~(value >> 1) if value & 1 else value >> 1
+        point.append(values[index] if factors[index] is None else values[index] / factors[index])
+        value = shift = 0
+        if len(point) == len(factors):
+            points.append(tuple(point))
+            point = []
+    return points
+
+
+def encode_route(value):
+    """Отдаёт (полилиния или None, без потерь ли она)."""
+    parsed = parse_route(value)
+    if parsed is None:
+        return None, False
+    shape, fields, points = parsed
+    precisions = tuple(field_precision(column) for column in zip(*points))
+    polyline = encode_polyline(points, precisions)
+    lossless = all(
+        type(coordinate) is type(restored) and coordinate == restored
+        for point, decoded in zip(points, decode_polyline(polyline, precisions))
+        for coordinate, restored in zip(point, decoded)
+    )
+    specs = ",".join(
+        f"{field}:{'int' if precision is None else precision}" for field, precision in zip(fields, precisions)
+    )
+    return ";".join(("1", shape, specs, polyline)), lossless
+
+
+def decode_route(encoded):
+    _, shape, specs, polyline = encoded.split(";", 3)
+    fields, precisions = zip(*(spec.split(":") for spec in specs.split(",")))
+    precisions = [None if precision == "int" else int(precision) for precision in precisions]
+    points = decode_polyline(polyline, precisions)
+    if shape == "dict":
+        return [dict(zip(fields, point)) for point in points]
+    return [list(point) for point in points]
+
+
+def encode_routes(apps, schema_editor):
+    """
+    Перенос распознанных маршрутов из JSON в полилинию.
+    JSON очищается, только если полилиния восстанавливает маршрут без потерь.
+    """
+    History = apps.get_model("running", "History")
+    histories = []
+    for history in History.objects.filter(route__isnull=False).only("route").iterator(chunk_size=500):
+        polyline, lossless = encode_route(history.route)
+        if polyline is not None:
+            history.route_polyline = polyline
+            if lossless:
+                history.route = None
+            histories.append(history)
+        if len(histories) == 500:
+            History.objects.bulk_update(histories, ("route", "route_polyline"))
+            histories = []
+    History.objects.bulk_update(histories, ("route", "route_polyline"))
+
+
+def decode_routes(apps, schema_editor):
+    """Возврат маршрутов, хранящихся только в полилинии, в JSON."""
+    History = apps.get_model("running", "History")
+    histories = []
+    queryset = History.objects.filter(route__isnull=True, route_polyline__isnull=False).only("route_polyline")
+    for history in queryset.iterator(chunk_size=500):
+        history.route = decode_route(history.route_polyline)
+        histories.append(history)
+        if len(histories) == 500:
+            History.objects.bulk_update(histories, ("route",))
+            histories = []
+    History.objects.bulk_update(histories, ("route",))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('running', '0013_achievement_icon_renditions_history_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='history',
+            name='route_polyline',
+            field=models.TextField(blank=True, db_comment='Маршрут тренировки: форма точек, поля и закодированная полилиния.', editable=False, help_text='Маршрут тренировки в компактном виде.', null=True, verbose_name='Маршрут (полилиния)'),
+        ),
+        migrations.RunPython(encode_routes, decode_routes),
+    ]
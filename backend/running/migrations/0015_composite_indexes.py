@@ -0,0 +1,61 @@
+# Generated by Django 5.0.2 on 2026-10-18 07:47
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_days(apps, schema_editor):
+    """Останавливает миграцию, если у пользователя есть повторные записи одного дня тренировки."""
+    History = apps.get_model("running", "History")
+    duplicates = list(
+        History.objects.values("user_id", "training_day")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .values_list("user_id", "training_day")[:10]
+    )
+    if duplicates:
+        raise RuntimeError(
+            f"Повторные записи истории (user_id, training_day): {duplicates}. "
+            "Удалите лишние записи перед применением миграции."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('running', '0014_history_route_polyline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='history',
+            index=models.Index(fields=['user_id', 'training_start'], name='history_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='motivationalphrase',
+            index=django.contrib.postgres.indexes.HashIndex(fields=['text'], name='phrase_text_hash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userachievement',
+            index=models.Index(fields=['user_id', 'achievement_id'], include=('achievement_date',), name='userachievement_user_ach_idx'),
+        ),
+        migrations.AlterField(
+            model_name='history',
+            name='user_id',
+            field=models.ForeignKey(db_comment='История пользователя.', db_index=False, help_text='История пользователя.', on_delete=django.db.models.deletion.CASCADE, related_name='user_history', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='userachievement',
+            name='user_id',
+            field=models.ForeignKey(db_comment='Пользователь, который получил достижение.', db_index=False, help_text='Пользователь, который получил достижение.', on_delete=django.db.models.deletion.CASCADE, related_name='user_achievements', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.RunPython(check_duplicate_days, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='history',
+            constraint=models.UniqueConstraint(fields=('user_id', 'training_day'), name='unique_user_training_day'),
+        ),
+    ]
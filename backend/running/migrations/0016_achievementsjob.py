@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:19
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('running', '0015_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AchievementsJob',
+            fields=[
+                ('history', models.OneToOneField(db_comment='Тренировка, по которой проверяются достижения.', help_text='Тренировка, по которой проверяются достижения.', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='achievements_job', serialize=False, to='running.history', verbose_name='История тренировки')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает'), ('done', 'Выполнена'), ('failed', 'Ошибка')], db_comment='Статус проверки: pending, done или failed.', default='pending', help_text='Статус проверки достижений.', max_length=10, verbose_name='Статус')),
+                ('achievement_ids', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), db_comment='Id достижений, полученных за тренировку, записываются вместе с начислением.', default=list, help_text='Id достижений, полученных за тренировку.', size=None, verbose_name='Полученные достижения')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_comment='Дата постановки проверки в очередь.', help_text='Дата постановки проверки в очередь.', verbose_name='Дата постановки')),
+            ],
+            options={
+                'verbose_name': 'Проверка достижений',
+                'verbose_name_plural': 'Проверки достижений',
+            },
+        ),
+    ]
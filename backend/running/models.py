@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import HashIndex
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -22,6 +23,8 @@ class MotivationalPhrase(models.Model):
 	)
 
 	class Meta:
+		# Проверка фразы тренировки ищет её по точному совпадению текста.
+		indexes = (HashIndex(fields=("text",), name="phrase_text_hash_idx"),)
 		verbose_name = _("Мотивационная фраза")
 		verbose_name_plural = _("Мотивационные фразы")
 
@@ -68,6 +71,13 @@ class Achievement(models.Model):
 		db_comment=_("Иконка достижения."),
 		help_text=_("Иконка, представляющая достижение."),
 	)
+	icon_renditions = models.JSONField(
+		verbose_name=_("Варианты иконки"),
+		default=dict,
+		editable=False,
+		help_text=_("Уменьшенные копии иконки."),
+		db_comment=_("Имена файлов уменьшенных копий иконки и исходного файла."),
+	)
 	title = models.CharField(
 		verbose_name=_("Название достижения"),
 		max_length=100,
@@ -118,6 +128,7 @@ class UserAchievement(models.Model):
 		related_name="user_achievements",
 		help_text=_("Пользователь, который получил достижение."),
 		db_comment=_("Пользователь, который получил достижение."),
+		db_index=False,
 		null=False,
 		blank=False,
 	)
@@ -133,6 +144,15 @@ class UserAchievement(models.Model):
 	)
 
 	class Meta:
+		# Составной индекс заменяет индекс внешнего ключа user_id,
+		# дата получения включена в него для чтения без обращения к таблице.
+		indexes = (
+			models.Index(
+				fields=("user_id", "achievement_id"),
+				include=("achievement_date",),
+				name="userachievement_user_ach_idx",
+			),
+		)
 		verbose_name = _("Достижение пользователя")
 		verbose_name_plural = _("Достижения пользователей")
 
@@ -171,6 +191,13 @@ class History(models.Model):
 		blank=True,
 		null=True,
 	)
+	image_renditions = models.JSONField(
+		verbose_name=_("Варианты изображения маршрута"),
+		default=dict,
+		editable=False,
+		help_text=_("Уменьшенные копии изображения маршрута."),
+		db_comment=_("Имена файлов уменьшенных копий изображения и исходного файла."),
+	)
 	motivation_phrase = models.CharField(
 		verbose_name=_("Мотивационная фраза"),
 		max_length=150,
@@ -190,6 +217,14 @@ class History(models.Model):
 		blank=True,
 		null=True,
 	)
+	route_polyline = models.TextField(
+		verbose_name=_("Маршрут (полилиния)"),
+		help_text=_("Маршрут тренировки в компактном виде."),
+		db_comment=_("Маршрут тренировки: форма точек, поля и закодированная полилиния."),
+		editable=False,
+		blank=True,
+		null=True,
+	)
 	distance = models.FloatField(
 		verbose_name=_("Дистанция (в метрах)"),
 		help_text=_("Пройденная дистанция в метрах."),
@@ -217,14 +252,71 @@ class History(models.Model):
 		related_name="user_history",
 		help_text=_("История пользователя."),
 		db_comment=_("История пользователя."),
+		db_index=False,
 		null=False,
 		blank=False,
 	)
 
 	class Meta:
 		ordering = ("training_end",)
+		# Индексы по (user_id, training_day) и (user_id, training_start) заменяют индекс внешнего ключа user_id.
+		constraints = (models.UniqueConstraint(fields=("user_id", "training_day"), name="unique_user_training_day"),)
+		indexes = (models.Index(fields=("user_id", "training_start"), name="history_user_start_idx"),)
 		verbose_name = _("История тренировки")
 		verbose_name_plural = _("История тренировок")
 
 	def __str__(self) -> str:
 		return f"{_('История тренировки')} {self.id}"
+
+
+class AchievementsJob(models.Model):
+	"""Асинхронная проверка достижений по тренировке и её результат."""
+
+	PENDING = "pending"
+	DONE = "done"
+	FAILED = "failed"
+	STATUS_CHOICES = (
+		(PENDING, _("Ожидает")),
+		(DONE, _("Выполнена")),
+		(FAILED, _("Ошибка")),
+	)
+	# Не хранится: ожидающая проверка, которую не выполнили вовремя.
+	EXPIRED = "expired"
+
+	history = models.OneToOneField(
+		History,
+		on_delete=models.CASCADE,
+		primary_key=True,
+		verbose_name=_("История тренировки"),
+		related_name="achievements_job",
+		help_text=_("Тренировка, по которой проверяются достижения."),
+		db_comment=_("Тренировка, по которой проверяются достижения."),
+	)
+	status = models.CharField(
+		verbose_name=_("Статус"),
+		max_length=10,
+		choices=STATUS_CHOICES,
+		default=PENDING,
+		help_text=_("Статус проверки достижений."),
+		db_comment=_("Статус проверки: pending, done или failed."),
+	)
+	achievement_ids = ArrayField(
+		models.IntegerField(),
+		verbose_name=_("Полученные достижения"),
+		default=list,
+		help_text=_("Id достижений, полученных за тренировку."),
+		db_comment=_("Id достижений, полученных за тренировку, записываются вместе с начислением."),
+	)
+	created_at = models.DateTimeField(
+		verbose_name=_("Дата постановки"),
+		auto_now_add=True,
+		help_text=_("Дата постановки проверки в очередь."),
+		db_comment=_("Дата постановки проверки в очередь."),
+	)
+
+	class Meta:
+		verbose_name = _("Проверка достижений")
+		verbose_name_plural = _("Проверки достижений")
+
+	def __str__(self) -> str:
+		return f"{_('Проверка достижений')} {self.history_id}"
@@ -0,0 +1,54 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.v1.tasks import generate_renditions, offload_media
+from users.models import User
+from utils import media_offload, renditions
+from utils.achievements import ACHIEVEMENT_CATALOG
+from utils.motivation_phrase import PHRASE_TABLE
+from utils.training import TRAINING_CATALOG
+
+from .models import Achievement, Day, History, MotivationalPhrase
+
+
+@receiver((post_save, post_delete), sender=Day)
+def invalidate_training_catalog(**kwargs) -> None:
+	"""
+	Сбрасывает кэш плана тренировок после фиксации изменения дня.
+	Сброс внутри транзакции позволил бы параллельному чтению закэшировать
+	под новой версией ещё не зафиксированные, старые данные.
+	"""
+	transaction.on_commit(TRAINING_CATALOG.invalidate)
+
+
+@receiver((post_save, post_delete), sender=MotivationalPhrase)
+def invalidate_phrase_table(**kwargs) -> None:
+	"""Сбрасывает кэш фраз после фиксации изменения фразы."""
+	transaction.on_commit(PHRASE_TABLE.invalidate)
+
+
+@receiver((post_save, post_delete), sender=Achievement)
+def invalidate_achievement_catalog(**kwargs) -> None:
+	"""Сбрасывает кэш справочника достижений после фиксации изменения достижения."""
+	transaction.on_commit(ACHIEVEMENT_CATALOG.invalidate)
+
+
+@receiver(post_save, sender=History)
+@receiver(post_save, sender=Achievement)
+@receiver(post_save, sender=User)
+def schedule_renditions(sender, instance, raw=False, **kwargs) -> None:
+	"""Ставит в очередь построение уменьшенных копий после смены изображения."""
+	if not raw and renditions.needs_update(instance):
+		transaction.on_commit(partial(generate_renditions.delay, sender._meta.label, instance.pk))
+
+
+@receiver(post_save, sender=History)
+@receiver(post_save, sender=Achievement)
+@receiver(post_save, sender=User)
+def schedule_offload(sender, instance, raw=False, **kwargs) -> None:
+	"""Ставит в очередь выгрузку изображения, сохранённого в локальный каталог."""
+	if not raw and media_offload.needs_offload(instance):
+		transaction.on_commit(partial(offload_media.delay, sender._meta.label, instance.pk))
@@ -41,6 +41,7 @@ class User(AbstractUser):
 		_("Количество доступных пропусков/заморозок"), default=DEFAULT_AMOUNT_OF_SKIPS
 	)
 	avatar = models.ImageField(_("Аватар"), upload_to="avatars/", null=True, blank=True)
+	avatar_renditions = models.JSONField(_("Варианты аватара"), default=dict, editable=False)
 	total_m_run = models.FloatField(_("Всего пробежал метров"), default=0)
 	timezone = models.CharField(_("Часовой пояс пользователя"), max_length=MAX_LEN_TIMEZONE, null=True, blank=True)
 	objects = CustomUserManager()
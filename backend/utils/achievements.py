@@ -1,102 +1,244 @@
-from datetime import timedelta
-from functools import partial
-
-import pytz
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from operator import attrgetter
+from types import MappingProxyType
+from typing import Callable, Mapping
+
+from django.conf import settings
 from django.db import transaction
+from django.db.models import F, Max, QuerySet
 from django.utils import timezone
 
-from running.models import Achievement, History, UserAchievement
+from running.models import Achievement, AchievementsJob, History, UserAchievement
 from users.models import User
-from utils.constants import IOS_ACHIEVEMENTS
+from utils import week_stats
+from utils.cache import VersionedCache
+from utils.constants import CATALOG_CACHE_TIMEOUT, IOS_ACHIEVEMENTS
+
+
+@dataclass(frozen=True)
+class AchievementEntry:
+	"""Неизменяемая запись справочника достижений."""
+
+	id: int
+	title: str
+	description: str
+	icon: str
+	icon_renditions: dict[str, str]
+	reward_points: int
+	recurring: bool
+
+	def to_model(self) -> Achievement:
+		"""Отдаёт экземпляр модели для сериализации и связи с UserAchievement."""
+		return Achievement(
+			id=self.id,
+			title=self.title,
+			description=self.description,
+			icon=self.icon,
+			icon_renditions=self.icon_renditions,
+			reward_points=self.reward_points,
+			recurring=self.recurring,
+		)
+
+
+def load_achievement_catalog() -> dict[int, AchievementEntry]:
+	"""Загружает из БД справочник достижений. Url иконок строятся при выдаче, так как подписанные url S3 истекают раньше кэша."""
+	return {
+		achievement.id: AchievementEntry(
+			id=achievement.id,
+			title=achievement.title,
+			description=achievement.description,
+			icon=achievement.icon.name,
+			icon_renditions=achievement.icon_renditions,
+			reward_points=achievement.reward_points,
+			recurring=achievement.recurring,
+		)
+		for achievement in Achievement.objects.order_by("id")
+	}
+
+
+ACHIEVEMENT_CATALOG = VersionedCache("achievement_catalog", load_achievement_catalog, CATALOG_CACHE_TIMEOUT)
+
+
+def get_achievement_catalog() -> Mapping[int, AchievementEntry]:
+	"""Отдаёт закэшированный справочник достижений {id: запись} только для чтения."""
+	return MappingProxyType(ACHIEVEMENT_CATALOG.get())
+
+
+def get_owned_achievement_ids(user: User) -> frozenset[int]:
+	"""Отдаёт id достижений, уже полученных пользователем."""
+	return frozenset(UserAchievement.objects.filter(user_id=user).values_list("achievement_id", flat=True))
+
+
+def get_user_achievement_dates(user: User) -> dict[int, datetime | None]:
+	"""
+	Отдаёт даты последнего получения достижений пользователем {id достижения: дата}.
+	Один запрос по покрывающему индексу UserAchievement(user_id, achievement_id), без соединения со справочником.
+	"""
+	return dict(_user_achievement_dates_queryset(user))
+
+
+async def aget_user_achievement_dates(user: User) -> dict[int, datetime | None]:
+	"""Асинхронная версия get_user_achievement_dates."""
+	return {achievement_id: last_date async for achievement_id, last_date in _user_achievement_dates_queryset(user)}
+
+
+def _user_achievement_dates_queryset(user: User) -> QuerySet:
+	return (
+		UserAchievement.objects.filter(user_id=user)
+		.values("achievement_id")
+		.annotate(last_date=Max("achievement_date"))
+		.values_list("achievement_id", "last_date")
+		.order_by()
+	)
+
+
+def get_user_achievements(user: User) -> list[dict]:
+	"""
+	Отдаёт справочник достижений, упорядоченный по id, с датой и флагом получения
+	пользователем. Справочник берётся из кэша, из БД читаются только даты пользователя.
+	"""
+	return build_user_achievements(get_user_achievement_dates(user))
+
+
+def build_user_achievements(dates: dict[int, datetime | None]) -> list[dict]:
+	"""Собирает список достижений пользователя из справочника и дат получения."""
+	return [
+		{
+			"id": entry.id,
+			"icon": entry.icon,
+			"icon_renditions": entry.icon_renditions,
+			"title": entry.title,
+			"description": entry.description,
+			"reward_points": entry.reward_points,
+			"achievement_date": dates.get(entry.id),
+			"received": entry.id in dates,
+		}
+		for entry in sorted(get_achievement_catalog().values(), key=attrgetter("id"))
+	]
+
+
+@dataclass(frozen=True)
+class AchievementContext:
+	"""Данные для проверки достижений, загружаемые один раз за сохранение тренировки."""
+
+	user: User
+	history: History | None
+	day_number: int | None
+	cities: frozenset
+	first_training_cities: frozenset | None
+	count_training_current_week: int
+	total_m_run: float
+
+	@classmethod
+	def build(cls, user: User, history: History = None) -> "AchievementContext":
+		"""Собирает контекст фиксированным числом запросов."""
+		day_number = history.training_day_id if history else None
+		first_training_cities = None
+		if day_number is not None and day_number > 1:
+			first_training_cities = frozenset(
+				History.objects.filter(user_id=user).order_by("training_start").values_list("cities", flat=True).first()
+				or ()
+			)
+		return cls(
+			user=user,
+			history=history,
+			day_number=day_number,
+			cities=frozenset(history.cities) if history else frozenset(),
+			first_training_cities=first_training_cities,
+			count_training_current_week=get_count_training_current_week(user),
+			total_m_run=user.total_m_run,
+		)
 
 
-def tourist(user: User, history: History = None) -> bool:
+def tourist(context: AchievementContext) -> bool:
 	"""Проверка достижения Турист."""
-	if history.training_day.day_number == 1:
+	if context.first_training_cities is None:
 		return False
-	city_last_training = set(history.cities)
-	city_first_training = set(History.objects.filter(user_id=user).order_by("training_start").first().cities)
-	return not city_last_training.issubset(city_first_training)
+	return not context.cities.issubset(context.first_training_cities)
 
 
-def traveler(user: User, history: History = None) -> bool:
+def traveler(context: AchievementContext) -> bool:
 	"""Проверка достижения Путешественник."""
-	if history is None:
-		return False
-	return len(set(history.cities)) >= 3
+	return len(context.cities) >= 3
 
 
-def equator(user: User, history: History = None) -> bool:
+def equator(context: AchievementContext) -> bool:
 	"""Проверка достижения Экватор"""
 
-	if history is None:
-		return False
-	return history.training_day.day_number == 50
+	return context.day_number == 50
 
 
 def get_count_training_current_week(user: User) -> int:
 	"""Возвращает количество пройденных тренировок на текущей неделе."""
-	date_now = timezone.localtime(timezone=pytz.timezone(user.timezone))
-	date_now_number_day_week = date_now.weekday()
-	date_start_current_week = (date_now - timedelta(days=date_now_number_day_week)).replace(
-		hour=0, minute=0, second=0, microsecond=0
-	)
-	return History.objects.filter(user_id=user, training_start__range=[date_start_current_week, date_now]).count()
+	return week_stats.get_count_training_week(user)
 
 
-def persistent(user: User, history: History) -> bool:
+def persistent(context: AchievementContext) -> bool:
 	"""Проверка достижения Упорный."""
-	return get_count_training_current_week(user) == 4
+	return context.count_training_current_week == 4
 
 
-def machine(user: User, history: History) -> bool:
+def machine(context: AchievementContext) -> bool:
 	"""Проверка достижения Машина."""
 
-	return get_count_training_current_week(user) == 5
+	return context.count_training_current_week == 5
 
 
-def validate_n_km_club(km_club_amount: int, user: User, history: History = None) -> bool:
-	"""Проверка достижений клуб N километров."""
+def km_run(context: AchievementContext) -> float:
+	"""Всего пробежано километров."""
+	return context.total_m_run // 1000
 
-	return user.total_m_run // 1000 >= km_club_amount
 
+def trainings_done(context: AchievementContext) -> int:
+	"""Количество пройденных тренировок по номеру дня последней."""
+	return context.day_number or 0
 
-def n_km_club(km_club_amount: int) -> callable:
-	"""Используем partial, чтобы не плодить кучу одинаковых ф-ций."""
 
-	return partial(validate_n_km_club, km_club_amount=km_club_amount)
+@dataclass(frozen=True)
+class ThresholdFamily:
+	"""Семейство пороговых достижений: метрика контекста и пороги {id достижения: порог}."""
 
+	metric: Callable[[AchievementContext], float]
+	thresholds: dict[int, float]
 
-def validate_goblet(amount_of_trainings: int, user: User, history: History = None) -> bool:
-	if not history:
-		return False
-	return history.training_day.day_number >= amount_of_trainings
 
+class ThresholdIndex:
+	"""Индекс пороговых достижений.
+	Для каждого семейства хранит пороги по возрастанию и через bisect
+	находит все достижения, порог которых достигнут значением метрики,
+	не перебирая остальные. Новые семейства добавляются в THRESHOLD_FAMILIES."""
+
+	def __init__(self, families: tuple[ThresholdFamily, ...]) -> None:
+		self._families = []
+		for family in families:
+			pairs = sorted((threshold, achievement_id) for achievement_id, threshold in family.thresholds.items())
+			self._families.append((family.metric, tuple(pair[0] for pair in pairs), tuple(pair[1] for pair in pairs)))
 
-def goblet(amount_of_trainings: int) -> callable:
-	"""Валидатор достижения кубок со звездами."""
+	def reached(self, context: AchievementContext) -> set[int]:
+		"""Отдаёт id достижений, пороги которых достигнуты."""
+		achievement_ids = set()
+		for metric, thresholds, ids in self._families:
+			achievement_ids.update(ids[: bisect_right(thresholds, metric(context))])
+		return achievement_ids
 
-	return partial(validate_goblet, amount_of_trainings=amount_of_trainings)
 
+KM_CLUB = ThresholdFamily(  # Клуб N км.
+	metric=km_run,
+	thresholds={4: 20, 5: 50, 6: 100, 7: 150, 8: 200, 9: 300, 10: 500, 11: 1000},
+)
+GOBLET = ThresholdFamily(  # Кубок со звездами - 1, 3 тренировки ... Большой кубок - 100 тренировок
+	metric=trainings_done,
+	thresholds={12: 3, 13: 10, 14: 30, 15: 50, 16: 70, 17: 100},
+)
+THRESHOLD_FAMILIES = (KM_CLUB, GOBLET)
+THRESHOLD_INDEX = ThresholdIndex(THRESHOLD_FAMILIES)
 
 VALIDATORS = {
 	1: persistent,  # Упорный
 	2: machine,  # Машина
 	3: equator,  # Экватор
-	4: n_km_club(20),  # Клуб N км.
-	5: n_km_club(50),
-	6: n_km_club(100),
-	7: n_km_club(150),
-	8: n_km_club(200),
-	9: n_km_club(300),
-	10: n_km_club(500),
-	11: n_km_club(1000),
-	12: goblet(3),  # Кубок со звездами - 1, 3 тренировки
-	13: goblet(10),
-	14: goblet(30),
-	15: goblet(50),
-	16: goblet(70),
-	17: goblet(100),  # Большой кубок со звездами - 100 тренировок
 	21: tourist,  # Турист
 	22: traveler,  # Путешественник
 }
@@ -104,7 +246,8 @@ VALIDATORS = {
 
 class AchievementUpdater:
 	"""По пользователю и данным из запроса обновляет достижения.
-	Проверяет по списку валидаторов для всех незавершенных ачивок,
+	Загружает контекст проверки один раз и передаёт его валидаторам.
+	Проверяет по индексу порогов и списку валидаторов все незавершенные ачивки,
 	если находит новую выполненную, добавляет в список. Обновляет базу.
 	Метод (свойство) new_achievements вызванный после update_achievements()
 	вернет список свежеполученных ачивок для дальнейшей десериализации.
@@ -113,17 +256,20 @@ class AchievementUpdater:
 	def __init__(self, user, ios_achievements: list[int] = None, history: History = None) -> None:
 		self._user = user
 		self._history = history
+		self._context = None
+		self._catalog = get_achievement_catalog()
 		self._new_achievements = []
 		self._unfinished_achievements = None
 		self._new_ios_achievements = None
 		if ios_achievements and isinstance(ios_achievements, list):
-			self._new_ios_achievements = list(
-				Achievement.objects.filter(
-					id__in=[_id for _id in map(int, ios_achievements) if _id in IOS_ACHIEVEMENTS]
-				)
-			)
+			self._new_ios_achievements = [
+				self._catalog[_id].to_model()
+				for _id in dict.fromkeys(map(int, ios_achievements))
+				if _id in IOS_ACHIEVEMENTS and _id in self._catalog
+			]
 
 	def update_achievements(self):
+		self._context = AchievementContext.build(self._user, self._history)
 		self._query_unfinished_achievements()
 		self._check_for_new_backend_achievements()
 		self._check_for_new_ios_achievements()
@@ -146,19 +292,21 @@ class AchievementUpdater:
 		self._user.amount_of_skips += rewards
 		with transaction.atomic():
 			if rewards > 0:
-				self._user.save()
+				User.objects.filter(pk=self._user.pk).update(amount_of_skips=F("amount_of_skips") + rewards)
 			UserAchievement.objects.filter(
-				user_id=self._user, achievement_id__in=self._new_achievements, achievement_id__recurring=True
+				user_id=self._user,
+				achievement_id__in=[achievement.id for achievement in self._new_achievements if achievement.recurring],
 			).delete()
 			UserAchievement.objects.bulk_create(user_achievements)
 
 	def _check_for_new_backend_achievements(self):
 		"""Проверка на выполнение достижений"""
 
-		for achievement in self._unfinished_achievements:
-			validator = VALIDATORS.get(achievement.id)
-			if validator is not None and validator(user=self._user, history=self._history):
-				self._new_achievements.append(achievement)
+		reached = THRESHOLD_INDEX.reached(self._context)
+		for achievement_id in sorted(self._unfinished_achievements, key=lambda _id: self._catalog[_id].title):
+			validator = VALIDATORS.get(achievement_id)
+			if achievement_id in reached or (validator is not None and validator(self._context)):
+				self._new_achievements.append(self._catalog[achievement_id].to_model())
 
 	def _check_for_new_ios_achievements(self):
 		"""Добавление внешних достиженией"""
@@ -166,16 +314,16 @@ class AchievementUpdater:
 			self._new_achievements.extend(self._new_ios_achievements)
 
 	def _query_unfinished_achievements(self):
-		"""Извлечение неполученных ачивок"""
+		"""Извлечение id неполученных ачивок: разовые без уже полученных и все многоразовые."""
 
-		non_ios_achievements = Achievement.objects.exclude(id__in=IOS_ACHIEVEMENTS).prefetch_related(
-			"user_achievements"
-		)
-		recurring_non_ios = non_ios_achievements.filter(recurring=True)
-		unfinished_non_ios = non_ios_achievements.exclude(
-			id__in=UserAchievement.objects.filter(user_id=self._user.id).values("achievement_id")
-		)
-		self._unfinished_achievements = unfinished_non_ios | recurring_non_ios
+		owned = get_owned_achievement_ids(self._user)
+		non_ios = self._catalog.keys() - IOS_ACHIEVEMENTS
+		recurring = {_id for _id in non_ios if self._catalog[_id].recurring}
+		self._unfinished_achievements = frozenset((non_ios - owned) | recurring)
+
+	@property
+	def context(self):
+		return self._context
 
 	@property
 	def unfinished_achievements(self):
@@ -186,3 +334,38 @@ class AchievementUpdater:
 		"""Полный список свежих ачивок для десериализации."""
 
 		return self._new_achievements
+
+
+def get_achievements_job_status(job: AchievementsJob) -> str:
+	"""Статус проверки. Ожидающая дольше ACHIEVEMENTS_JOB_TIMEOUT_SECONDS считается просроченной."""
+	timeout = timedelta(seconds=settings.ACHIEVEMENTS_JOB_TIMEOUT_SECONDS)
+	if job.status == AchievementsJob.PENDING and timezone.now() - job.created_at > timeout:
+		return AchievementsJob.EXPIRED
+	return job.status
+
+
+def run_achievements_job(history_id: int, ios_achievements: list[int] | None = None) -> list[int]:
+	"""
+	Проверяет достижения по сохранённой тренировке вне запроса.
+	Идемпотентна по id истории: отметка о выполнении и id ачивок записываются в AchievementsJob
+	в одной транзакции с начислением, повторный запуск отдаёт сохранённый результат.
+	Параллельный запуск с тем же id ждёт блокировку строки проверки. При ошибке проверка
+	помечается неудачной, начисление откатывается.
+	"""
+	try:
+		with transaction.atomic():
+			job, _ = AchievementsJob.objects.select_for_update().get_or_create(history_id=history_id)
+			if job.status == AchievementsJob.DONE:
+				return job.achievement_ids
+			history = History.objects.select_related("user_id").get(pk=history_id)
+			updater = AchievementUpdater(history.user_id, ios_achievements, history)
+			updater.update_achievements()
+			job.status = AchievementsJob.DONE
+			job.achievement_ids = [achievement.id for achievement in updater.new_achievements]
+			job.save(update_fields=("status", "achievement_ids"))
+	except Exception:
+		AchievementsJob.objects.filter(history_id=history_id, status=AchievementsJob.PENDING).update(
+			status=AchievementsJob.FAILED
+		)
+		raise
+	return job.achievement_ids
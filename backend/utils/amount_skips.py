@@ -1,16 +1,16 @@
 from datetime import datetime, timedelta
 
-import pytz
-
 from users.models import User
 
+from .localization import get_timezone
+
 
 def get_date_activity(user: User, user_timezone: str) -> datetime:
 	"""Отдаёт дату последней активности в виде тренировки или заморозки."""
 	date_activity: datetime = max(
 		[date for date in [user.date_last_skips, user.last_completed_training.training_start] if date is not None]
 	)
-	return date_activity.astimezone(pytz.timezone(user_timezone))
+	return date_activity.astimezone(get_timezone(user_timezone))
 
 
 def counts_missed_days(user: User, user_timezone: str, now: datetime) -> tuple[int, datetime, int]:
@@ -0,0 +1,60 @@
+import threading
+import time
+from typing import Any, Callable
+
+from django.core.cache import cache
+
+
+class VersionedCache:
+	"""Двухуровневый кэш редко меняющихся справочников.
+	Хранит снимок данных в памяти процесса и копию в Redis. Оба уровня
+	помечены номером версии, который хранится в Redis отдельным ключом,
+	поэтому актуальность снимка проверяется одним запросом к Redis.
+	Метод invalidate() увеличивает версию и вызывается из сигналов моделей."""
+
+	def __init__(self, key: str, loader: Callable[[], Any], timeout: int | None = None) -> None:
+		self._key = key
+		self._loader = loader
+		self._timeout = timeout
+		self._version = None
+		self._data = None
+		self._lock = threading.Lock()
+
+	@property
+	def version_key(self) -> str:
+		return f"{self._key}:version"
+
+	def data_key(self, version: int) -> str:
+		return f"{self._key}:data:{version}"
+
+	def get(self) -> Any:
+		"""Отдаёт актуальный снимок данных."""
+		version = self._get_version()
+		if version == self._version:
+			return self._data
+		with self._lock:
+			if version == self._version:
+				return self._data
+			data = cache.get(self.data_key(version))
+			if data is None:
+				data = self._loader()
+				cache.set(self.data_key(version), data, self._timeout)
+			self._version, self._data = version, data
+		return data
+
+	def invalidate(self) -> None:
+		"""Увеличивает версию, делая устаревшими снимки во всех процессах."""
+		try:
+			cache.incr(self.version_key)
+		except ValueError:
+			self._get_version()
+
+	def _get_version(self) -> int:
+		"""Отдаёт текущую версию, создавая её при отсутствии.
+		Начальная версия берётся из времени, чтобы после очистки Redis
+		не совпасть со снимками, оставшимися в памяти процессов."""
+		version = cache.get(self.version_key)
+		if version is None:
+			cache.add(self.version_key, time.time_ns(), None)
+			version = cache.get(self.version_key)
+		return version
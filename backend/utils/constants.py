@@ -8,3 +8,42 @@ IOS_ACHIEVEMENTS = (
 	26,  # Афтердарк
 	27,  # Сноураннер
 )
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+WEEK_STATS_TIMEOUT = 60 * 60 * 24 * 15
+
+# Модели с загружаемыми изображениями и их поля.
+IMAGE_FIELDS = {
+	"running.History": "image",
+	"running.Achievement": "icon",
+	"users.User": "avatar",
+}
+
+# Наибольшая сторона уменьшенных копий изображений в пикселях.
+IMAGE_RENDITIONS = {
+	"detail": 1080,
+	"thumbnail": 320,
+}
+
+RENDITION_FORMAT = "WEBP"
+
+RENDITION_QUALITY = 80
+
+EARTH_RADIUS_M = 6_371_008.8
+
+# Поля точки маршрута в порядке столбцов полилинии.
+ROUTE_FIELDS = ("latitude", "longitude", "altitude", "timestamp")
+
+# Наибольшее число знаков после запятой, сохраняемых в полилинии.
+# Более точные значения округляются, исходный маршрут тогда хранится и в JSON.
+ROUTE_MAX_PRECISION = 10
+
+# Окно сглаживания скорости по маршруту в секундах.
+ROUTE_SPEED_WINDOW_S = 10
+
+# Скорость в м/с, ниже которой участок маршрута считается остановкой.
+ROUTE_MOVING_SPEED_MS = 0.5
+
+# Перевод скорости из м/с в км/ч, в которых клиент присылает скорости тренировки.
+SPEED_FACTOR_KMH = 3.6
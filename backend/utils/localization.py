@@ -0,0 +1,40 @@
+from datetime import datetime, tzinfo
+from functools import lru_cache
+
+import pytz
+from django.http import HttpRequest
+
+
+@lru_cache(maxsize=None)
+def get_timezone(name: str) -> tzinfo:
+	"""Отдаёт часовой пояс по имени, закэшированный на процесс."""
+	return pytz.timezone(name)
+
+
+class Localizer:
+	"""Переводит даты в часовой пояс пользователя и форматирует их."""
+
+	def __init__(self, timezone_name: str) -> None:
+		self.timezone_name = timezone_name
+		self.timezone = get_timezone(timezone_name)
+
+	def localize(self, value: datetime) -> datetime:
+		return value.astimezone(self.timezone)
+
+	def format(self, value: datetime, date_format: str) -> str:
+		return value.astimezone(self.timezone).strftime(date_format)
+
+	def format_pair(self, value: datetime, date_format: str, datetime_format: str) -> list[str]:
+		"""Форматирует дату двумя форматами за один перевод в часовой пояс."""
+		local = value.astimezone(self.timezone)
+		return [local.strftime(date_format), local.strftime(datetime_format)]
+
+
+def get_localizer(request: HttpRequest) -> Localizer:
+	"""Отдаёт Localizer часового пояса пользователя запроса, один на запрос."""
+	timezone_name = request.user.timezone
+	localizer = getattr(request, "_localizer", None)
+	if localizer is None or localizer.timezone_name != timezone_name:
+		localizer = Localizer(timezone_name)
+		request._localizer = localizer
+	return localizer
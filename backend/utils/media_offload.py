@@ -0,0 +1,58 @@
+from django.apps import apps
+from django.core.files.storage import Storage
+from django.db import models, transaction
+from django.db.models.fields.files import FieldFile
+
+from config.staged_storage import StagedMediaStorage
+
+from .constants import IMAGE_FIELDS
+
+
+def is_staged(file: FieldFile) -> bool:
+	"""Проверяет, ждёт ли файл выгрузки в удалённое хранилище."""
+	return isinstance(file.storage, StagedMediaStorage) and file.storage.is_staged(file.name)
+
+
+def get_persistent_storage(storage: Storage) -> Storage:
+	"""Отдаёт хранилище, куда файлы пишутся сразу, минуя локальный каталог."""
+	return storage.remote if isinstance(storage, StagedMediaStorage) else storage
+
+
+def needs_offload(instance: models.Model) -> bool:
+	"""Проверяет, есть ли у объекта изображение, ждущее выгрузки."""
+	return is_staged(getattr(instance, IMAGE_FIELDS[instance._meta.label]))
+
+
+def offload(model_label: str, pk: int) -> str | None:
+	"""
+	Переносит изображение объекта из локального каталога в удалённое хранилище.
+	Файл передаётся потоком вне транзакции. Путь в записи подменяется, только если
+	изображение за это время не сменилось, иначе выгруженная копия удаляется.
+	Если локального файла уже нет, а удалённая копия есть (путь в записи вернуло
+	сохранение устаревшего объекта), в запись возвращается путь удалённой копии.
+	"""
+	model = apps.get_model(model_label)
+	field_name = IMAGE_FIELDS[model_label]
+	instance = model.objects.filter(pk=pk).only(field_name).first()
+	if instance is None or not needs_offload(instance):
+		return None
+	file = getattr(instance, field_name)
+	storage = file.storage
+	uploaded = storage.local.exists(file.name)
+	if uploaded:
+		with storage.local.open(file.name, "rb") as content:
+			remote_name = storage.remote.save(storage.get_remote_name(file.name), content)
+	else:
+		remote_name = storage.get_remote_name(file.name)
+		if not storage.remote.exists(remote_name):
+			return None
+	with transaction.atomic():
+		current = model.objects.select_for_update().filter(pk=pk).only(field_name).first()
+		if current is None or getattr(current, field_name).name != file.name:
+			if uploaded:
+				storage.remote.delete(remote_name)
+			return None
+		setattr(current, field_name, remote_name)
+		current.save(update_fields=(field_name,))
+	storage.local.delete(file.name)
+	return remote_name
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.files.storage import Storage
+from django.http import HttpRequest
+from django.utils.encoding import filepath_to_uri
+from django.utils.module_loading import import_string
+
+# Имя файла, по url которого определяется префикс хранилища.
+PROBE_NAME = "url-prefix-probe"
+
+
+def get_url_prefix(storage: Storage) -> str | None:
+	"""
+	Отдаёт общий префикс url файлов хранилища.
+	None, если url нельзя собрать конкатенацией, например для подписанных ссылок.
+	"""
+	url = storage.url(PROBE_NAME)
+	if url.endswith(PROBE_NAME):
+		return url[: -len(PROBE_NAME)]
+	return None
+
+
+def get_absolute_url_prefix(storage: Storage, request: HttpRequest) -> str | None:
+	"""Отдаёт абсолютный префикс url хранилища, закэшированный на хранилище по хосту запроса."""
+	host = f"{request.scheme}://{request.get_host()}"
+	prefixes = getattr(storage, "_absolute_url_prefixes", None)
+	if prefixes is None:
+		prefixes = {}
+		storage._absolute_url_prefixes = prefixes
+	if host not in prefixes:
+		prefix = get_url_prefix(storage)
+		prefixes[host] = None if prefix is None else request.build_absolute_uri(prefix)
+	return prefixes[host]
+
+
+class StorageURLBuilder:
+	"""Собирает абсолютный url файла через storage.url и build_absolute_uri."""
+
+	def __init__(self, request: HttpRequest) -> None:
+		self._request = request
+
+	def build(self, storage: Storage, name: str) -> str:
+		return self._request.build_absolute_uri(storage.url(name))
+
+
+class PrefixURLBuilder(StorageURLBuilder):
+	"""
+	Собирает абсолютный url файла конкатенацией с префиксом хранилища.
+	Хранилища из нескольких частей (StagedMediaStorage) отдают нужную часть
+	через get_storage(name). Для хранилищ без общего префикса используется storage.url.
+	"""
+
+	def __init__(self, request: HttpRequest) -> None:
+		super().__init__(request)
+		self._prefixes = {}
+
+	def build(self, storage: Storage, name: str) -> str:
+		if hasattr(storage, "get_storage"):
+			storage = storage.get_storage(name)
+		try:
+			prefix = self._prefixes[storage]
+		except KeyError:
+			prefix = self._prefixes[storage] = get_absolute_url_prefix(storage, self._request)
+		if prefix is None:
+			return super().build(storage, name)
+		return prefix + filepath_to_uri(name)
+
+
+def get_url_builder(request: HttpRequest) -> StorageURLBuilder:
+	"""Отдаёт построитель url из настройки MEDIA_URL_BUILDER, один на запрос."""
+	builder = getattr(request, "_media_url_builder", None)
+	if builder is None:
+		builder = import_string(settings.MEDIA_URL_BUILDER)(request)
+		request._media_url_builder = builder
+	return builder
@@ -1,25 +1,20 @@
-from datetime import timedelta
+from functools import lru_cache
 
-import pytz
 from django.db.models.query import QuerySet
 from django.utils import timezone
 
-from running.models import History, MotivationalPhrase
+from running.models import MotivationalPhrase
 from users.models import User
 
+from . import week_stats
+from .cache import VersionedCache
+from .constants import CATALOG_CACHE_TIMEOUT
+from .localization import get_timezone
+
 
 def get_count_training_last_week(user: User) -> int:
 	"""Возвращает кол-во тренировок на прошлой неделе."""
-	date_now = timezone.localtime(timezone=pytz.timezone(user.timezone)).replace(
-		hour=0, minute=0, second=0, microsecond=0
-	)
-	date_now_number_day_week = date_now.weekday() + 1
-	date_end_last_week = date_now - timedelta(days=date_now_number_day_week)
-	date_start_last_week = date_end_last_week - timedelta(days=6)
-	date_end_last_week += timedelta(hours=23, minutes=59, seconds=59)
-	return History.objects.filter(
-		user_id=user, training_start__range=[date_start_last_week, date_end_last_week]
-	).count()
+	return week_stats.get_count_training_week(user, weeks_ago=1)
 
 
 def get_rest_phrases_to_replace(rest_phrases: list, days_to_replace: tuple) -> QuerySet:
@@ -33,17 +28,48 @@ def get_rest_phrases_to_replace(rest_phrases: list, days_to_replace: tuple) -> Q
 	return replacement_phrases
 
 
-def get_phrases() -> tuple:
-	"""Отдаёт фразы отдыха и мотивации."""
-	phrases = MotivationalPhrase.objects.all()
+def load_phrase_table() -> tuple[tuple[str, ...], tuple[str, ...]]:
+	"""Загружает из БД фразы мотивации и отдыха."""
 	motivational_phrases = []
 	rest_phrases = []
-	for phrase in phrases:
-		if phrase.rest:
-			rest_phrases.append(phrase.text)
+	for text, rest in MotivationalPhrase.objects.order_by("id").values_list("text", "rest"):
+		if rest:
+			rest_phrases.append(text)
 			continue
-		motivational_phrases.append(phrase.text)
-	return motivational_phrases, rest_phrases
+		motivational_phrases.append(text)
+	return tuple(motivational_phrases), tuple(rest_phrases)
+
+
+PHRASE_TABLE = VersionedCache("motivational_phrases", load_phrase_table, CATALOG_CACHE_TIMEOUT)
+
+
+def get_phrase_table() -> tuple[tuple[str, ...], tuple[str, ...]]:
+	"""Отдаёт закэшированные неизменяемые кортежи фраз мотивации и отдыха."""
+	return PHRASE_TABLE.get()
+
+
+# Множество текстов фраз и снимок PHRASE_TABLE, из которого оно построено.
+_phrase_set: tuple[tuple | None, frozenset[str]] = (None, frozenset())
+
+
+def get_phrase_set() -> frozenset[str]:
+	"""
+	Отдаёт множество текстов всех фраз для проверки принадлежности без запроса к БД.
+	Строится один раз на снимок PHRASE_TABLE и обновляется вместе с ним.
+	"""
+	global _phrase_set
+	table = get_phrase_table()
+	snapshot, phrases = _phrase_set
+	if snapshot is not table:
+		phrases = frozenset(table[0]) | frozenset(table[1])
+		_phrase_set = (table, phrases)
+	return phrases
+
+
+def get_phrases() -> tuple:
+	"""Отдаёт фразы отдыха и мотивации."""
+	motivational_phrases, rest_phrases = get_phrase_table()
+	return list(motivational_phrases), list(rest_phrases)
 
 
 def replaces_phrases(motivational_phrases: list, days_to_replace: tuple, rest_phrases: list) -> None:
@@ -54,54 +80,84 @@ def replaces_phrases(motivational_phrases: list, days_to_replace: tuple, rest_ph
 		motivational_phrases[days_to_replace[i]] = rest_phrases[i]
 
 
-def get_dynamic_list_motivation_phrase(user: User) -> list:
-	"""Формирует динамический список мотивационных фраз
-	в зависимости от истории тренировок."""
-	motivational_phrases, rest_phrases = get_phrases()
-	last_training = user.last_completed_training
-	if not last_training:
-		return motivational_phrases
-	count_training = get_count_training_last_week(user)
-	if count_training < 4:
-		return motivational_phrases
-	user_timezone = pytz.timezone(user.timezone)
-	date_now_number_day_week = timezone.localtime(timezone=user_timezone).weekday() + 1
-	day_last_training = last_training.training_day.day_number
+@lru_cache(maxsize=4096)
+def _get_rest_days(day_last_training: int, count_training: int, number_day_week: int, sunday_training: bool) -> tuple:
 	if count_training == 4:
-		shift_wednesday = 3 - date_now_number_day_week
-		shift_saturday = 6 - date_now_number_day_week
+		shift_wednesday = 3 - number_day_week
+		shift_saturday = 6 - number_day_week
 		if shift_wednesday >= 0 and shift_saturday >= 0:
-			days_to_replace = (day_last_training + shift_wednesday, day_last_training + shift_saturday)
-			replacement_phrases = get_rest_phrases_to_replace(rest_phrases, days_to_replace)
-			replaces_phrases(motivational_phrases, days_to_replace, replacement_phrases)
-		elif shift_saturday >= 0:
-			days_to_replace = (day_last_training + shift_saturday,)
-			replacement_phrases = get_rest_phrases_to_replace(rest_phrases, days_to_replace)
-			replaces_phrases(motivational_phrases, days_to_replace, replacement_phrases)
-		return motivational_phrases
-
-	shift_first_rest = 1 - date_now_number_day_week
-	shift_second_rest = 3 - date_now_number_day_week
-	shift_third_rest = 5 - date_now_number_day_week
-	date_last_training_week = last_training.training_start.astimezone(user_timezone).weekday() + 1
-	if date_last_training_week == 7:
+			return (day_last_training + shift_wednesday, day_last_training + shift_saturday)
+		if shift_saturday >= 0:
+			return (day_last_training + shift_saturday,)
+		return ()
+
+	shift_first_rest = 1 - number_day_week
+	shift_second_rest = 3 - number_day_week
+	shift_third_rest = 5 - number_day_week
+	if sunday_training:
 		shift_first_rest += 1
 		shift_second_rest += 1
 		shift_third_rest += 1
 	if shift_first_rest >= 0 and shift_second_rest >= 0 and shift_third_rest >= 0:
-		days_to_replace = (
+		return (
 			day_last_training + shift_first_rest,
 			day_last_training + shift_second_rest,
 			day_last_training + shift_third_rest,
 		)
-		replacement_phrases = get_rest_phrases_to_replace(rest_phrases, days_to_replace)
-		replaces_phrases(motivational_phrases, days_to_replace, replacement_phrases)
-	elif shift_second_rest >= 0 and shift_third_rest >= 0:
-		days_to_replace = (day_last_training + shift_second_rest, day_last_training + shift_third_rest)
-		replacement_phrases = get_rest_phrases_to_replace(rest_phrases, days_to_replace)
-		replaces_phrases(motivational_phrases, days_to_replace, replacement_phrases)
-	elif shift_third_rest >= 0:
-		days_to_replace = (day_last_training + shift_third_rest,)
-		replacement_phrases = get_rest_phrases_to_replace(rest_phrases, days_to_replace)
-		replaces_phrases(motivational_phrases, days_to_replace, replacement_phrases)
+	if shift_second_rest >= 0 and shift_third_rest >= 0:
+		return (day_last_training + shift_second_rest, day_last_training + shift_third_rest)
+	if shift_third_rest >= 0:
+		return (day_last_training + shift_third_rest,)
+	return ()
+
+
+def get_rest_days(
+	day_last_training: int, count_training_last_week: int, weekday: int, last_training_weekday: int
+) -> tuple:
+	"""
+	Отдаёт позиции в списке фраз, которые заменяются фразами отдыха.
+	Дни недели передаются как в datetime.weekday(). Результат мемоизирован,
+	аргументы приводятся к значениям, влияющим на расписание отдыха.
+	"""
+	if count_training_last_week < 4:
+		return ()
+	return _get_rest_days(day_last_training, min(count_training_last_week, 5), weekday + 1, last_training_weekday == 6)
+
+
+def get_rest_phrase_overlay(user: User) -> dict[int, str]:
+	"""
+	Отдаёт замены фраз мотивации фразами отдыха в виде {позиция: фраза}
+	для наложения на общий список фраз.
+	"""
+	last_training = user.last_completed_training
+	if not last_training:
+		return {}
+	count_training = get_count_training_last_week(user)
+	if count_training < 4:
+		return {}
+	user_timezone = get_timezone(user.timezone)
+	days_to_replace = get_rest_days(
+		last_training.training_day_id,
+		count_training,
+		timezone.localtime(timezone=user_timezone).weekday(),
+		last_training.training_start.astimezone(user_timezone).weekday(),
+	)
+	if not days_to_replace:
+		return {}
+	_, rest_phrases = get_phrase_table()
+	replacement_phrases = get_rest_phrases_to_replace(rest_phrases, days_to_replace)
+	overlay = {}
+	for day, phrase in zip(days_to_replace, replacement_phrases):
+		if day >= 100:
+			break
+		overlay[day] = phrase
+	return overlay
+
+
+def get_dynamic_list_motivation_phrase(user: User) -> list:
+	"""Формирует динамический список мотивационных фраз
+	в зависимости от истории тренировок."""
+	motivational_phrases = list(get_phrase_table()[0])
+	for day, phrase in get_rest_phrase_overlay(user).items():
+		motivational_phrases[day] = phrase
 	return motivational_phrases
@@ -0,0 +1,119 @@
+import posixpath
+from io import BytesIO
+from typing import Iterable
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.db import models, transaction
+from django.db.models.fields.files import FieldFile
+from PIL import Image, ImageOps
+
+from .constants import IMAGE_FIELDS, IMAGE_RENDITIONS, RENDITION_FORMAT, RENDITION_QUALITY
+from .media_offload import get_persistent_storage, is_staged
+
+
+def get_renditions_field(field_name: str) -> str:
+	"""Отдаёт имя JSON-поля с вариантами для поля изображения."""
+	return f"{field_name}_renditions"
+
+
+def get_rendition_name(name: str, rendition: str) -> str:
+	"""Отдаёт имя файла варианта рядом с оригиналом."""
+	root, _ = posixpath.splitext(name)
+	return f"{root}_{rendition}.{RENDITION_FORMAT.lower()}"
+
+
+def get_shared_renditions(instance: models.Model, source: str) -> dict[str, str] | None:
+	"""
+	Отдаёт варианты того же оригинала, уже построенные для другого объекта модели.
+	Один оригинал бывает у многих объектов (аватары по умолчанию).
+	"""
+	renditions_field = get_renditions_field(IMAGE_FIELDS[instance._meta.label])
+	return (
+		type(instance)
+		.objects.filter(**{f"{renditions_field}__source": source})
+		.exclude(pk=instance.pk)
+		.values_list(renditions_field, flat=True)
+		.first()
+	)
+
+
+def needs_update(instance: models.Model) -> bool:
+	"""
+	Проверяет, построены ли варианты для текущего изображения объекта.
+	Для файлов, ждущих выгрузки, варианты строятся после переноса в удалённое хранилище.
+	"""
+	field_name = IMAGE_FIELDS[instance._meta.label]
+	file = getattr(instance, field_name)
+	if is_staged(file):
+		return False
+	return (file.name or None) != getattr(instance, get_renditions_field(field_name)).get("source")
+
+
+def render_renditions(file: FieldFile) -> dict[str, str]:
+	"""
+	Строит варианты изображения и сохраняет их в хранилище оригинала.
+	Варианты строятся от большего к меньшему, каждый уменьшается из предыдущего.
+	"""
+	renditions = {"source": file.name}
+	storage = get_persistent_storage(file.storage)
+	sizes = sorted(IMAGE_RENDITIONS.items(), key=lambda item: item[1], reverse=True)
+	with file.open("rb"), Image.open(file) as original:
+		original.draft("RGB", (sizes[0][1], sizes[0][1]))
+		image = ImageOps.exif_transpose(original)
+	has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+	image = image.convert("RGBA" if has_alpha and RENDITION_FORMAT != "JPEG" else "RGB")
+	for rendition, size in sizes:
+		image.thumbnail((size, size), Image.Resampling.LANCZOS)
+		buffer = BytesIO()
+		image.save(buffer, RENDITION_FORMAT, quality=RENDITION_QUALITY)
+		name = get_rendition_name(file.name, rendition)
+		# Файл с таким именем может остаться от прошлой сборки для того же оригинала.
+		storage.delete(name)
+		renditions[rendition] = storage.save(name, ContentFile(buffer.getvalue()))
+	return renditions
+
+
+def delete_renditions(
+	instance: models.Model, storage: Storage, renditions: dict[str, str], kept: Iterable[str] = ()
+) -> None:
+	"""
+	Удаляет файлы вариантов, не трогая оригинал, файлы из kept
+	и файлы, на которые указывает другой объект с тем же оригиналом.
+	"""
+	if not renditions:
+		return
+	kept = {*kept, *(get_shared_renditions(instance, renditions["source"]) or {}).values()}
+	for rendition, name in renditions.items():
+		if rendition != "source" and name not in kept:
+			storage.delete(name)
+
+
+def update_renditions(model_label: str, pk: int) -> dict[str, str] | None:
+	"""
+	Строит и сохраняет варианты текущего изображения объекта. Если для того же
+	оригинала варианты уже есть у другого объекта, они переиспользуются.
+	Построение идёт вне транзакции; если за это время изображение сменилось,
+	построенные файлы удаляются, а новые варианты построит следующая задача.
+	"""
+	model = apps.get_model(model_label)
+	field_name = IMAGE_FIELDS[model_label]
+	renditions_field = get_renditions_field(field_name)
+	instance = model.objects.filter(pk=pk).only(field_name, renditions_field).first()
+	if instance is None or not needs_update(instance):
+		return None
+	file = getattr(instance, field_name)
+	renditions = {}
+	if file:
+		renditions = get_shared_renditions(instance, file.name) or render_renditions(file)
+	with transaction.atomic():
+		current = model.objects.select_for_update().filter(pk=pk).only(field_name, renditions_field).first()
+		if current is None or (getattr(current, field_name).name or None) != (file.name or None):
+			delete_renditions(instance, file.storage, renditions)
+			return None
+		previous = getattr(current, renditions_field)
+		setattr(current, renditions_field, renditions)
+		current.save(update_fields=(renditions_field,))
+	delete_renditions(instance, file.storage, previous, kept=renditions.values())
+	return renditions
@@ -0,0 +1,118 @@
+from dataclasses import asdict, dataclass
+from typing import Sequence
+
+import numpy as np
+
+from .constants import EARTH_RADIUS_M, ROUTE_MOVING_SPEED_MS, ROUTE_SPEED_WINDOW_S, SPEED_FACTOR_KMH
+from .routes import Route
+
+# Столбцы массива точек маршрута.
+COLUMNS = ("latitude", "longitude", "altitude", "timestamp")
+
+
+@dataclass(frozen=True)
+class RouteMetrics:
+	"""Показатели тренировки, вычисленные по маршруту. None, если в маршруте нет нужных данных."""
+
+	distance: float
+	max_speed: float | None
+	avg_speed: float | None
+	height_difference: int | None
+	moving_time: float | None
+
+	def as_history_fields(self) -> dict:
+		"""Отдаёт известные показатели под именами полей History."""
+		fields = asdict(self)
+		del fields["moving_time"]
+		return {field: value for field, value in fields.items() if value is not None}
+
+
+def route_to_array(route: Route) -> np.ndarray:
+	"""Отдаёт точки маршрута массивом (n, 4) по COLUMNS, отсутствующие поля - NaN."""
+	array = np.full((len(route.points), len(COLUMNS)), np.nan)
+	if route.points:
+		array[:, [COLUMNS.index(field) for field in route.fields]] = np.asarray(route.points, dtype=np.float64)
+	return array
+
+
+def haversine(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+	"""Расстояния в метрах между точками, координаты в радианах."""
+	a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+	return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def analyze_routes(routes: Sequence[np.ndarray]) -> list[RouteMetrics]:
+	"""
+	Вычисляет показатели пачки маршрутов за один проход по общему массиву точек.
+	Маршруты склеиваются, участки на стыках маршрутов отбрасываются,
+	суммы по маршрутам собираются через bincount.
+	Скорость сглаживается окном ROUTE_SPEED_WINDOW_S, время движения учитывает
+	участки быстрее ROUTE_MOVING_SPEED_MS. Скорости и время считаются
+	только для маршрутов с неубывающими отметками времени у всех точек.
+	"""
+	count = len(routes)
+	if not count:
+		return []
+	lengths = np.fromiter((len(route) for route in routes), dtype=np.intp, count=count)
+	starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+	data = np.concatenate([np.asarray(route, dtype=np.float64).reshape(-1, len(COLUMNS)) for route in routes])
+	ids = np.repeat(np.arange(count), lengths)
+	lat, lon = np.radians(data[:, 0]), np.radians(data[:, 1])
+	altitude, timestamp = data[:, 2], data[:, 3]
+
+	segment_ids = ids[1:]
+	same_route = segment_ids == ids[:-1]
+	segment = np.where(same_route, haversine(lat[:-1], lon[:-1], lat[1:], lon[1:]), 0.0)
+	distance = np.bincount(segment_ids, weights=segment, minlength=count)
+
+	rise = np.diff(altitude)
+	gain = np.bincount(segment_ids, weights=np.where(same_route & (rise > 0), rise, 0.0), minlength=count)
+	has_altitude = np.bincount(ids, weights=np.isfinite(altitude), minlength=count) == lengths
+
+	dt = np.diff(timestamp)
+	broken_time = np.bincount(segment_ids, weights=same_route & ~(dt >= 0), minlength=count) > 0
+	has_time = (np.bincount(ids, weights=np.isfinite(timestamp), minlength=count) == lengths) & ~broken_time
+	with np.errstate(divide="ignore", invalid="ignore"):
+		moving = same_route & has_time[segment_ids] & (dt > 0) & (segment / dt >= ROUTE_MOVING_SPEED_MS)
+	moving_time = np.bincount(segment_ids, weights=np.where(moving, dt, 0.0), minlength=count)
+	moving_distance = np.bincount(segment_ids, weights=np.where(moving, segment, 0.0), minlength=count)
+
+	# Время от начала маршрута со сдвигом на номер маршрута даёт общий возрастающий ключ
+	# для поиска начала окна. Маршруты без времени получают ключ по номеру точки.
+	point_has_time = has_time[ids]
+	first_time = np.zeros(count)
+	first_time[lengths > 0] = timestamp[starts[lengths > 0]]
+	local_time = np.where(point_has_time, timestamp - first_time[ids], np.arange(len(ids)) - starts[ids])
+	key = local_time + ids * (np.max(local_time, initial=0) + ROUTE_SPEED_WINDOW_S + 1)
+	window_start = np.searchsorted(key, key - ROUTE_SPEED_WINDOW_S, side="left")
+	travelled = np.concatenate(([0.0], np.cumsum(segment)))
+	elapsed = key - key[window_start]
+	with np.errstate(divide="ignore", invalid="ignore"):
+		speed = (travelled - travelled[window_start]) / elapsed
+	measured = point_has_time & (elapsed >= ROUTE_SPEED_WINDOW_S / 2)
+	max_speed = np.full(count, -np.inf)
+	np.maximum.at(max_speed, ids[measured], speed[measured])
+
+	metrics = []
+	for index in range(count):
+		avg_speed = None
+		if has_time[index] and moving_time[index] > 0:
+			avg_speed = float(moving_distance[index] / moving_time[index] * SPEED_FACTOR_KMH)
+		route_max_speed = None
+		if has_time[index]:
+			route_max_speed = float(max_speed[index] * SPEED_FACTOR_KMH) if np.isfinite(max_speed[index]) else avg_speed
+		metrics.append(
+			RouteMetrics(
+				distance=float(distance[index]),
+				max_speed=route_max_speed,
+				avg_speed=avg_speed,
+				height_difference=round(gain[index]) if has_altitude[index] and lengths[index] else None,
+				moving_time=float(moving_time[index]) if has_time[index] else None,
+			)
+		)
+	return metrics
+
+
+def analyze_route(route: Route) -> RouteMetrics:
+	"""Вычисляет показатели одного маршрута."""
+	return analyze_routes([route_to_array(route)])[0]
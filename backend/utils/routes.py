@@ -0,0 +1,210 @@
+import math
+from dataclasses import dataclass, replace
+from numbers import Real
+
+from .constants import EARTH_RADIUS_M, ROUTE_FIELDS, ROUTE_MAX_PRECISION
+
+# Разделитель заголовка и полилинии, символы полилинии начинаются с кода 63.
+SEPARATOR = ";"
+
+# Версия формата «1;форма;поле:точность,...;полилиния», точности полей записаны в заголовке.
+FORMAT_VERSION = "1"
+
+# Точность целочисленного поля в заголовке, такие поля декодируются в int.
+INTEGER_PRECISION = "int"
+
+
+def _encode_value(value: int) -> str:
+	"""Кодирует целое число по алгоритму Google Encoded Polyline."""
+	value = ~(value << 1) if value < 0 else value << 1
+	chunks = []
+	while value >= 0x20:
+		chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+		value >>= 5
+	chunks.append(chr(value + 63))
+	return "".join(chunks)
+
+
+def encode_polyline(points: list[tuple[float, ...]], precisions: tuple[int | None, ...]) -> str:
+	"""
+	Кодирует точки разностями соседних значений, каждое измерение со своей точностью.
+	Точность None - целые значения без масштабирования.
+	"""
+	factors = [1 if precision is None else 10**precision for precision in precisions]
+	previous = [0] * len(factors)
+	chunks = []
+	for point in points:
+		for index, (coordinate, factor) in enumerate(zip(point, factors)):
+			value = round(coordinate * factor)
+			chunks.append(_encode_value(value - previous[index]))
+			previous[index] = value
+	return "".join(chunks)
+
+
+def decode_polyline(encoded: str, precisions: tuple[int | None, ...]) -> list[tuple[float, ...]]:
+	"""Декодирует точки, закодированные encode_polyline."""
+	factors = [None if precision is None else 10**precision for precision in precisions]
+	dimensions = len(factors)
+	values = [0] * dimensions
+	points = []
+	point = []
+	value = shift = 0
+	for char in encoded:
+		byte = ord(char) - 63
+		value |= (byte & 0x1F) << shift
+		shift += 5
+		if byte >= 0x20:
+			continue
+		index = len(point)
+		values[index] += ~(value >> 1) if value & 1 else value >> 1
+		point.append(values[index] if factors[index] is None else values[index] / factors[index])
+		value = shift = 0
+		if len(point) == dimensions:
+			points.append(tuple(point))
+			point = []
+	if point or shift:
+		raise ValueError("Неполная полилиния.")
+	return points
+
+
+def field_precision(values: list[Real]) -> int | None:
+	"""
+	Наименьшее число знаков после запятой, с которым значения поля кодируются без потерь,
+	не больше ROUTE_MAX_PRECISION. None, если все значения целые.
+	"""
+	if all(isinstance(value, int) for value in values):
+		return None
+	precision = 0
+	for value in values:
+		text = repr(float(value))
+		if "e" in text or "." not in text:
+			return ROUTE_MAX_PRECISION
+		precision = max(precision, len(text.split(".")[1].rstrip("0")))
+	return min(precision, ROUTE_MAX_PRECISION)
+
+
+@dataclass(frozen=True)
+class Route:
+	"""
+	Маршрут тренировки: список точек с широтой, долготой и, при наличии,
+	высотой и временем. Хранится компактной строкой с полилинией,
+	в JSON отдаётся в той же форме, в которой пришёл от клиента.
+	"""
+
+	fields: tuple[str, ...]
+	points: list[tuple[float, ...]]
+	as_dicts: bool = True
+	# Знаков после запятой по полям, None - целочисленное поле.
+	precisions: tuple[int | None, ...] = ()
+
+	@classmethod
+	def from_json(cls, value) -> "Route | None":
+		"""
+		Разбирает маршрут из списка точек {"latitude", "longitude", ...}
+		или [широта, долгота, ...]. None, если формат не распознан.
+		"""
+		if not isinstance(value, list) or not value:
+			return None
+		first = value[0]
+		if isinstance(first, dict):
+			fields = tuple(field for field in ROUTE_FIELDS if field in first)
+			if fields[:2] != ("latitude", "longitude") or len(fields) != len(first):
+				return None
+			if not all(isinstance(point, dict) and point.keys() == first.keys() for point in value):
+				return None
+			points = [tuple(point[field] for field in fields) for point in value]
+		elif isinstance(first, list):
+			fields = ROUTE_FIELDS[: len(first)]
+			if len(fields) < 2 or len(fields) != len(first):
+				return None
+			if not all(isinstance(point, list) and len(point) == len(fields) for point in value):
+				return None
+			points = [tuple(point) for point in value]
+		else:
+			return None
+		if not all(
+			isinstance(coordinate, Real) and not isinstance(coordinate, bool) for p in points for coordinate in p
+		):
+			return None
+		precisions = tuple(field_precision(column) for column in zip(*points))
+		return cls(fields, points, as_dicts=isinstance(first, dict), precisions=precisions)
+
+	def to_json(self) -> list:
+		if self.as_dicts:
+			return [dict(zip(self.fields, point)) for point in self.points]
+		return [list(point) for point in self.points]
+
+	def encode_polyline(self) -> str:
+		return encode_polyline(self.points, self.precisions)
+
+	def encode_header(self) -> str:
+		"""Заголовок строки маршрута: версия формата, форма точек, поля и их точности."""
+		shape = "dict" if self.as_dicts else "list"
+		fields = ",".join(
+			f"{field}:{INTEGER_PRECISION if precision is None else precision}"
+			for field, precision in zip(self.fields, self.precisions)
+		)
+		return SEPARATOR.join((FORMAT_VERSION, shape, fields))
+
+	def encode(self) -> str:
+		"""Кодирует маршрут в строку «1;форма;поле:точность,...;полилиния»."""
+		return SEPARATOR.join((self.encode_header(), self.encode_polyline()))
+
+	def is_lossless(self) -> bool:
+		"""Точки, декодированные из полилинии, совпадают с исходными по значению и типу."""
+		decoded = decode_polyline(self.encode_polyline(), self.precisions)
+		return all(
+			type(coordinate) is type(restored) and coordinate == restored
+			for point, decoded_point in zip(self.points, decoded)
+			for coordinate, restored in zip(point, decoded_point)
+		)
+
+	@classmethod
+	def decode(cls, encoded: str) -> "Route":
+		route, polyline = cls.decode_header(encoded)
+		return replace(route, points=decode_polyline(polyline, route.precisions))
+
+	@classmethod
+	def decode_header(cls, encoded: str) -> tuple["Route", str]:
+		"""Разбирает только заголовок, отдаёт маршрут без точек и полилинию."""
+		version, shape, specs, polyline = encoded.split(SEPARATOR, 3)
+		if version != FORMAT_VERSION:
+			raise ValueError(f"Неизвестная версия формата маршрута: {version}.")
+		fields, precisions = zip(*(spec.split(":") for spec in specs.split(",")))
+		precisions = tuple(None if precision == INTEGER_PRECISION else int(precision) for precision in precisions)
+		return cls(tuple(fields), [], as_dicts=shape == "dict", precisions=precisions), polyline
+
+	def simplify(self, tolerance: float) -> "Route":
+		"""
+		Упрощает маршрут алгоритмом Дугласа-Пекера с допуском в метрах.
+		Точки проецируются на плоскость вокруг первой точки, крайние точки сохраняются.
+		"""
+		count = len(self.points)
+		if tolerance <= 0 or count < 3:
+			return self
+		scale_y = EARTH_RADIUS_M * math.pi / 180
+		scale_x = scale_y * math.cos(math.radians(self.points[0][0]))
+		xy = [(point[1] * scale_x, point[0] * scale_y) for point in self.points]
+		keep = [False] * count
+		keep[0] = keep[-1] = True
+		tolerance_sq = tolerance * tolerance
+		stack = [(0, count - 1)]
+		while stack:
+			start, end = stack.pop()
+			ax, ay = xy[start]
+			dx, dy = xy[end][0] - ax, xy[end][1] - ay
+			length_sq = dx * dx + dy * dy
+			max_distance_sq, farthest = 0.0, None
+			for index in range(start + 1, end):
+				px, py = xy[index][0] - ax, xy[index][1] - ay
+				if length_sq:
+					t = min(1.0, max(0.0, (px * dx + py * dy) / length_sq))
+					px, py = px - t * dx, py - t * dy
+				distance_sq = px * px + py * py
+				if distance_sq > max_distance_sq:
+					max_distance_sq, farthest = distance_sq, index
+			if farthest is not None and max_distance_sq > tolerance_sq:
+				keep[farthest] = True
+				stack.append((start, farthest))
+				stack.append((farthest, end))
+		return replace(self, points=[point for point, kept in zip(self.points, keep) if kept])
@@ -0,0 +1,45 @@
+from django.contrib.postgres.aggregates import ArrayAgg
+
+from running.models import Day, History
+from users.models import User
+
+from .cache import VersionedCache
+from .constants import CATALOG_CACHE_TIMEOUT
+
+
+def load_training_catalog() -> tuple[dict, ...]:
+	"""Загружает из БД план тренировок, упорядоченный по номеру дня."""
+	return tuple(Day.objects.order_by("day_number").values("day_number", "workout", "workout_info"))
+
+
+TRAINING_CATALOG = VersionedCache("training_catalog", load_training_catalog, CATALOG_CACHE_TIMEOUT)
+
+
+def get_training_catalog() -> tuple[dict, ...]:
+	"""Отдаёт закэшированный план тренировок. Данные только для чтения."""
+	return TRAINING_CATALOG.get()
+
+
+def get_completed_days(user: User) -> int:
+	"""
+	Отдаёт битовую маску пройденных пользователем дней,
+	где бит N - 1 соответствует дню N. Собирается одним агрегатным запросом.
+	"""
+	return _to_bitmap(History.objects.filter(user_id=user).aggregate(days=ArrayAgg("training_day"))["days"])
+
+
+async def aget_completed_days(user: User) -> int:
+	"""Асинхронная версия get_completed_days."""
+	return _to_bitmap((await History.objects.filter(user_id=user).aaggregate(days=ArrayAgg("training_day")))["days"])
+
+
+def _to_bitmap(days: list[int] | None) -> int:
+	bitmap = 0
+	for day_number in days or ():
+		bitmap |= 1 << (day_number - 1)
+	return bitmap
+
+
+def is_day_completed(completed_days: int, day_number: int) -> bool:
+	"""Проверяет по битовой маске, пройден ли день."""
+	return bool(completed_days >> (day_number - 1) & 1)
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from running.models import History
+from users.models import User
+
+from .constants import WEEK_STATS_TIMEOUT
+from .localization import get_timezone
+
+
+def get_week_start(date: datetime) -> datetime:
+	"""Отдаёт начало недели (понедельник 00:00) в часовом поясе даты."""
+	return (date - timedelta(days=date.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _get_key(user: User, week_start: datetime) -> str:
+	return f"week_stats:{user.id}:{user.timezone}:{week_start:%Y-%m-%d}"
+
+
+def _get_current_week_start(user: User) -> datetime:
+	return get_week_start(timezone.localtime(timezone=get_timezone(user.timezone)))
+
+
+def get_count_training_week(user: User, weeks_ago: int = 0) -> int:
+	"""
+	Возвращает кол-во тренировок пользователя за неделю, отстоящую от текущей
+	на weeks_ago недель. Неделя считается в часовом поясе пользователя.
+	Счётчик хранится в кэше, при его отсутствии считается по истории.
+	"""
+	week_start = _get_current_week_start(user) - timedelta(weeks=weeks_ago)
+	key = _get_key(user, week_start)
+	count = cache.get(key)
+	if count is None:
+		count = _count_week(user, week_start)
+		cache.add(key, count, WEEK_STATS_TIMEOUT)
+	return count
+
+
+def _count_week(user: User, week_start: datetime) -> int:
+	return History.objects.filter(
+		user_id=user, training_start__gte=week_start, training_start__lt=week_start + timedelta(weeks=1)
+	).count()
+
+
+def _store_count(user: User, week_start: datetime) -> None:
+	cache.set(_get_key(user, week_start), _count_week(user, week_start), WEEK_STATS_TIMEOUT)
+
+
+def register_training(user: User, history: History) -> None:
+	"""
+	Учитывает новую тренировку в счётчике её недели. После фиксации транзакции
+	счётчик перезаписывается свежим значением из базы, чтобы не оставить в кэше
+	число, посчитанное параллельным запросом до появления тренировки.
+	"""
+	week_start = get_week_start(history.training_start.astimezone(get_timezone(user.timezone)))
+	transaction.on_commit(partial(_store_count, user, week_start))
+
+
+def reset(user: User) -> None:
+	"""Сбрасывает счётчики текущей и прошлой недели пользователя."""
+	week_start = _get_current_week_start(user)
+	cache.delete_many([_get_key(user, week_start), _get_key(user, week_start - timedelta(weeks=1))])
@@ -23,3 +23,30 @@ def test_all_achievments_returns_correct(user_client, achievements) -> None:
 	achievement = response.data[0]
 	assert achievement["achievement_date"] == date.astimezone(pytz.timezone(user.timezone)).strftime(FORMAT_DATE)
 	assert achievement["received"] is not None
+
+
+@pytest.mark.django_db
+def test_achievements_show_latest_date_of_current_user(user_client, user, achievements, settings) -> None:
+	other_user = User.objects.create(email="other@test.ru", timezone="Europe/Moscow")
+	dates = [timezone.localtime() - timezone.timedelta(days=days) for days in (10, 2, 5)]
+	for date in dates:
+		user_achievement = UserAchievement.objects.create(user_id=user, achievement_id=achievements[0])
+		UserAchievement.objects.filter(pk=user_achievement.pk).update(achievement_date=date)
+	UserAchievement.objects.create(user_id=other_user, achievement_id=achievements[1])
+	for read_optimized in (True, False):
+		settings.READ_OPTIMIZED_SERIALIZERS = read_optimized
+		response = user_client.get(reverse("achievements"))
+		assert [item["received"] for item in response.data] == [True, False, False]
+		assert response.data[0]["achievement_date"] == dates[1].astimezone(pytz.timezone(user.timezone)).strftime(
+			FORMAT_DATE
+		)
+		assert response.data[1]["achievement_date"] is None
+
+
+@pytest.mark.django_db
+def test_achievements_are_read_with_one_query(user_client, user, achievements, django_assert_num_queries) -> None:
+	UserAchievement.objects.create(user_id=user, achievement_id=achievements[0])
+	user_client.get(reverse("achievements"))
+	with django_assert_num_queries(2):
+		# Пользователь из токена и даты его достижений.
+		user_client.get(reverse("achievements"))
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.v1.views import (
+	AchievementView,
+	AsyncAchievementView,
+	AsyncHistoryView,
+	AsyncMyInfoView,
+	AsyncTrainingView,
+	HistoryView,
+	MyInfoView,
+	TrainingView,
+)
+from running.models import Day, History, UserAchievement
+
+factory = APIRequestFactory()
+
+
+def call(view_class, user=None, method="get", data=None, **params):
+	request = getattr(factory, method)("/", data or params, format="json" if data else None)
+	if user is not None:
+		request.META["HTTP_AUTHORIZATION"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+	view = view_class.as_view()
+	response = async_to_sync(view)(request) if iscoroutinefunction(view) else view(request)
+	return response.render()
+
+
+def get_both(user, view_class, async_view_class, **params) -> tuple[bytes, bytes]:
+	"""Отдаёт ответы синхронного и асинхронного представлений."""
+	expected = call(view_class, user, **params)
+	actual = call(async_view_class, user, **params)
+	assert actual.status_code == expected.status_code == status.HTTP_200_OK
+	return expected.content, actual.content
+
+
+@pytest.fixture
+def histories(user):
+	start = datetime(2024, 3, 30, 22, 59, tzinfo=pytz.utc)
+	histories = [
+		History.objects.create(
+			user_id=user,
+			training_start=start + timedelta(days=day),
+			training_end=start + timedelta(days=day, minutes=40),
+			training_day=Day.objects.get(day_number=day),
+			motivation_phrase="Фраза",
+			cities=["Москва"],
+			distance=1000 * day,
+			max_speed=10,
+			avg_speed=5,
+			height_difference=day,
+		)
+		for day in range(1, 4)
+	]
+	user.last_completed_training = histories[-1]
+	user.save()
+	return histories
+
+
+def test_async_views_are_coroutines():
+	for view_class in (AsyncTrainingView, AsyncAchievementView, AsyncHistoryView, AsyncMyInfoView):
+		assert iscoroutinefunction(view_class.as_view())
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", ({}, {"limit": 2}, {"fields": "distance,time", "route_format": "none"}))
+def test_async_history_matches_sync(user, histories, params):
+	expected, actual = get_both(user, HistoryView, AsyncHistoryView, **params)
+	assert actual == expected
+
+
+@pytest.mark.django_db
+def test_async_training_matches_sync(user, histories):
+	expected, actual = get_both(user, TrainingView, AsyncTrainingView)
+	assert actual == expected
+
+
+@pytest.mark.django_db
+def test_async_achievements_match_sync(user, achievements, histories):
+	UserAchievement.objects.create(user_id=user, achievement_id=achievements[1])
+	expected, actual = get_both(user, AchievementView, AsyncAchievementView)
+	assert actual == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("with_history", (False, True))
+def test_async_me_matches_sync(user, request, with_history):
+	if with_history:
+		request.getfixturevalue("histories")
+	expected, actual = get_both(user, MyInfoView, AsyncMyInfoView)
+	assert actual == expected
+
+
+@pytest.mark.django_db
+def test_async_view_requires_authentication():
+	assert call(AsyncTrainingView).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_async_me_runs_sync_handlers(user):
+	response = call(AsyncMyInfoView, user, method="patch", data={"name": "Async"})
+	assert response.status_code == status.HTTP_200_OK
+	user.refresh_from_db()
+	assert user.name == "Async"
+
+
+@pytest.mark.django_db
+def test_async_history_post_runs_sync_handler(user, load_achievement_fixtures):
+	data = {
+		"training_start": "2024-10-11 14:30:00",
+		"training_end": "2024-10-11 15:31:00",
+		"training_day": 1,
+		"cities": ["Москва"],
+		"distance": 5000,
+		"max_speed": 12,
+		"avg_speed": 9,
+		"height_difference": 5,
+		"motivation_phrase": "Отдых – это не конец тренировки, это начало новых возможностей.",
+	}
+	response = call(AsyncHistoryView, user, method="post", data=data)
+	assert response.status_code == status.HTTP_201_CREATED
+	assert History.objects.filter(user_id=user, training_day=1).exists()
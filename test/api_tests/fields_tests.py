@@ -0,0 +1,148 @@
+import base64
+import os
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import InMemoryUploadedFile, SimpleUploadedFile, TemporaryUploadedFile
+from django.urls import reverse
+from PIL import Image
+from rest_framework import serializers, status
+
+from api.v1.fields import Base64ImageField, get_decoded_size, iter_base64_chunks, sniff_image_format
+
+
+def make_image(image_format: str = "PNG", size: tuple[int, int] = (8, 8)) -> bytes:
+	buffer = BytesIO()
+	Image.new("RGB", size, "red").save(buffer, image_format)
+	return buffer.getvalue()
+
+
+def make_data_uri(content: bytes, mime: str = "image/png") -> str:
+	return f"data:{mime};base64,{base64.b64encode(content).decode()}"
+
+
+@pytest.mark.parametrize(
+	"image_format, expected",
+	(("PNG", "png"), ("JPEG", "jpeg"), ("GIF", "gif"), ("WEBP", "webp")),
+)
+def test_sniff_image_format(image_format, expected):
+	assert sniff_image_format(make_image(image_format)) == expected
+
+
+def test_sniff_image_format_rejects_unknown_header():
+	assert sniff_image_format(b"<svg xmlns=") is None
+
+
+@pytest.mark.parametrize("length", (0, 1, 2, 3, 4, 5, 100))
+def test_decoded_size_is_upper_bound(length):
+	encoded = base64.b64encode(b"x" * length).decode()
+	assert get_decoded_size(encoded) == length
+
+
+def test_base64_is_decoded_by_chunks(monkeypatch):
+	monkeypatch.setattr("api.v1.fields.BASE64_CHUNK_SIZE", 6)
+	content = bytes(range(256))
+	encoded = base64.encodebytes(content).decode()
+	chunks = list(iter_base64_chunks(encoded))
+	assert len(chunks) > 1
+	assert max(map(len, chunks)) <= 6
+	assert b"".join(chunks) == content
+
+
+def test_small_image_is_decoded_in_memory():
+	content = make_image()
+	file = Base64ImageField().to_internal_value(make_data_uri(content))
+	assert isinstance(file, InMemoryUploadedFile)
+	assert file.name.endswith(".png")
+	assert file.size == len(content)
+	assert file.read() == content
+
+
+def test_large_image_is_decoded_to_disk(settings):
+	content = make_image()
+	settings.FILE_UPLOAD_MAX_MEMORY_SIZE = len(content) // 2
+	file = Base64ImageField().to_internal_value(make_data_uri(content))
+	assert isinstance(file, TemporaryUploadedFile)
+	with open(file.temporary_file_path(), "rb") as saved:
+		assert saved.read() == content
+
+
+def test_declared_type_is_replaced_by_real_one():
+	file = Base64ImageField().to_internal_value(make_data_uri(make_image("JPEG"), mime="image/png"))
+	assert file.name.endswith(".jpeg")
+
+
+def test_image_over_max_size_is_rejected_before_decoding(settings, monkeypatch):
+	content = make_image()
+	settings.MAX_UPLOAD_IMAGE_SIZE = len(content) - 1
+	monkeypatch.setattr("api.v1.fields.iter_base64_chunks", lambda encoded: pytest.fail("decoded"))
+	with pytest.raises(serializers.ValidationError) as error:
+		Base64ImageField().to_internal_value(make_data_uri(content))
+	assert error.value.detail[0].code == "max_size"
+
+
+@pytest.mark.parametrize(
+	"data",
+	(
+		"data:image/png;base64,",
+		"data:image/png;base64,!!!!",
+		"data:image/png;base64,iVBORw0",
+		"data:image/png,iVBORw0KGgo=",
+		make_data_uri(b"<svg xmlns='http://www.w3.org/2000/svg'/>", mime="image/svg+xml"),
+	),
+)
+def test_invalid_image_is_rejected(data):
+	with pytest.raises(serializers.ValidationError) as error:
+		Base64ImageField().to_internal_value(data)
+	assert error.value.detail[0].code == "invalid_image"
+
+
+@pytest.mark.django_db
+def test_avatar_is_uploaded_as_data_uri(user_client, user, settings, tmp_path):
+	settings.MEDIA_ROOT = tmp_path
+	response = user_client.patch(reverse("me"), {"avatar": make_data_uri(make_image())}, format="json")
+	assert response.status_code == status.HTTP_200_OK
+	user.refresh_from_db()
+	assert user.avatar.name.endswith(".png")
+	assert (tmp_path / user.avatar.name).read_bytes() == make_image()
+
+
+def test_uploaded_image_is_renamed_by_real_type():
+	file = Base64ImageField().to_internal_value(SimpleUploadedFile("route.png", make_image("WEBP")))
+	assert file.name.endswith(".webp")
+	assert file.read() == make_image("WEBP")
+
+
+def test_uploaded_file_with_unknown_header_is_rejected():
+	with pytest.raises(serializers.ValidationError) as error:
+		Base64ImageField().to_internal_value(SimpleUploadedFile("route.png", b"GIF90a" + b"0" * 32))
+	assert error.value.detail[0].code == "invalid_image"
+
+
+@pytest.mark.django_db
+def test_avatar_is_uploaded_as_multipart(user_client, user, settings, tmp_path):
+	settings.MEDIA_ROOT = tmp_path
+	avatar = SimpleUploadedFile("avatar.jpg", make_image("JPEG"), content_type="image/jpeg")
+	response = user_client.patch(reverse("me"), {"avatar": avatar}, format="multipart")
+	assert response.status_code == status.HTTP_200_OK
+	user.refresh_from_db()
+	assert user.avatar.name.endswith(".jpeg")
+	assert (tmp_path / user.avatar.name).read_bytes() == make_image("JPEG")
+
+
+@pytest.mark.django_db
+def test_oversized_multipart_upload_is_rejected(user_client, user, settings, monkeypatch):
+	buffer = BytesIO()
+	Image.frombytes("RGB", (256, 256), os.urandom(256 * 256 * 3)).save(buffer, "PNG")
+	content = buffer.getvalue()
+	settings.MAX_UPLOAD_IMAGE_SIZE = len(content) // 2
+	settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 0
+	written = []
+	monkeypatch.setattr(TemporaryUploadedFile, "write", lambda self, chunk: written.append(len(chunk)), raising=False)
+	avatar = SimpleUploadedFile("avatar.png", content, content_type="image/png")
+	response = user_client.patch(reverse("me"), {"avatar": avatar}, format="multipart")
+	assert response.status_code == status.HTTP_400_BAD_REQUEST
+	assert response.data["avatar"][0].code == "max_size"
+	assert 0 < sum(written) <= settings.MAX_UPLOAD_IMAGE_SIZE
+	user.refresh_from_db()
+	assert not user.avatar
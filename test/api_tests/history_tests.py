@@ -1,12 +1,21 @@
+import json
 from datetime import datetime, timedelta
+from io import BytesIO
 from unittest.mock import patch
 
 import pytest
+import pytz
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from PIL import Image
 from rest_framework import status
 
-from running.models import UserAchievement  # noqa
+from api.v1.tasks import update_achievements
+from running.models import AchievementsJob, Day, History, UserAchievement  # noqa
 
 User = get_user_model()
 url = reverse("history")
@@ -149,8 +158,306 @@ def test_achievement_adds_freezes_to_a_user(
 	training_end_data["achievements"] = [
 		achievement_id
 	]  # на всякий случай проверяем и в iOS достижении, если по какой-то причине за них вдруг начислятся заморозки
-	patched_validator = {achievement_id: lambda user, history: True}
+	patched_validator = {achievement_id: lambda context: True}
 	with patch("utils.achievements.VALIDATORS", patched_validator):
 		user_client.post(url, training_end_data, format="json").data
 		user.refresh_from_db()
 		assert user.amount_of_skips == old_freezes + expected_freezes
+
+
+@pytest.mark.django_db
+def test_async_achievements_job(
+	user, user_client, load_achievement_fixtures, training_end_data, settings, django_capture_on_commit_callbacks
+):
+	settings.ACHIEVEMENTS_ASYNC = True
+	training_end_data["achievements"] = [26]
+	with patch("api.v1.views.update_achievements.delay") as delay:
+		with django_capture_on_commit_callbacks(execute=True):
+			response = user_client.post(url, training_end_data, format="json")
+	assert response.status_code == status.HTTP_202_ACCEPTED
+	job_id = response.data["job_id"]
+	delay.assert_called_once_with(job_id, [26])
+	assert user_achievement_count_by_id(user, 26) == 0
+
+	achievements_url = reverse("history-achievements", args=(job_id,))
+	assert user_client.get(achievements_url).status_code == status.HTTP_202_ACCEPTED
+
+	update_achievements(*delay.call_args.args)
+	update_achievements(*delay.call_args.args)
+	assert user_achievement_count_by_id(user, 26) == 1
+	response = user_client.get(achievements_url)
+	assert response.status_code == status.HTTP_200_OK
+	assert achievement_title_in_response(response.data, "Афтердарк")
+
+
+@pytest.fixture
+def async_job(user_client, load_achievement_fixtures, training_end_data, settings, django_capture_on_commit_callbacks):
+	"""Сохраняет тренировку в асинхронном режиме, отдаёт id проверки и аргументы задачи."""
+	settings.ACHIEVEMENTS_ASYNC = True
+	training_end_data["achievements"] = [26]
+	with patch("api.v1.views.update_achievements.delay") as delay:
+		with django_capture_on_commit_callbacks(execute=True):
+			response = user_client.post(url, training_end_data, format="json")
+	assert response.data == {"job_id": response.data["job_id"], "status": AchievementsJob.PENDING}
+	return response.data["job_id"], delay.call_args.args
+
+
+@pytest.mark.django_db
+def test_async_achievements_job_is_idempotent_without_cache(user, async_job):
+	patched_validator = {achievement_id: lambda context: True for achievement_id in (1, 2)}
+	with patch("utils.achievements.VALIDATORS", patched_validator):
+		first = update_achievements(*async_job[1])
+		assert {1, 2} <= set(first)
+		user.refresh_from_db()
+		skips = user.amount_of_skips
+		cache.clear()
+		assert update_achievements(*async_job[1]) == first
+	user.refresh_from_db()
+	assert user.amount_of_skips == skips
+	assert user_achievement_count_by_id(user, 26) == 1
+	assert AchievementsJob.objects.get(pk=async_job[0]).achievement_ids == first
+
+
+@pytest.mark.django_db
+def test_failed_achievements_job_is_terminal(user, user_client, async_job):
+	with patch("utils.achievements.AchievementUpdater._update_database", side_effect=RuntimeError):
+		with pytest.raises(RuntimeError):
+			update_achievements(*async_job[1])
+	assert user_achievement_count_by_id(user, 26) == 0
+	response = user_client.get(reverse("history-achievements", args=(async_job[0],)))
+	assert response.status_code == status.HTTP_410_GONE
+	assert response.data == {"job_id": async_job[0], "status": AchievementsJob.FAILED}
+
+
+@pytest.mark.django_db
+def test_expired_achievements_job_is_terminal(user_client, async_job, settings):
+	achievements_url = reverse("history-achievements", args=(async_job[0],))
+	assert user_client.get(achievements_url).status_code == status.HTTP_202_ACCEPTED
+	settings.ACHIEVEMENTS_JOB_TIMEOUT_SECONDS = 60
+	AchievementsJob.objects.filter(pk=async_job[0]).update(created_at=datetime.now(pytz.utc) - timedelta(minutes=2))
+	response = user_client.get(achievements_url)
+	assert response.status_code == status.HTTP_410_GONE
+	assert response.data["status"] == AchievementsJob.EXPIRED
+
+
+@pytest.mark.django_db
+def test_async_achievements_job_of_another_user_is_not_found(user_client, training_end_data):
+	another_user = User.objects.create(email="another@test.ru", timezone="Europe/Moscow")
+	history = History.objects.create(
+		training_start="2024-10-11 14:30:00+00:00",
+		training_end="2024-10-11 15:31:00+00:00",
+		training_day_id=1,
+		motivation_phrase=training_end_data["motivation_phrase"],
+		cities=training_end_data["cities"],
+		distance=1,
+		max_speed=1,
+		avg_speed=1,
+		height_difference=1,
+		user_id=another_user,
+	)
+	AchievementsJob.objects.create(history=history)
+	response = user_client.get(reverse("history-achievements", args=(history.id,)))
+	assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_history_is_created_from_multipart(
+	user, user_client, load_achievement_fixtures, training_end_data, settings, tmp_path
+) -> None:
+	settings.MEDIA_ROOT = tmp_path
+	buffer = BytesIO()
+	Image.new("RGB", (8, 8), "red").save(buffer, "PNG")
+	training_end_data["image"] = SimpleUploadedFile("route.png", buffer.getvalue(), content_type="image/png")
+	training_end_data["achievements"] = [26]
+	response = user_client.post(url, training_end_data, format="multipart")
+	assert response.status_code == status.HTTP_201_CREATED
+	assert user_achievement_count_by_id(user, 26) == 1
+	history = History.objects.get(user_id=user)
+	assert history.cities == ["Питер", "Волгоград"]
+	assert history.image.name.endswith(".png")
+	assert (tmp_path / history.image.name).read_bytes() == buffer.getvalue()
+
+
+@pytest.fixture
+def route():
+	return [
+		{"latitude": 55.75 + i * 1e-4, "longitude": 37.61, "altitude": 150.5, "timestamp": 1728657000 + i}
+		for i in range(10)
+	]
+
+
+@pytest.mark.django_db
+def test_route_is_stored_as_polyline(user, user_client, load_achievement_fixtures, training_end_data, route):
+	training_end_data["route"] = route
+	response = user_client.post(url, training_end_data, format="json")
+	assert response.status_code == status.HTTP_201_CREATED
+	history = History.objects.get(user_id=user)
+	assert history.route is None
+	assert history.route_polyline.startswith("1;dict;latitude:4,longitude:2,altitude:1,timestamp:int;")
+	response = user_client.get(url)
+	assert response.data[0]["route"] == route
+
+
+@pytest.mark.django_db
+def test_lossy_route_is_kept_as_json(user, user_client, load_achievement_fixtures, training_end_data, route):
+	route[0]["altitude"] = 150
+	route[1]["latitude"] = 55.75582600000001
+	training_end_data["route"] = route
+	user_client.post(url, training_end_data, format="json")
+	history = History.objects.get(user_id=user)
+	assert history.route == route
+	assert history.route_polyline is not None
+	# Сравнение JSON проверяет и тип чисел: 150 и 150.0 различаются, ключи jsonb хранит отсортированными.
+	response_route = user_client.get(url).json()[0]["route"]
+	assert json.dumps(response_route, sort_keys=True) == json.dumps(route, sort_keys=True)
+
+
+@pytest.mark.django_db
+def test_unknown_route_format_is_stored_as_is(user, user_client, load_achievement_fixtures, training_end_data):
+	training_end_data["route"] = {"type": "LineString", "coordinates": [[37.61, 55.75]]}
+	user_client.post(url, training_end_data, format="json")
+	history = History.objects.get(user_id=user)
+	assert history.route_polyline is None
+	assert user_client.get(url).data[0]["route"] == training_end_data["route"]
+
+
+@pytest.mark.django_db
+def test_route_resolution_is_chosen_on_read(user_client, load_achievement_fixtures, training_end_data, route):
+	training_end_data["route"] = route
+	user_client.post(url, training_end_data, format="json")
+	assert user_client.get(url, {"route_tolerance": 1}).data[0]["route"] == [route[0], route[-1]]
+	assert user_client.get(url, {"route_format": "none"}).data[0]["route"] is None
+	polyline = user_client.get(url, {"route_format": "polyline"}).data[0]["route"]
+	assert polyline["fields"] == ["latitude", "longitude", "altitude", "timestamp"]
+	assert polyline["precisions"] == [4, 2, 1, 0]
+	assert len(polyline["polyline"]) < len(str(route)) / 4
+	response = user_client.get(url, {"route_tolerance": -1})
+	assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_route_metrics_fill_history(user, user_client, load_achievement_fixtures, training_end_data, route, settings):
+	settings.ROUTE_METRICS_MODE = "fill"
+	training_end_data["route"] = route
+	for field in ("distance", "max_speed", "avg_speed", "height_difference"):
+		del training_end_data[field]
+	response = user_client.post(url, training_end_data, format="json")
+	assert response.status_code == status.HTTP_201_CREATED
+	history = History.objects.get(user_id=user)
+	assert history.distance == pytest.approx(100, abs=1)
+	assert history.avg_speed == pytest.approx(40, abs=0.1)
+	assert history.max_speed == pytest.approx(40, abs=0.1)
+	assert history.height_difference == 0
+	user.refresh_from_db()
+	assert user.total_m_run == history.distance
+
+
+@pytest.mark.django_db
+def test_route_metrics_validate_distance(user_client, load_achievement_fixtures, training_end_data, route, settings):
+	settings.ROUTE_METRICS_MODE = "validate"
+	training_end_data["route"] = route
+	response = user_client.post(url, training_end_data, format="json")
+	assert response.status_code == status.HTTP_400_BAD_REQUEST
+	assert "distance" in response.data
+	training_end_data["distance"] = 105
+	response = user_client.post(url, training_end_data, format="json")
+	assert response.status_code == status.HTTP_201_CREATED
+
+
+@pytest.mark.django_db
+def test_history_metrics_are_required_without_route(user_client, training_end_data, settings):
+	settings.ROUTE_METRICS_MODE = "fill"
+	del training_end_data["distance"]
+	response = user_client.post(url, training_end_data, format="json")
+	assert response.status_code == status.HTTP_400_BAD_REQUEST
+	assert list(response.data) == ["distance"]
+
+
+@pytest.mark.django_db
+def test_history_metrics_are_required_with_other_fields(user_client, training_end_data, settings):
+	settings.ROUTE_METRICS_MODE = "validate"
+	del training_end_data["distance"]
+	del training_end_data["cities"]
+	response = user_client.post(url, training_end_data, format="json")
+	assert response.status_code == status.HTTP_400_BAD_REQUEST
+	assert set(response.data) == {"distance", "cities"}
+
+
+@pytest.fixture
+def histories(user, route):
+	start = datetime(2024, 10, 1, 10, tzinfo=pytz.utc)
+	return [
+		History.objects.create(
+			user_id=user,
+			training_start=start + timedelta(days=day),
+			training_end=start + timedelta(days=day, hours=1),
+			training_day=Day.objects.get(day_number=day),
+			motivation_phrase="Тестовая фраза",
+			cities=["Moscow"],
+			route=route,
+			distance=1000 * day,
+			max_speed=10,
+			avg_speed=5,
+			height_difference=1,
+		)
+		for day in range(5, 0, -1)
+	]
+
+
+@pytest.mark.django_db
+def test_history_is_paginated_by_cursor(user_client, histories):
+	response = user_client.get(url, {"limit": 2})
+	assert [item["distance"] for item in response.data["results"]] == [1000, 2000]
+	response = user_client.get(response.data["next"])
+	assert [item["distance"] for item in response.data["results"]] == [3000, 4000]
+	response = user_client.get(response.data["next"])
+	assert [item["distance"] for item in response.data["results"]] == [5000]
+	assert response.data["next"] is None
+
+
+@pytest.mark.django_db
+def test_history_without_limit_is_not_paginated(user_client, histories):
+	response = user_client.get(url)
+	assert [item["distance"] for item in response.data] == [1000, 2000, 3000, 4000, 5000]
+
+
+@pytest.mark.django_db
+def test_history_fields_skip_route_column(user_client, histories):
+	with CaptureQueriesContext(connection) as queries:
+		response = user_client.get(url, {"fields": "training_start,distance,time"})
+	assert set(response.data[0]) == {"training_start", "distance", "time"}
+	history_query = next(query["sql"] for query in queries if 'FROM "running_history"' in query["sql"])
+	assert '"route"' not in history_query
+	assert '"route_polyline"' not in history_query
+	with CaptureQueriesContext(connection) as queries:
+		response = user_client.get(url, {"route_format": "none"})
+	assert response.data[0]["route"] is None
+	history_query = next(query["sql"] for query in queries if 'FROM "running_history"' in query["sql"])
+	assert '"route"' not in history_query
+
+
+@pytest.mark.django_db
+def test_unknown_history_fields_are_rejected(user_client):
+	response = user_client.get(url, {"fields": "distance,user_id"})
+	assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_repeated_training_day_is_rejected(user_client, load_achievement_fixtures, training_end_data):
+	assert user_client.post(url, training_end_data, format="json").status_code == status.HTTP_201_CREATED
+	training_end_data["training_start"] = add_1_day_to_str(training_end_data["training_start"])
+	training_end_data["training_end"] = add_1_day_to_str(training_end_data["training_end"])
+	# Повтор дня, прошедший проверку последовательности, как при параллельных запросах.
+	with patch("api.v1.serializers.HistorySerializer.validate_training_day", lambda self, value: value):
+		response = user_client.post(url, training_end_data, format="json")
+	assert response.status_code == status.HTTP_400_BAD_REQUEST
+	assert list(response.data) == ["training_day"]
+	assert History.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_unknown_motivation_phrase_is_rejected(user_client, training_end_data):
+	training_end_data["motivation_phrase"] = "Несуществующая фраза"
+	response = user_client.post(url, training_end_data, format="json")
+	assert response.status_code == status.HTTP_400_BAD_REQUEST
+	assert list(response.data) == ["motivation_phrase"]
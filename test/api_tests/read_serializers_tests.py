@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+from django.urls import reverse
+
+from running.models import Achievement, Day, History, UserAchievement
+from utils.routes import Route
+
+ROUTE = [
+	{"latitude": 55.75 + i * 1e-4, "longitude": 37.61, "altitude": 150.5, "timestamp": 1728657000 + i}
+	for i in range(10)
+]
+
+
+def get_both(client, settings, url, params=None) -> tuple[bytes, bytes]:
+	"""Отдаёт ответы DRF-сериализатора и быстрого пути."""
+	settings.READ_OPTIMIZED_SERIALIZERS = False
+	expected = client.get(url, params)
+	settings.READ_OPTIMIZED_SERIALIZERS = True
+	actual = client.get(url, params)
+	assert actual.status_code == expected.status_code == 200
+	return expected.content, actual.content
+
+
+@pytest.fixture(params=("Europe/Moscow", "America/Los_Angeles", "Asia/Kamchatka"))
+def timezone_user(request, user):
+	user.timezone = request.param
+	user.save()
+	return user
+
+
+@pytest.fixture
+def varied_histories(timezone_user):
+	start = datetime(2024, 3, 30, 22, 59, 59, 999999, tzinfo=pytz.utc)
+	variants = (
+		{"route_polyline": Route.from_json(ROUTE).encode(), "image": "history_images/1.png"},
+		{"route": {"type": "LineString"}, "image_renditions": {"thumbnail": "history_images/2_thumbnail.webp"}},
+		{"route": None, "image": "", "motivation_phrase": ""},
+		{"route_polyline": Route.from_json([[55.75, 37.61], [55.751, 37.612]]).encode()},
+	)
+	for day, variant in enumerate(variants, start=1):
+		History.objects.create(
+			**{"motivation_phrase": "Фраза", **variant},
+			user_id=timezone_user,
+			training_start=start + timedelta(days=day, minutes=day),
+			training_end=start + timedelta(days=day, minutes=day * 37, seconds=day * 13),
+			training_day=Day.objects.get(day_number=day),
+			cities=["Москва"],
+			distance=1000.5 * day,
+			max_speed=10,
+			avg_speed=5.25,
+			height_difference=day,
+		)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+	"params",
+	(
+		None,
+		{"route_format": "polyline"},
+		{"route_format": "none"},
+		{"route_tolerance": 5},
+		{"route_format": "polyline", "route_tolerance": 5},
+		{"fields": "time,route,image_thumbnail"},
+		{"fields": "training_start", "route_format": "none"},
+		{"limit": 3},
+		{"limit": 2, "fields": "distance"},
+	),
+)
+def test_history_matches_serializer(user_client, varied_histories, settings, params):
+	expected, actual = get_both(user_client, settings, reverse("history"), params)
+	assert actual == expected
+
+
+@pytest.mark.django_db
+def test_empty_history_matches_serializer(user_client, settings):
+	expected, actual = get_both(user_client, settings, reverse("history"))
+	assert actual == expected == b"[]"
+
+
+@pytest.mark.django_db
+def test_achievements_match_serializer(user_client, timezone_user, load_achievement_fixtures, settings):
+	Achievement.objects.filter(id=2).update(icon="", icon_renditions={"detail": "achievement_icons/2_detail.webp"})
+	for achievement_id, hour in ((1, 0), (4, 21), (5, 23)):
+		UserAchievement.objects.create(
+			user_id=timezone_user,
+			achievement_id=Achievement.objects.get(id=achievement_id),
+			achievement_date=datetime(2024, 10, 11, hour, 30, tzinfo=pytz.utc),
+		)
+	expected, actual = get_both(user_client, settings, reverse("achievements"))
+	assert actual == expected
+
+
+@pytest.mark.django_db
+def test_training_matches_serializer(user_client, varied_histories, settings):
+	expected, actual = get_both(user_client, settings, reverse("training"))
+	assert actual == expected
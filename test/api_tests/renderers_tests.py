@@ -0,0 +1,86 @@
+import datetime
+import uuid
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+import pytz
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from api.v1 import renderers
+from api.v1.parsers import ORJSONParser
+from api.v1.renderers import ORJSONRenderer
+
+DATA = ReturnList(
+	[
+		ReturnDict(
+			{
+				"day_number": 1,
+				"workout": {"workout_program": [{"pace": "ходьба", "duration": 15}], "total_duration": 35.5},
+				"date": datetime.date(2024, 10, 11),
+				"training_start": datetime.datetime(2024, 10, 11, 14, 30, 0, 123456, tzinfo=pytz.utc),
+				"time": datetime.time(14, 30),
+				"duration": datetime.timedelta(minutes=61),
+				"distance": Decimal("6660.5"),
+				"id": uuid.UUID(int=1),
+				"title": gettext_lazy("Пользователь"),
+				"line": "перенос\u2028строки\u2029",
+				"completed": None,
+				"cities": ("Питер", "Волгоград"),
+			},
+			serializer=None,
+		)
+	],
+	serializer=None,
+)
+
+
+def test_orjson_renderer_matches_json_renderer():
+	assert ORJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+
+def test_orjson_renderer_falls_back_to_json(monkeypatch):
+	expected = JSONRenderer().render(DATA, "application/json; indent=2")
+	assert ORJSONRenderer().render(DATA, "application/json; indent=2") == expected
+	monkeypatch.setattr(renderers, "orjson", None)
+	assert ORJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+	assert ORJSONRenderer().render(None) == b""
+
+
+def test_json_renderer_is_default(settings):
+	assert settings.JSON_RENDERER_CLASS == "rest_framework.renderers.JSONRenderer"
+	assert settings.JSON_PARSER_CLASS == "rest_framework.parsers.JSONParser"
+	assert settings.REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"][0] == settings.JSON_RENDERER_CLASS
+
+
+def test_orjson_renderer_differs_from_json_renderer():
+	with pytest.raises(ValueError):
+		JSONRenderer().render({"value": float("nan")})
+	assert ORJSONRenderer().render({"value": float("nan")}) == b'{"value":null}'
+	assert JSONRenderer().render({"value": 1e16}) == b'{"value":1e+16}'
+	assert ORJSONRenderer().render({"value": 1e16}) == b'{"value":1e16}'
+	assert ORJSONRenderer().render({uuid.UUID(int=1): 1}) == b'{"00000000-0000-0000-0000-000000000001":1}'
+
+
+def test_orjson_renderer_falls_back_for_big_integers():
+	assert ORJSONRenderer().render({"value": 2**70}) == b'{"value":1180591620717411303424}'
+
+
+@pytest.mark.parametrize("body", (b'{"route": [[55.75, 37.61]], "name": "\\u0411\xd0\xb5\xd0\xb3"}', b"[]", b"1"))
+def test_orjson_parser_matches_json_parser(body):
+	assert ORJSONParser().parse(BytesIO(body)) == JSONParser().parse(BytesIO(body))
+
+
+@pytest.mark.parametrize("body", (b"{", b'{"a": NaN}', b"\xff"))
+def test_orjson_parser_rejects_invalid_json(body):
+	with pytest.raises(ParseError):
+		ORJSONParser().parse(BytesIO(body))
+
+
+def test_orjson_parser_decodes_other_charsets():
+	body = '{"name": "Бег"}'.encode("cp1251")
+	assert ORJSONParser().parse(BytesIO(body), parser_context={"encoding": "cp1251"}) == {"name": "Бег"}
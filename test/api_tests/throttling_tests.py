@@ -2,15 +2,26 @@ import time
 from datetime import timedelta
 
 import pytest
+import redis
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
 
+from api.v1.throttling import KEY_PREFIX, MemoryThrottleStorage, RedisThrottleStorage, get_throttle_storage
+
 URL = reverse("code-resend")
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def clear_throttling_history():
+	"""История запросов кода хранится в своей базе Redis, которую не очищает cache.clear()."""
+	client = redis.Redis.from_url(settings.ACCESS_RESTORE_CODE_THROTTLING_REDIS)
+	for key in client.scan_iter(f"{KEY_PREFIX}*"):
+		client.delete(key)
+
+
 @pytest.fixture
 def code_user():
 	return User.objects.create(email="code@tester.com")
@@ -56,3 +67,42 @@ def test_main_throttling_sequence(alternative_throttling_settings, code_user, cl
 	check_request_code_after_last_try_returns_error(code_user, client)
 	check_another_user_can_request_code_while_first_user_is_on_a_cooldown(code_user, client, user)
 	check_code_user_can_request_code_after_cooldown(code_user, client)
+
+
+@pytest.mark.django_db
+def test_memory_storage_throttling_sequence(alternative_throttling_settings, code_user, client, user, settings):
+	settings.ACCESS_RESTORE_CODE_THROTTLING_STORAGE = "api.v1.throttling.MemoryThrottleStorage"
+	get_throttle_storage.cache_clear()
+	check_request_code_after_last_try_returns_error(code_user, client)
+	check_another_user_can_request_code_while_first_user_is_on_a_cooldown(code_user, client, user)
+	check_code_user_can_request_code_after_cooldown(code_user, client)
+
+
+@pytest.mark.parametrize("storage_class", (MemoryThrottleStorage, RedisThrottleStorage))
+def test_storage_semantics(storage_class):
+	storage = storage_class()
+	key = f"{KEY_PREFIX}semantics@tester.com"
+	# Окно 1000 мс, 3 запроса, запрет 500 мс от последнего запроса.
+	assert [storage.hit(key, now, 1000, 3, 500) for now in (0, 100, 200)] == [0, 0, 0]
+	assert storage.hit(key, 300, 1000, 3, 500) == 400
+	assert storage.hit(key, 700, 1000, 3, 500) == 0
+	assert storage.hit(key, 800, 1000, 3, 500) == 0
+	assert storage.hit(key, 900, 1000, 3, 500) == 0
+	assert storage.hit(key, 950, 1000, 3, 500) == 450
+	# Старые запросы выходят из окна.
+	assert storage.hit(key, 2000, 1000, 3, 500) == 0
+
+
+def test_memory_storage_evicts_least_recently_used_keys():
+	storage = MemoryThrottleStorage(max_keys=2)
+	for email in ("a", "b", "a", "c"):
+		storage.hit(email, 0, 1000, 1, 1000)
+	assert storage.hit("a", 1, 1000, 1, 1000) > 0
+	assert storage.hit("b", 1, 1000, 1, 1000) == 0
+
+
+def test_redis_storage_keys_expire():
+	key = f"{KEY_PREFIX}ttl@tester.com"
+	RedisThrottleStorage().hit(key, 0, 1000, 3, 5000)
+	assert 0 < redis.Redis.from_url(settings.ACCESS_RESTORE_CODE_THROTTLING_REDIS).pttl(key) <= 5000
+	assert not redis.Redis.from_url(settings.CELERY_BROKER_URL).exists(key)
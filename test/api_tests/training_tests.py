@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from running.models import Day, History
+
+URL = reverse("training")
+
+
+@pytest.mark.django_db
+def test_training_list_marks_completed_days(user, user_client):
+	History.objects.create(
+		training_start=timezone.localtime() - timedelta(days=1),
+		training_end=timezone.localtime() - timedelta(days=1) + timedelta(hours=1),
+		training_day=Day.objects.get(day_number=1),
+		motivation_phrase="Тестовая фраза",
+		cities=["Moscow"],
+		distance=1,
+		max_speed=1,
+		avg_speed=1,
+		height_difference=1,
+		user_id=user,
+	)
+	response = user_client.get(URL)
+	assert response.status_code == status.HTTP_200_OK
+	assert len(response.data) == 100
+	assert response.data[0]["day_number"] == 1
+	assert response.data[0]["completed"] is True
+	assert not any(day["completed"] for day in response.data[1:])
+	assert set(response.data[0]) == {"day_number", "workout", "workout_info", "motivation_phrase", "completed"}
@@ -0,0 +1,81 @@
+"""
+GET /achievements/ при росте числа пользователей: прежний запрос с соединением
+всех UserAchievement и distinct против дат пользователя по индексу и кэша справочника.
+Запуск: make bench-dev.
+"""
+
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Case, DateTimeField, Exists, F, OuterRef, When
+from django.urls import reverse
+
+from running.models import Achievement, UserAchievement
+from utils.achievements import get_user_achievements
+
+User = get_user_model()
+
+SCALES = (1_000, 10_000, 100_000)
+ACHIEVEMENTS_PER_USER = 5
+REPEATS = 20
+
+
+def legacy_achievements(user) -> list:
+	"""Прежний queryset AchievementView."""
+	sub_queryset = UserAchievement.objects.filter(user_id=user).values("achievement_id", "achievement_date")
+	return list(
+		Achievement.objects.annotate(
+			received=Exists(sub_queryset.filter(achievement_id=OuterRef("id"))),
+			achievement_date=Case(
+				When(user_achievements__user_id=user, then=F("user_achievements__achievement_date")),
+				default=None,
+				output_field=DateTimeField(),
+			),
+		)
+		.order_by("id")
+		.distinct("id")
+	)
+
+
+def add_users(count: int) -> None:
+	"""Добавляет пользователей с ACHIEVEMENTS_PER_USER достижениями каждый."""
+	start = User.objects.count()
+	User.objects.bulk_create(
+		(User(email=f"bench{start + i}@test.ru", timezone="Europe/Moscow") for i in range(count)), batch_size=10_000
+	)
+	with connection.cursor() as cursor:
+		cursor.execute(
+			"""
+			INSERT INTO running_userachievement (achievement_date, user_id_id, achievement_id_id)
+			SELECT now(), u.id, 1 + (u.id + s) %% 27
+			FROM users_user u CROSS JOIN generate_series(1, %s) s
+			WHERE u.email LIKE 'bench%%' AND u.id > (SELECT COALESCE(MAX(user_id_id), 0) FROM running_userachievement)
+			""",
+			(ACHIEVEMENTS_PER_USER,),
+		)
+		cursor.execute("ANALYZE running_userachievement")
+
+
+def measure(func) -> float:
+	func()
+	started = time.perf_counter()
+	for _ in range(REPEATS):
+		func()
+	return (time.perf_counter() - started) / REPEATS * 1000
+
+
+@pytest.mark.django_db
+def test_achievements_scale(user, user_client, load_achievement_fixtures) -> None:
+	print(f"\n{'пользователей':>14}{'прежний запрос, мс':>22}{'read model, мс':>18}{'эндпоинт, мс':>16}")
+	added = 0
+	for scale in SCALES:
+		add_users(scale - added)
+		added = scale
+		print(
+			f"{scale:>14}"
+			f"{measure(lambda: legacy_achievements(user)):>22.2f}"
+			f"{measure(lambda: get_user_achievements(user)):>18.2f}"
+			f"{measure(lambda: user_client.get(reverse('achievements'))):>16.2f}"
+		)
@@ -0,0 +1,175 @@
+"""
+Нагрузка на GET /training/ и /history/ одним воркером при задержке сети до БД:
+синхронный воркер gunicorn (config.wsgi) против воркера uvicorn (config.asgi)
+с синхронными и асинхронными представлениями чтения.
+Параллельность на воркер - среднее число запросов в обработке (сумма времени ответов / общее время).
+Запуск: make bench-dev.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from io import BytesIO
+from statistics import median
+
+import pytest
+import pytz
+from django.db import connection
+from django.db.backends.utils import CursorWrapper
+from django.urls import path
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.v1.views import AsyncHistoryView, AsyncTrainingView
+from config.asgi import application as asgi_application
+from config.wsgi import application as wsgi_application
+from running.models import Day, History
+
+# Задержка сети до БД на каждый запрос SQL, секунды.
+DB_LATENCY = 0.02
+CLIENTS = 20
+REQUESTS = 200
+PATHS = ("/api/v1/training/", "/api/v1/history/")
+
+# Маршруты воркера ASGI с асинхронными представлениями (ASYNC_VIEWS=True).
+urlpatterns = [
+	path("api/v1/training/", AsyncTrainingView.as_view()),
+	path("api/v1/history/", AsyncHistoryView.as_view()),
+]
+
+
+def wsgi_get(url: str, token: str) -> None:
+	environ = {
+		"REQUEST_METHOD": "GET",
+		"PATH_INFO": url,
+		"SERVER_NAME": "127.0.0.1",
+		"SERVER_PORT": "80",
+		"HTTP_HOST": "127.0.0.1",
+		"HTTP_AUTHORIZATION": f"Bearer {token}",
+		"wsgi.url_scheme": "http",
+		"wsgi.input": BytesIO(),
+	}
+	statuses = []
+	response = wsgi_application(environ, lambda status, headers: statuses.append(status))
+	b"".join(response)
+	response.close()
+	assert statuses == ["200 OK"], statuses
+
+
+async def asgi_get(url: str, token: str) -> None:
+	messages = []
+	finished = asyncio.Event()
+	body_sent = False
+
+	async def receive() -> dict:
+		nonlocal body_sent
+		if not body_sent:
+			body_sent = True
+			return {"type": "http.request", "body": b"", "more_body": False}
+		await finished.wait()
+		return {"type": "http.disconnect"}
+
+	async def send(message: dict) -> None:
+		messages.append(message)
+		if message["type"] == "http.response.body" and not message.get("more_body"):
+			finished.set()
+
+	scope = {
+		"type": "http",
+		"asgi": {"version": "3.0"},
+		"http_version": "1.1",
+		"method": "GET",
+		"scheme": "http",
+		"path": url,
+		"raw_path": url.encode(),
+		"query_string": b"",
+		"root_path": "",
+		"headers": [(b"host", b"127.0.0.1"), (b"authorization", f"Bearer {token}".encode())],
+		"client": ("127.0.0.1", 50000),
+		"server": ("127.0.0.1", 80),
+	}
+	await asgi_application(scope, receive, send)
+	assert messages[0]["status"] == 200, messages[0]
+
+
+def run_wsgi(url: str, token: str) -> list[float]:
+	"""Синхронный воркер обрабатывает запросы клиентов по одному."""
+	latencies = []
+	for _ in range(REQUESTS):
+		started = time.perf_counter()
+		wsgi_get(url, token)
+		latencies.append(time.perf_counter() - started)
+	return latencies
+
+
+def run_asgi(url: str, token: str) -> list[float]:
+	"""Воркер ASGI обслуживает CLIENTS клиентов одновременно в одном цикле событий."""
+	latencies = []
+
+	async def client(count: int) -> None:
+		for _ in range(count):
+			started = time.perf_counter()
+			await asgi_get(url, token)
+			latencies.append(time.perf_counter() - started)
+
+	async def main() -> None:
+		await asyncio.gather(*(client(REQUESTS // CLIENTS) for _ in range(CLIENTS)))
+
+	asyncio.run(main())
+	return latencies
+
+
+def report(title: str, run, url: str, token: str) -> None:
+	started = time.perf_counter()
+	latencies = run(url, token)
+	elapsed = time.perf_counter() - started
+	print(
+		f"{title:<32}{len(latencies) / elapsed:>10.0f}{median(latencies) * 1000:>12.1f}"
+		f"{sum(latencies) / elapsed:>16.1f}"
+	)
+
+
+@pytest.fixture
+def slow_db(monkeypatch):
+	"""Добавляет к каждому запросу SQL задержку сети до БД."""
+	execute = CursorWrapper.execute
+
+	def slow_execute(self, sql, params=None):
+		time.sleep(DB_LATENCY)
+		return execute(self, sql, params)
+
+	monkeypatch.setattr(CursorWrapper, "execute", slow_execute)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_asgi_concurrency_per_worker(user, settings, slow_db) -> None:
+	start = datetime(2024, 3, 1, 7, tzinfo=pytz.utc)
+	for day in range(1, 31):
+		History.objects.create(
+			user_id=user,
+			training_start=start + timedelta(days=day),
+			training_end=start + timedelta(days=day, minutes=40),
+			training_day=Day.objects.get(day_number=day),
+			motivation_phrase="Фраза",
+			cities=["Москва"],
+			distance=5000,
+			max_speed=12,
+			avg_speed=9,
+			height_difference=5,
+		)
+	token = str(RefreshToken.for_user(user).access_token)
+	# Под ASGI у каждого запроса свой поток и своё соединение с БД.
+	saved_conn_max_age = connection.settings_dict["CONN_MAX_AGE"]
+	root_urlconf = settings.ROOT_URLCONF
+	connection.settings_dict["CONN_MAX_AGE"] = 0
+	try:
+		for url in PATHS:
+			print(f"\nGET {url}, задержка БД {DB_LATENCY * 1000:.0f} мс, клиентов {CLIENTS}")
+			print(f"{'воркер':<32}{'запр/с':>10}{'p50, мс':>12}{'параллельность':>16}")
+			report("gunicorn sync, config.wsgi", run_wsgi, url, token)
+			report("uvicorn, синхронные views", run_asgi, url, token)
+			settings.ROOT_URLCONF = __name__
+			report("uvicorn, асинхронные views", run_asgi, url, token)
+			settings.ROOT_URLCONF = root_urlconf
+	finally:
+		connection.close()
+		connection.settings_dict["CONN_MAX_AGE"] = saved_conn_max_age
@@ -0,0 +1,63 @@
+"""
+GET /me/ через WSGI-обработчик: новое соединение с Postgres на каждый запрос
+против постоянного соединения (DB_CONN_MAX_AGE) с проверкой живости и без неё.
+Запуск: make bench-dev.
+"""
+
+import time
+from io import BytesIO
+
+import pytest
+from django.db import connection
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.wsgi import application
+
+REPEATS = 200
+
+MODES = (
+	("новое соединение на запрос", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}),
+	("постоянное соединение", {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": False}),
+	("постоянное с проверкой", {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": True}),
+)
+
+
+def get_me(token: str) -> None:
+	"""Запрос через WSGI-приложение, с сигналами начала и конца запроса, закрывающими соединения."""
+	environ = {
+		"REQUEST_METHOD": "GET",
+		"PATH_INFO": "/api/v1/me/",
+		"SERVER_NAME": "127.0.0.1",
+		"SERVER_PORT": "80",
+		"HTTP_HOST": "127.0.0.1",
+		"HTTP_AUTHORIZATION": f"Bearer {token}",
+		"wsgi.url_scheme": "http",
+		"wsgi.input": BytesIO(),
+	}
+	statuses = []
+	response = application(environ, lambda status, headers: statuses.append(status))
+	b"".join(response)
+	response.close()
+	assert statuses == ["200 OK"], statuses
+
+
+@pytest.mark.django_db(transaction=True)
+def test_me_connection_reuse(user) -> None:
+	token = str(RefreshToken.for_user(user).access_token)
+	saved = {key: connection.settings_dict[key] for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS")}
+	print(f"\n{'режим':<30}{'мс на запрос':>14}{'соединений':>12}")
+	try:
+		for title, options in MODES:
+			connection.close()
+			connection.settings_dict.update(options)
+			get_me(token)
+			connects = 0
+			started = time.perf_counter()
+			for _ in range(REPEATS):
+				connects += connection.connection is None
+				get_me(token)
+			elapsed = (time.perf_counter() - started) / REPEATS * 1000
+			print(f"{title:<30}{elapsed:>14.2f}{connects:>12}")
+	finally:
+		connection.close()
+		connection.settings_dict.update(saved)
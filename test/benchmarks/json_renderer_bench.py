@@ -0,0 +1,70 @@
+"""
+Время и объём JSON-ответов самых больших эндпоинтов: стандартный json против orjson.
+Запуск: make bench-dev.
+"""
+
+import time
+from datetime import datetime, timedelta
+from io import BytesIO
+
+import pytest
+import pytz
+from django.urls import reverse
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.v1.parsers import ORJSONParser
+from api.v1.renderers import ORJSONRenderer
+from running.models import Day, History
+
+REPEATS = 5
+
+# Точек маршрута на тренировку: час с точкой каждые 2 секунды.
+ROUTE_POINTS = 1800
+
+
+@pytest.fixture
+def histories(user):
+	start = datetime(2024, 1, 1, 7, tzinfo=pytz.utc)
+	History.objects.bulk_create(
+		History(
+			user_id=user,
+			training_start=start + timedelta(days=day),
+			training_end=start + timedelta(days=day, hours=1),
+			training_day=Day.objects.get(day_number=day),
+			motivation_phrase="Тестовая фраза",
+			cities=["Москва"],
+			route=[
+				{"latitude": 55.75 + i * 1e-5, "longitude": 37.61 + i * 1e-5, "altitude": 150.5, "timestamp": i * 2}
+				for i in range(ROUTE_POINTS)
+			],
+			distance=5000,
+			max_speed=12.5,
+			avg_speed=9.1,
+			height_difference=12,
+		)
+		for day in range(1, 101)
+	)
+
+
+def measure(func) -> float:
+	started = time.perf_counter()
+	for _ in range(REPEATS):
+		func()
+	return (time.perf_counter() - started) / REPEATS * 1000
+
+
+@pytest.mark.django_db
+def test_json_renderer_throughput(user_client, load_achievement_fixtures, histories):
+	print(f"\n{'эндпоинт':<14}{'байт':>10}{'json, мс':>12}{'orjson, мс':>12}{'разбор json':>14}{'разбор orjson':>15}")
+	for name in ("training", "history", "achievements"):
+		data = user_client.get(reverse(name)).data
+		body = JSONRenderer().render(data)
+		assert ORJSONRenderer().render(data) == body
+		print(
+			f"{name:<14}{len(body):>10}"
+			f"{measure(lambda: JSONRenderer().render(data)):>12.2f}"
+			f"{measure(lambda: ORJSONRenderer().render(data)):>12.2f}"
+			f"{measure(lambda: JSONParser().parse(BytesIO(body))):>14.2f}"
+			f"{measure(lambda: ORJSONParser().parse(BytesIO(body))):>15.2f}"
+		)
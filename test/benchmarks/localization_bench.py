@@ -0,0 +1,62 @@
+"""
+Форматирование дат списков истории и ачивок из 100 строк:
+pytz.timezone и astimezone на каждое поле против Localizer на запрос.
+Запуск: make bench-dev.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+
+from api.v1.constants import FORMAT_DATE, FORMAT_DATETIME
+from utils.localization import get_localizer
+
+User = get_user_model()
+
+ROWS = 100
+REPEATS = 1000
+
+
+def measure(title: str, func) -> None:
+	started = time.perf_counter()
+	for _ in range(REPEATS):
+		func()
+	print(f"{title:<45} {(time.perf_counter() - started) / REPEATS * 1e6:>8.1f} мкс на список")
+
+
+def test_localization_throughput() -> None:
+	start = datetime(2024, 1, 1, 7, tzinfo=pytz.utc)
+	moments = [start + timedelta(days=day, minutes=day) for day in range(ROWS)]
+	request = RequestFactory().get("/")
+	request.user = User(timezone="Europe/Moscow")
+
+	def history_per_row():
+		for moment in moments:
+			user_timezone = pytz.timezone(request.user.timezone)
+			[
+				moment.astimezone(user_timezone).strftime(FORMAT_DATE),
+				moment.astimezone(user_timezone).strftime(FORMAT_DATETIME),
+			]
+
+	def history_localizer():
+		localizer = get_localizer(request)
+		for moment in moments:
+			localizer.format_pair(moment, FORMAT_DATE, FORMAT_DATETIME)
+
+	def achievements_per_row():
+		for moment in moments:
+			moment.astimezone(pytz.timezone(request.user.timezone)).strftime(FORMAT_DATE)
+
+	def achievements_localizer():
+		localizer = get_localizer(request)
+		for moment in moments:
+			localizer.format(moment, FORMAT_DATE)
+
+	print()
+	measure("история, pytz.timezone на строку", history_per_row)
+	measure("история, Localizer", history_localizer)
+	measure("ачивки, pytz.timezone на строку", achievements_per_row)
+	measure("ачивки, Localizer", achievements_localizer)
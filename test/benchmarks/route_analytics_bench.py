@@ -0,0 +1,52 @@
+"""
+Пропускная способность вычисления показателей маршрутов.
+Запуск: make bench-dev.
+"""
+
+import math
+import time
+
+import numpy as np
+
+from utils.route_analytics import analyze_route, analyze_routes, route_to_array
+from utils.routes import Route
+
+ROUTES = 200
+POINTS = 3600
+
+
+def make_routes() -> list[Route]:
+	"""Часовые тренировки с точкой в секунду и шумом GPS."""
+	rng = np.random.default_rng(0)
+	routes = []
+	for _ in range(ROUTES):
+		steps = rng.normal(3e-5, 1e-5, size=(POINTS, 2)).cumsum(axis=0) + (55.75, 37.61)
+		altitude = 150 + rng.normal(0, 0.5, POINTS).cumsum()
+		timestamp = 1728657000 + np.arange(POINTS, dtype=np.float64)
+		routes.append(Route.from_json(np.column_stack((steps, altitude, timestamp)).tolist()))
+	return routes
+
+
+def python_distance(route: Route) -> float:
+	"""Дистанция построчным циклом на чистом Python для сравнения."""
+	total = 0.0
+	for (lat1, lon1, *_), (lat2, lon2, *_) in zip(route.points, route.points[1:]):
+		lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+		a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+		total += 2 * 6_371_008.8 * math.asin(math.sqrt(a))
+	return total
+
+
+def measure(title: str, func) -> None:
+	started = time.perf_counter()
+	func()
+	elapsed = time.perf_counter() - started
+	print(f"{title:<40} {ROUTES / elapsed:>10.0f} маршрутов/с {ROUTES * POINTS / elapsed / 1e6:>8.2f} млн точек/с")
+
+
+def test_route_analytics_throughput() -> None:
+	routes = make_routes()
+	arrays = [route_to_array(route) for route in routes]
+	measure("python, только дистанция", lambda: [python_distance(route) for route in routes])
+	measure("numpy, по одному маршруту", lambda: [analyze_route(route) for route in routes])
+	measure("numpy, пачкой", lambda: analyze_routes(arrays))
@@ -1,5 +1,6 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.management import call_command
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -10,6 +11,12 @@ from running.models import Achievement, UserAchievement  # noqa
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+	"""Кэши справочников не знают об откате транзакций между тестами."""
+	cache.clear()
+
+
 @pytest.fixture
 def user():
 	return User.objects.create(email="test@test.ru", name="Tester John", timezone="Europe/Moscow")
@@ -3,7 +3,17 @@ from datetime import timedelta
 import pytest
 from django.utils import timezone
 
-from backend.utils.achievements import AchievementUpdater, equator, n_km_club, tourist, traveler
+from backend.utils.achievements import (
+	GOBLET,
+	KM_CLUB,
+	THRESHOLD_INDEX,
+	AchievementContext,
+	AchievementUpdater,
+	equator,
+	get_achievement_catalog,
+	tourist,
+	traveler,
+)
 from backend.utils.constants import IOS_ACHIEVEMENTS
 from running.models import Achievement, Day, History, UserAchievement  # noqa
 
@@ -46,14 +56,14 @@ def achievement_by_id(_id: int):
 
 @pytest.mark.django_db
 def test_user_last_day_is_50(user, history):
-	assert equator(user, history) is True
+	assert equator(AchievementContext.build(user, history)) is True
 
 
 @pytest.mark.django_db
 def test_user_training_day_is_not_50(user, history):
 	history.training_day = Day.objects.get(day_number=30)
 	history.save()
-	assert equator(user, history) is False
+	assert equator(AchievementContext.build(user, history)) is False
 
 
 @pytest.mark.django_db
@@ -72,13 +82,24 @@ def test_all_km_achievements_are_received_on_single_big_distance(user, history_f
 
 @pytest.mark.parametrize("total_km_run", (20, 50, 100, 150, 200, 300, 500, 1000))
 @pytest.mark.django_db
-def test_n_km_club_validator(user, total_km_run):
+def test_n_km_club_threshold(user, total_km_run):
+	achievement_id = {km: _id for _id, km in KM_CLUB.thresholds.items()}[total_km_run]
 	user.total_m_run = total_km_run * 1000 - 1
 	user.save()
-	assert n_km_club(km_club_amount=total_km_run)(user=user) is False
+	assert achievement_id not in THRESHOLD_INDEX.reached(AchievementContext.build(user))
 	user.total_m_run = total_km_run * 1000
 	user.save()
-	assert n_km_club(km_club_amount=total_km_run)(user=user) is True
+	assert achievement_id in THRESHOLD_INDEX.reached(AchievementContext.build(user))
+
+
+@pytest.mark.parametrize("day_number", (1, 3, 29, 30, 50, 99, 100))
+@pytest.mark.django_db
+def test_goblet_threshold(user, history, day_number):
+	history.training_day = Day.objects.get(day_number=day_number)
+	history.save()
+	expected = {_id for _id, amount in GOBLET.thresholds.items() if amount <= day_number}
+	reached = THRESHOLD_INDEX.reached(AchievementContext.build(user, history))
+	assert reached & set(GOBLET.thresholds) == expected
 
 
 @pytest.mark.django_db
@@ -100,7 +121,7 @@ def test_all_goblet_achievements_are_received_on_last_training(history, history_
 def test_user_1_cities_per_training(user, history):
 	user.last_completed_training = history
 	user.save()
-	assert traveler(user) is False
+	assert traveler(AchievementContext.build(user)) is False
 
 
 @pytest.mark.django_db
@@ -109,14 +130,14 @@ def test_user_3_cities_per_training(user, history):
 	history.save()
 	user.last_completed_training = history
 	user.save()
-	assert traveler(user, history) is True
+	assert traveler(AchievementContext.build(user, history)) is True
 
 
 @pytest.mark.django_db
 def test_tourist_one_history(user, history_first):
 	user.last_completed_training = history_first
 	user.save()
-	assert not tourist(user, history_first)
+	assert not tourist(AchievementContext.build(user, history_first))
 
 
 @pytest.mark.django_db
@@ -127,29 +148,29 @@ def test_tourist_two_history_completed(user, history, history_first):
 	history_first.save()
 	user.last_completed_training = history
 	user.save()
-	assert tourist(user, history)
+	assert tourist(AchievementContext.build(user, history))
 	history.cities = ["St. Petersburg"]
 	history.save()
 	history_first.cities = ["Tula"]
 	history_first.save()
-	assert tourist(user, history)
+	assert tourist(AchievementContext.build(user, history))
 	history.cities = ["St. Petersburg", "Tula"]
 	history.save()
 	history_first.cities = ["St. Petersburg", "Moscow"]
 	history_first.save()
-	assert tourist(user, history)
+	assert tourist(AchievementContext.build(user, history))
 
 
 @pytest.mark.django_db
 def test_tourist_two_history_not_completed(user, history, history_first):
 	user.last_completed_training = history
 	user.save()
-	assert not tourist(user, history)
+	assert not tourist(AchievementContext.build(user, history))
 	history.cities = ["St. Petersburg"]
 	history.save()
 	history_first.cities = ["St. Petersburg", "Moscow"]
 	history_first.save()
-	assert not tourist(user, history)
+	assert not tourist(AchievementContext.build(user, history))
 
 
 @pytest.mark.django_db
@@ -167,12 +188,59 @@ def test_query_returns_correct_achievements(history, user, load_achievement_fixt
 	updater._query_unfinished_achievements()
 	assert len(updater.unfinished_achievements) == len(Achievement.objects.all()) - len(IOS_ACHIEVEMENTS)
 	for ios_achievement_id in IOS_ACHIEVEMENTS:
-		assert Achievement.objects.get(id=ios_achievement_id) not in updater.unfinished_achievements
+		assert ios_achievement_id not in updater.unfinished_achievements
 	UserAchievement.objects.create(user_id=user, achievement_id=achievement_by_id(19))  # штормбрейкер recurring_ios
 	UserAchievement.objects.create(user_id=user, achievement_id=achievement_by_id(2))  # машина recurring_non_ios
 	UserAchievement.objects.create(user_id=user, achievement_id=achievement_by_id(20))  # пионер single_ios
 	UserAchievement.objects.create(user_id=user, achievement_id=achievement_by_id(3))  # экватор single_non_ios
 	updater._query_unfinished_achievements()
-	assert Achievement.objects.get(id=3) not in updater.unfinished_achievements
-	assert Achievement.objects.get(id=2) in updater.unfinished_achievements
+	assert 3 not in updater.unfinished_achievements
+	assert 2 in updater.unfinished_achievements
 	assert len(updater.unfinished_achievements) == len(Achievement.objects.all()) - len(IOS_ACHIEVEMENTS) - 1
+
+
+@pytest.mark.django_db
+def test_context_is_built_with_fixed_number_of_queries(user, history, history_first, django_assert_num_queries):
+	with django_assert_num_queries(2):
+		context = AchievementContext.build(user, history)
+	assert context.day_number == 50
+	assert context.first_training_cities == frozenset(["St. Petersburg"])
+	assert context.count_training_current_week == 1
+	with django_assert_num_queries(0):
+		AchievementContext.build(user, history_first)
+
+
+@pytest.mark.django_db
+def test_achievement_catalog_is_served_from_memory(load_achievement_fixtures, django_assert_num_queries):
+	catalog = get_achievement_catalog()
+	assert len(catalog) == Achievement.objects.count()
+	assert catalog[1].recurring is True
+	assert catalog[1].reward_points == 2
+	with pytest.raises(TypeError):
+		catalog[1] = None
+	with django_assert_num_queries(0):
+		get_achievement_catalog()
+
+
+@pytest.mark.django_db
+def test_achievement_catalog_is_invalidated_on_achievement_save(
+	load_achievement_fixtures, django_capture_on_commit_callbacks
+):
+	get_achievement_catalog()
+	achievement = Achievement.objects.get(id=1)
+	achievement.title = "Новое название"
+	with django_capture_on_commit_callbacks(execute=True):
+		achievement.save()
+	assert get_achievement_catalog()[1].title == "Новое название"
+
+
+@pytest.mark.django_db
+def test_update_achievements_queries_do_not_depend_on_catalog_size(
+	history, user, load_achievement_fixtures, django_assert_max_num_queries
+):
+	user.last_completed_training = history
+	user.save()
+	updater = AchievementUpdater(user, [26, 27], history)
+	with django_assert_max_num_queries(8):
+		updater.update_achievements()
+	assert {achievement.id for achievement in updater.new_achievements} >= {3, 26, 27}
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+
+from utils.localization import Localizer, get_localizer, get_timezone
+
+User = get_user_model()
+MOMENT = datetime(2024, 3, 30, 22, 30, tzinfo=pytz.utc)
+
+
+def test_timezone_is_cached():
+	assert get_timezone("Europe/Moscow") is get_timezone("Europe/Moscow") is pytz.timezone("Europe/Moscow")
+
+
+def test_format_pair_matches_separate_conversions():
+	timezone = pytz.timezone("America/Los_Angeles")
+	assert Localizer("America/Los_Angeles").format_pair(MOMENT, "%d.%m.%Y", "%d.%m.%Y - %H:%M") == [
+		MOMENT.astimezone(timezone).strftime("%d.%m.%Y"),
+		MOMENT.astimezone(timezone).strftime("%d.%m.%Y - %H:%M"),
+	]
+	assert Localizer("Europe/Moscow").format(MOMENT, "%d.%m.%Y - %H:%M") == "31.03.2024 - 01:30"
+
+
+def test_localizer_is_request_scoped():
+	user = User(timezone="Europe/Moscow")
+	request = RequestFactory().get("/")
+	request.user = user
+	localizer = get_localizer(request)
+	assert get_localizer(request) is localizer
+	assert localizer.localize(MOMENT).utcoffset().total_seconds() == 3 * 3600
+	user.timezone = "Asia/Kamchatka"
+	assert get_localizer(request).format(MOMENT, "%H:%M") == "10:30"
@@ -0,0 +1,143 @@
+from io import BytesIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, storages
+from django.urls import reverse
+from PIL import Image
+
+from api.v1.serializers import MeSerializer
+from users.models import User
+from utils.media_offload import needs_offload, offload
+from utils.renditions import needs_update, update_renditions
+
+
+@pytest.fixture(autouse=True)
+def staged_storages(settings, tmp_path):
+	"""Удалённое хранилище подменяется локальным каталогом со своим url."""
+	settings.MEDIA_ROOT = tmp_path / "local"
+	settings.STORAGES = {
+		**settings.STORAGES,
+		"default": {
+			"BACKEND": "config.staged_storage.StagedMediaStorage",
+		},
+		"remote": {
+			"BACKEND": "django.core.files.storage.FileSystemStorage",
+			"OPTIONS": {"location": tmp_path / "remote", "base_url": "https://s3.test/media/"},
+		},
+	}
+	return tmp_path
+
+
+def make_image() -> ContentFile:
+	buffer = BytesIO()
+	Image.new("RGB", (64, 64), "red").save(buffer, "PNG")
+	return ContentFile(buffer.getvalue())
+
+
+@pytest.mark.django_db
+def test_upload_is_staged_locally(user, staged_storages):
+	user.avatar.save("avatar.png", make_image())
+	assert user.avatar.name == "staged/avatars/avatar.png"
+	assert (staged_storages / "local" / "staged/avatars/avatar.png").exists()
+	assert not (staged_storages / "remote").exists()
+	assert user.avatar.url == "/media/staged/avatars/avatar.png"
+	assert needs_offload(user)
+	assert not needs_update(user)
+
+
+@pytest.mark.django_db
+def test_offload_moves_file_and_swaps_path(user, staged_storages):
+	user.avatar.save("avatar.png", make_image())
+	assert offload("users.User", user.pk) == "avatars/avatar.png"
+	user.refresh_from_db()
+	assert user.avatar.name == "avatars/avatar.png"
+	assert user.avatar.url == "https://s3.test/media/avatars/avatar.png"
+	assert (staged_storages / "remote" / "avatars/avatar.png").read_bytes() == make_image().read()
+	assert not (staged_storages / "local" / "staged/avatars/avatar.png").exists()
+	assert not needs_offload(user)
+	assert offload("users.User", user.pk) is None
+
+
+@pytest.mark.django_db
+def test_offload_of_replaced_image_is_discarded(user, staged_storages):
+	user.avatar.save("avatar.png", make_image())
+	save = storages["remote"].save
+
+	def replace_avatar(name, content):
+		remote_name = save(name, content)
+		user.avatar.save("new_avatar.png", make_image())
+		return remote_name
+
+	with patch.object(storages["remote"], "save", replace_avatar):
+		assert offload("users.User", user.pk) is None
+	user.refresh_from_db()
+	assert user.avatar.name == "staged/avatars/new_avatar.png"
+	assert not default_storage.exists("avatars/avatar.png")
+
+
+@pytest.mark.django_db
+def test_stale_user_save_keeps_offloaded_path(user, staged_storages):
+	user.avatar.save("avatar.png", make_image())
+	offload("users.User", user.pk)
+	request = SimpleNamespace(user=user)
+	serializer = MeSerializer(user, data={"name": "Tester Jane"}, partial=True, context={"request": request})
+	assert serializer.is_valid(), serializer.errors
+	serializer.save()
+	user.refresh_from_db()
+	assert user.name == "Tester Jane"
+	assert user.avatar.name == "avatars/avatar.png"
+
+
+@pytest.mark.django_db
+def test_offload_restores_remote_path_when_local_file_is_gone(user, staged_storages):
+	user.avatar.save("avatar.png", make_image())
+	offload("users.User", user.pk)
+	User.objects.filter(pk=user.pk).update(avatar="staged/avatars/avatar.png")
+	assert offload("users.User", user.pk) == "avatars/avatar.png"
+	user.refresh_from_db()
+	assert user.avatar.name == "avatars/avatar.png"
+	assert (staged_storages / "remote" / "avatars/avatar.png").exists()
+
+
+@pytest.mark.django_db
+def test_offload_without_any_copy_keeps_path(user, staged_storages):
+	User.objects.filter(pk=user.pk).update(avatar="staged/avatars/missing.png")
+	assert offload("users.User", user.pk) is None
+	user.refresh_from_db()
+	assert user.avatar.name == "staged/avatars/missing.png"
+
+
+@pytest.mark.django_db
+def test_renditions_are_built_in_remote_storage_after_offload(user, staged_storages):
+	user.avatar.save("avatar.png", make_image())
+	assert update_renditions("users.User", user.pk) is None
+	offload("users.User", user.pk)
+	renditions = update_renditions("users.User", user.pk)
+	assert renditions["thumbnail"] == "avatars/avatar_thumbnail.webp"
+	assert (staged_storages / "remote" / renditions["thumbnail"]).exists()
+
+
+@pytest.mark.django_db
+def test_offload_and_renditions_are_scheduled(user, django_capture_on_commit_callbacks):
+	with (
+		patch("api.v1.tasks.offload_media.delay") as offload_delay,
+		patch("api.v1.tasks.generate_renditions.delay") as renditions_delay,
+	):
+		with django_capture_on_commit_callbacks(execute=True):
+			user.avatar.save("avatar.png", make_image())
+		offload_delay.assert_called_once_with("users.User", user.pk)
+		renditions_delay.assert_not_called()
+		with django_capture_on_commit_callbacks(execute=True):
+			offload("users.User", user.pk)
+		renditions_delay.assert_called_once_with("users.User", user.pk)
+
+
+@pytest.mark.django_db
+def test_me_returns_local_url_until_offloaded(user, user_client):
+	user.avatar.save("avatar.png", make_image())
+	assert user_client.get(reverse("me")).data["avatar"] == "http://testserver/media/staged/avatars/avatar.png"
+	offload("users.User", user.pk)
+	assert user_client.get(reverse("me")).data["avatar"] == "https://s3.test/media/avatars/avatar.png"
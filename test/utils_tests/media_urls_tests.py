@@ -0,0 +1,78 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.test import RequestFactory
+from django.urls import reverse
+
+from utils.media_urls import PrefixURLBuilder, StorageURLBuilder, get_url_builder, get_url_prefix
+
+
+class SignedStorage(FileSystemStorage):
+	def url(self, name):
+		return f"https://s3.test/{name}?signature=secret"
+
+
+@pytest.fixture
+def request_():
+	return RequestFactory().get("/", HTTP_HOST="testserver")
+
+
+def test_url_prefix_matches_storage_url(request_):
+	storage = FileSystemStorage(base_url="/media/")
+	builder = PrefixURLBuilder(request_)
+	for name in ("avatars/1.png", "history_images/пробег 1.png"):
+		assert builder.build(storage, name) == request_.build_absolute_uri(storage.url(name))
+
+
+def test_url_prefix_is_cached_per_host(settings):
+	settings.ALLOWED_HOSTS = ["one.test", "two.test"]
+	storage = FileSystemStorage(base_url="/media/")
+	with patch.object(storage, "url", wraps=storage.url) as url:
+		for host in ("one.test", "two.test", "one.test"):
+			request = RequestFactory().get("/", HTTP_HOST=host)
+			assert PrefixURLBuilder(request).build(storage, "a.png") == f"http://{host}/media/a.png"
+	assert url.call_count == 2
+
+
+def test_signed_urls_fall_back_to_storage(request_):
+	storage = SignedStorage()
+	assert get_url_prefix(storage) is None
+	assert PrefixURLBuilder(request_).build(storage, "a.png") == "https://s3.test/a.png?signature=secret"
+
+
+def test_url_builder_is_pluggable(request_, settings):
+	settings.MEDIA_URL_BUILDER = "utils.media_urls.StorageURLBuilder"
+	builder = get_url_builder(request_)
+	assert type(builder) is StorageURLBuilder
+	assert get_url_builder(request_) is builder
+
+
+def test_url_prefix_is_resolved_once_per_request(request_):
+	storage = FileSystemStorage(base_url="/media/")
+	builder = PrefixURLBuilder(request_)
+	with patch.object(storage, "url", wraps=storage.url) as url:
+		urls = [builder.build(storage, f"history_images/{i}.png") for i in range(100)]
+	assert url.call_count == 1
+	assert urls[99] == "http://testserver/media/history_images/99.png"
+
+
+@pytest.mark.django_db
+def test_achievement_list_resolves_storage_url_once(user_client, achievements):
+	for achievement in achievements:
+		achievement.icon = f"achievement_icons/{achievement.id}.png"
+		achievement.save()
+	default_storage._setup()
+	with patch.object(type(default_storage._wrapped), "url", autospec=True, side_effect=FileSystemStorage.url) as url:
+		response = user_client.get(reverse("achievements"))
+	assert url.call_count <= 1
+	assert sorted(item["icon"] for item in response.data) == [
+		f"http://testserver/media/achievement_icons/{achievement.id}.png" for achievement in achievements
+	]
+
+
+@pytest.mark.django_db
+def test_me_avatar_url_is_unchanged(user, user_client):
+	user.avatar = "avatars/avatar.png"
+	user.save()
+	assert user_client.get(reverse("me")).data["avatar"] == "http://testserver/media/avatars/avatar.png"
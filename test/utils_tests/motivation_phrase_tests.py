@@ -1,14 +1,19 @@
+import threading
 from datetime import timedelta
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import connection, transaction
 from django.utils import timezone
 from freezegun import freeze_time
 
 from backend.utils.motivation_phrase import (
 	get_count_training_last_week,
 	get_dynamic_list_motivation_phrase,
+	get_phrase_set,
+	get_phrase_table,
 	get_phrases,
+	get_rest_days,
 	get_rest_phrases_to_replace,
 	replaces_phrases,
 )
@@ -287,3 +292,88 @@ def test_get_phrases():
 	motivational_phrases = list(MotivationalPhrase.objects.filter(rest=False).values_list("text", flat=True))
 	rest_phrases = list(MotivationalPhrase.objects.filter(rest=True).values_list("text", flat=True))
 	assert (motivational_phrases, rest_phrases) == get_phrases()
+
+
+@pytest.mark.django_db
+def test_phrase_table_is_served_from_memory(django_assert_num_queries):
+	get_phrase_table()
+	with django_assert_num_queries(0):
+		motivational_phrases, rest_phrases = get_phrase_table()
+	assert isinstance(motivational_phrases, tuple)
+	assert isinstance(rest_phrases, tuple)
+
+
+@pytest.mark.django_db
+def test_phrase_table_is_invalidated_on_phrase_save(django_capture_on_commit_callbacks):
+	get_phrase_table()
+	with django_capture_on_commit_callbacks(execute=True):
+		MotivationalPhrase.objects.create(text="Новая фраза отдыха", rest=True)
+	assert get_phrase_table()[1][-1] == "Новая фраза отдыха"
+
+
+@pytest.mark.django_db
+def test_phrase_set_contains_all_phrases(django_assert_num_queries):
+	motivational_phrases, rest_phrases = get_phrase_table()
+	with django_assert_num_queries(0):
+		phrases = get_phrase_set()
+	assert phrases == set(motivational_phrases) | set(rest_phrases)
+	assert get_phrase_set() is phrases
+
+
+@pytest.mark.django_db
+def test_phrase_set_is_invalidated_on_phrase_save(django_capture_on_commit_callbacks):
+	assert "Новая фраза" not in get_phrase_set()
+	with django_capture_on_commit_callbacks(execute=True):
+		MotivationalPhrase.objects.create(text="Новая фраза")
+	assert "Новая фраза" in get_phrase_set()
+
+
+def read_in_other_connection(func) -> None:
+	"""Выполняет чтение в отдельном потоке со своим соединением, как параллельный запрос."""
+
+	def run() -> None:
+		try:
+			func()
+		finally:
+			connection.close()
+
+	thread = threading.Thread(target=run)
+	thread.start()
+	thread.join()
+
+
+@pytest.mark.django_db
+def test_phrase_set_is_not_stale_after_concurrent_read(django_capture_on_commit_callbacks):
+	get_phrase_set()
+	with django_capture_on_commit_callbacks(execute=True):
+		with transaction.atomic():
+			MotivationalPhrase.objects.create(text="Новая фраза")
+			# Параллельный запрос не видит незафиксированную фразу и кэширует прежний набор.
+			read_in_other_connection(get_phrase_set)
+	assert "Новая фраза" in get_phrase_set()
+
+
+@pytest.mark.django_db
+def test_get_phrases_returns_copies():
+	motivational_phrases, _ = get_phrases()
+	motivational_phrases[0] = "Изменённая фраза"
+	assert get_phrase_table()[0][0] != "Изменённая фраза"
+
+
+@pytest.mark.parametrize(
+	"args, days_to_replace",
+	(
+		((10, 3, 0, 6), ()),
+		((10, 4, 0, 6), (12, 15)),
+		((10, 4, 3, 6), (12,)),
+		((10, 4, 6, 6), ()),
+		((10, 5, 0, 3), (10, 12, 14)),
+		((10, 7, 0, 3), (10, 12, 14)),
+		((10, 5, 0, 6), (11, 13, 15)),
+		((10, 5, 1, 3), (11, 13)),
+		((10, 5, 4, 3), (10,)),
+		((10, 5, 5, 3), ()),
+	),
+)
+def test_get_rest_days(args, days_to_replace):
+	assert get_rest_days(*args) == days_to_replace
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+from django.db import IntegrityError, connection
+from django.db.models import Max
+
+from running.models import Day, History, MotivationalPhrase, UserAchievement
+from users.models import User
+
+USERS = 100
+DAYS = 10
+
+
+@pytest.fixture
+def seeded(achievements):
+	"""Набор данных, на котором планировщику есть из чего выбирать: USERS пользователей по DAYS тренировок."""
+	users = User.objects.bulk_create(User(email=f"user{index}@test.ru", name="Tester") for index in range(USERS))
+	days = list(Day.objects.filter(day_number__lte=DAYS).order_by("day_number"))
+	start = datetime(2024, 10, 1, 10, tzinfo=pytz.utc)
+	History.objects.bulk_create(
+		History(
+			user_id=user,
+			training_start=start + timedelta(days=day.day_number),
+			training_end=start + timedelta(days=day.day_number, hours=1),
+			training_day=day,
+			motivation_phrase="Тестовая фраза",
+			cities=["Moscow"],
+			distance=1000,
+			max_speed=10,
+			avg_speed=5,
+			height_difference=1,
+		)
+		for user in users
+		for day in days
+	)
+	UserAchievement.objects.bulk_create(
+		UserAchievement(user_id=user, achievement_id=achievement) for user in users for achievement in achievements
+	)
+	with connection.cursor() as cursor:
+		for model in (History, UserAchievement, MotivationalPhrase):
+			cursor.execute(f"ANALYZE {model._meta.db_table}")
+		# Без последовательного чтения планировщик берёт индекс, если он подходит под запрос.
+		cursor.execute("SET LOCAL enable_seqscan = off")
+	return users
+
+
+def assert_uses_index(queryset, index_name: str) -> None:
+	plan = queryset.explain()
+	assert "Seq Scan" not in plan, plan
+	assert index_name in plan, plan
+
+
+@pytest.mark.django_db
+def test_history_week_count_uses_index(seeded):
+	week_start = datetime(2024, 10, 7, tzinfo=pytz.utc)
+	queryset = History.objects.filter(
+		user_id=seeded[0], training_start__gte=week_start, training_start__lt=week_start + timedelta(weeks=1)
+	)
+	assert_uses_index(queryset, "history_user_start_idx")
+
+
+@pytest.mark.django_db
+def test_history_day_lookup_uses_unique_constraint(seeded):
+	queryset = History.objects.filter(user_id=seeded[0], training_day=Day.objects.get(day_number=5))
+	assert_uses_index(queryset, "unique_user_training_day")
+
+
+@pytest.mark.django_db
+def test_user_achievement_lookup_uses_index(seeded, achievements):
+	queryset = UserAchievement.objects.filter(user_id=seeded[0], achievement_id=achievements[0])
+	assert_uses_index(queryset, "userachievement_user_ach_idx")
+
+
+@pytest.mark.django_db
+def test_user_achievement_dates_use_index(seeded):
+	queryset = (
+		UserAchievement.objects.filter(user_id=seeded[0])
+		.values("achievement_id")
+		.annotate(last_date=Max("achievement_date"))
+		.order_by()
+	)
+	assert_uses_index(queryset, "userachievement_user_ach_idx")
+
+
+@pytest.mark.django_db
+def test_motivation_phrase_lookup_uses_hash_index(seeded):
+	assert_uses_index(MotivationalPhrase.objects.filter(text="Тестовая фраза"), "phrase_text_hash_idx")
+
+
+@pytest.mark.django_db
+def test_history_day_is_unique_per_user(seeded):
+	history = History.objects.filter(user_id=seeded[0]).first()
+	history.pk = None
+	with pytest.raises(IntegrityError, match="unique_user_training_day"):
+		history.save()
@@ -0,0 +1,176 @@
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+
+from running.models import Achievement
+from users.models import User
+from utils.achievements import get_achievement_catalog
+from utils.constants import IMAGE_RENDITIONS
+from utils.renditions import get_rendition_name, needs_update, render_renditions, update_renditions
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+	settings.MEDIA_ROOT = tmp_path
+	return tmp_path
+
+
+def make_image(size: tuple[int, int] = (2000, 1000), mode: str = "RGB", color="red") -> ContentFile:
+	buffer = BytesIO()
+	Image.new(mode, size, color).save(buffer, "PNG")
+	return ContentFile(buffer.getvalue(), name="image.png")
+
+
+def test_rendition_name_is_next_to_original():
+	assert get_rendition_name("history_images/1.png", "thumbnail") == "history_images/1_thumbnail.webp"
+
+
+@pytest.mark.django_db
+def test_avatar_renditions_are_generated(user):
+	user.avatar.save("avatar.png", make_image())
+	assert needs_update(user)
+	renditions = update_renditions("users.User", user.pk)
+	user.refresh_from_db()
+	assert user.avatar_renditions == renditions
+	assert renditions["source"] == user.avatar.name
+	assert not needs_update(user)
+	for rendition, size in IMAGE_RENDITIONS.items():
+		with default_storage.open(renditions[rendition]) as file, Image.open(file) as image:
+			assert image.format == "WEBP"
+			assert image.size == (size, size // 2)
+
+
+@pytest.mark.django_db
+def test_transparency_is_kept(user):
+	user.avatar.save("avatar.png", make_image(mode="RGBA", color=(255, 0, 0, 128)))
+	renditions = update_renditions("users.User", user.pk)
+	with default_storage.open(renditions["thumbnail"]) as file, Image.open(file) as image:
+		assert image.mode == "RGBA"
+
+
+@pytest.mark.django_db
+def test_up_to_date_renditions_are_not_rebuilt(user):
+	user.avatar.save("avatar.png", make_image())
+	update_renditions("users.User", user.pk)
+	assert update_renditions("users.User", user.pk) is None
+
+
+@pytest.mark.django_db
+def test_rebuild_overwrites_leftover_renditions(user):
+	user.avatar.save("avatar.png", make_image())
+	update_renditions("users.User", user.pk)
+	user.save()
+	user.refresh_from_db()
+	assert needs_update(user)
+	renditions = update_renditions("users.User", user.pk)
+	assert renditions["thumbnail"] == get_rendition_name(user.avatar.name, "thumbnail")
+
+
+@pytest.mark.django_db
+def test_previous_renditions_are_deleted_on_image_change(user):
+	user.avatar.save("avatar.png", make_image())
+	previous = update_renditions("users.User", user.pk)
+	user.refresh_from_db()
+	user.avatar.save("new_avatar.png", make_image())
+	update_renditions("users.User", user.pk)
+	assert not default_storage.exists(previous["thumbnail"])
+	assert default_storage.exists(previous["source"])
+
+
+@pytest.mark.django_db
+def test_renditions_of_replaced_image_are_discarded(user):
+	user.avatar.save("avatar.png", make_image())
+
+	def replace_avatar(file):
+		renditions = render_renditions(file)
+		user.avatar.save("new_avatar.png", make_image())
+		return renditions
+
+	with patch("utils.renditions.render_renditions", replace_avatar):
+		assert update_renditions("users.User", user.pk) is None
+	user.refresh_from_db()
+	assert user.avatar_renditions == {}
+	assert not default_storage.exists(get_rendition_name("avatars/avatar.png", "thumbnail"))
+
+
+@pytest.fixture
+def default_avatar_users(user):
+	default_storage.save("avatars/men.png", make_image())
+	other = User.objects.create(email="other@test.ru", name="Other")
+	User.objects.filter(pk__in=(user.pk, other.pk)).update(avatar="avatars/men.png")
+	return User.objects.get(pk=user.pk), other
+
+
+@pytest.mark.django_db
+def test_shared_avatar_reuses_renditions(default_avatar_users):
+	user, other = default_avatar_users
+	renditions = update_renditions("users.User", user.pk)
+	with patch("utils.renditions.render_renditions") as render:
+		assert update_renditions("users.User", other.pk) == renditions
+	render.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_shared_renditions_are_kept_while_referenced(default_avatar_users):
+	user, other = default_avatar_users
+	shared = update_renditions("users.User", user.pk)
+	update_renditions("users.User", other.pk)
+	user.refresh_from_db()
+	user.avatar.save("avatar.png", make_image())
+	update_renditions("users.User", user.pk)
+	assert default_storage.exists(shared["thumbnail"])
+	assert default_storage.exists(shared["detail"])
+	other.refresh_from_db()
+	other.avatar.save("avatar.png", make_image())
+	update_renditions("users.User", other.pk)
+	assert not default_storage.exists(shared["thumbnail"])
+	assert not default_storage.exists(shared["detail"])
+	assert default_storage.exists("avatars/men.png")
+
+
+@pytest.mark.django_db
+def test_renditions_are_scheduled_after_image_change(user, django_capture_on_commit_callbacks):
+	with patch("api.v1.tasks.generate_renditions.delay") as delay:
+		with django_capture_on_commit_callbacks(execute=True):
+			user.name = "Без смены аватара"
+			user.save()
+		delay.assert_not_called()
+		with django_capture_on_commit_callbacks(execute=True):
+			user.avatar.save("avatar.png", make_image())
+		delay.assert_called_once_with("users.User", user.pk)
+
+
+@pytest.mark.django_db
+def test_achievement_catalog_gets_icon_renditions(achievements, django_capture_on_commit_callbacks):
+	achievements[0].icon.save("icon.png", make_image())
+	get_achievement_catalog()
+	with django_capture_on_commit_callbacks(execute=True):
+		update_renditions("running.Achievement", achievements[0].pk)
+	assert get_achievement_catalog()[1].icon_renditions["thumbnail"].endswith("_thumbnail.webp")
+
+
+@pytest.mark.django_db
+def test_management_command_backfills_renditions(user, achievements):
+	user.avatar.save("avatar.png", make_image())
+	achievements[0].icon.save("icon.png", make_image())
+	call_command("generate_renditions")
+	user.refresh_from_db()
+	assert not needs_update(user)
+	assert not needs_update(Achievement.objects.get(pk=1))
+
+
+@pytest.mark.django_db
+def test_me_exposes_rendition_urls(user, user_client):
+	response = user_client.get(reverse("me"))
+	assert response.data["avatar_thumbnail"] is None
+	user.avatar.save("avatar.png", make_image())
+	update_renditions("users.User", user.pk)
+	response = user_client.get(reverse("me"))
+	assert response.data["avatar_thumbnail"].endswith("/media/avatars/avatar_thumbnail.webp")
+	assert response.data["avatar_detail"].endswith("/media/avatars/avatar_detail.webp")
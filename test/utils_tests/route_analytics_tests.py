@@ -0,0 +1,127 @@
+import importlib.util
+import math
+from dataclasses import asdict
+
+import numpy as np
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+
+from config import settings as project_settings
+
+from running.models import Day, History
+from utils.route_analytics import analyze_route, analyze_routes, route_to_array
+from utils.routes import Route
+
+# Шаг по широте 1e-4 градуса, около 11.12 м.
+STEP_M = 6_371_008.8 * math.radians(1e-4)
+
+
+def straight_route(count: int, step: float = 1e-4, seconds: float = 1, climb: float = 0) -> list[list[float]]:
+	return [[55.75 + i * step, 37.61, 150 + i * climb, 1728657000 + i * seconds] for i in range(count)]
+
+
+def test_distance_speed_and_elevation():
+	metrics = analyze_route(Route.from_json(straight_route(61, climb=0.5)))
+	assert metrics.distance == pytest.approx(60 * STEP_M, rel=1e-6)
+	assert metrics.avg_speed == pytest.approx(STEP_M * 3.6, rel=1e-6)
+	assert metrics.max_speed == pytest.approx(STEP_M * 3.6, rel=1e-6)
+	assert metrics.height_difference == 30
+	assert metrics.moving_time == 60
+
+
+def test_stops_are_excluded_from_moving_time():
+	points = straight_route(31)
+	# Стоянка на 100 секунд в середине маршрута.
+	points = points[:16] + [[*points[15][:3], points[15][3] + 100]] + [[*p[:3], p[3] + 100] for p in points[16:]]
+	metrics = analyze_route(Route.from_json(points))
+	assert metrics.moving_time == 30
+	assert metrics.avg_speed == pytest.approx(STEP_M * 3.6, rel=1e-6)
+
+
+def test_max_speed_is_smoothed():
+	points = straight_route(61)
+	# Скачок GPS на одну точку не должен давать пиковую скорость.
+	points[30][0] += 1e-3
+	metrics = analyze_route(Route.from_json(points))
+	assert metrics.max_speed < 3 * STEP_M * 3.6
+
+
+def test_route_without_time_and_altitude():
+	metrics = analyze_route(Route.from_json([point[:2] for point in straight_route(11)]))
+	assert metrics.distance == pytest.approx(10 * STEP_M, rel=1e-6)
+	assert metrics.max_speed is metrics.avg_speed is metrics.height_difference is metrics.moving_time is None
+	assert metrics.as_history_fields() == {"distance": metrics.distance}
+
+
+def test_route_with_unordered_time_has_no_speeds():
+	points = straight_route(11)
+	points[5][3] -= 10
+	metrics = analyze_route(Route.from_json(points))
+	assert metrics.max_speed is None
+	assert metrics.height_difference == 0
+
+
+def test_batch_matches_single_routes():
+	routes = [
+		Route.from_json(straight_route(61, climb=0.5)),
+		Route.from_json(straight_route(1)),
+		Route.from_json(straight_route(100, step=2e-4, seconds=2, climb=-1)),
+		Route.from_json([point[:2] for point in straight_route(5)]),
+	]
+	batch = analyze_routes([route_to_array(route) for route in routes])
+	for metrics, route in zip(batch, routes):
+		assert asdict(metrics) == pytest.approx(asdict(analyze_route(route)))
+	assert batch[1].distance == 0
+	assert analyze_routes([]) == []
+	assert analyze_routes([np.empty((0, 4))])[0].distance == 0
+
+
+def create_history(user, day: int = 1, **fields) -> History:
+	return History.objects.create(
+		user_id=user,
+		training_start="2024-10-11 14:30:00+00:00",
+		training_end="2024-10-11 14:31:00+00:00",
+		training_day=Day.objects.get(day_number=day),
+		motivation_phrase="Тестовая фраза",
+		cities=["Moscow"],
+		distance=1000,
+		max_speed=100,
+		avg_speed=50,
+		height_difference=0,
+		**fields,
+	)
+
+
+@pytest.mark.django_db
+def test_recompute_route_metrics_command(user):
+	route = Route.from_json(straight_route(61, climb=0.5))
+	history = create_history(user, route_polyline=route.encode())
+	user.total_m_run = 1000
+	user.save()
+	call_command("recompute_route_metrics")
+	history.refresh_from_db()
+	assert history.distance == 1000
+	call_command("recompute_route_metrics", "--batch-size", "1", "--apply")
+	history.refresh_from_db()
+	user.refresh_from_db()
+	assert history.distance == pytest.approx(60 * STEP_M, rel=1e-4)
+	assert history.height_difference == 30
+	assert user.total_m_run == pytest.approx(history.distance)
+
+
+@pytest.mark.django_db
+def test_recompute_uses_route_json_next_to_lossy_polyline(user):
+	points = straight_route(61, climb=0.5)
+	# Полилиния, отличная от присланного маршрута, хранится вместе с ним, пересчёт идёт по исходному.
+	history = create_history(user, route=points, route_polyline=Route.from_json(points[:2]).encode())
+	call_command("recompute_route_metrics", "--apply")
+	history.refresh_from_db()
+	assert history.height_difference == 30
+
+
+def test_route_metrics_mode_is_validated(monkeypatch):
+	monkeypatch.setenv("ROUTE_METRICS_MODE", "fil")
+	spec = importlib.util.spec_from_file_location("config.settings_check", project_settings.__file__)
+	with pytest.raises(ImproperlyConfigured, match="ROUTE_METRICS_MODE"):
+		spec.loader.exec_module(importlib.util.module_from_spec(spec))
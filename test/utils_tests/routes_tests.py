@@ -0,0 +1,122 @@
+import importlib
+import json
+
+import pytest
+
+from utils.routes import Route, decode_polyline, encode_polyline
+
+migration = importlib.import_module("running.migrations.0014_history_route_polyline")
+
+GOOGLE_POINTS = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+GOOGLE_POLYLINE = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_encode_polyline_matches_google_format():
+	assert encode_polyline(GOOGLE_POINTS, (5, 5)) == GOOGLE_POLYLINE
+
+
+def test_decode_polyline_matches_google_format():
+	assert decode_polyline(GOOGLE_POLYLINE, (5, 5)) == GOOGLE_POINTS
+
+
+def test_truncated_polyline_is_rejected():
+	with pytest.raises(ValueError):
+		decode_polyline(GOOGLE_POLYLINE[:-1], (5, 5))
+
+
+@pytest.mark.parametrize(
+	"route",
+	(
+		[{"latitude": 55.75123, "longitude": 37.61756}, {"latitude": 55.75201, "longitude": 37.61802}],
+		[
+			{"latitude": 55.75123, "longitude": 37.61756, "altitude": 150.3, "timestamp": 1728657000.5},
+			{"latitude": 55.75201, "longitude": 37.61802, "altitude": 149.8, "timestamp": 1728657001.5},
+		],
+		[[55.75123, 37.61756], [-33.86785, 151.20732]],
+		[[55.75123, 37.61756, 150.3], [55.75201, 37.61802, -2.5]],
+		[{"latitude": 55.751234567, "longitude": 37.6, "altitude": 150, "timestamp": 1728657000123}],
+		[[55.75 + i * 1e-4, 37.61, 150.5 + i] for i in range(5)],
+	),
+)
+def test_route_round_trip(route):
+	encoded = Route.from_json(route).encode()
+	decoded = Route.decode(encoded).to_json()
+	# Сравнение JSON проверяет и тип чисел: 150 и 150.0 различаются.
+	assert json.dumps(decoded) == json.dumps(route)
+	assert migration.encode_route(route)[0] == encoded
+	assert migration.decode_route(encoded) == decoded
+
+
+def test_header_records_precisions():
+	route = [{"latitude": 55.7512, "longitude": 37.6, "altitude": 150.25, "timestamp": 1728657000}]
+	encoded = Route.from_json(route).encode()
+	assert encoded.startswith("1;dict;latitude:4,longitude:1,altitude:2,timestamp:int;")
+	assert Route.decode(encoded).points[0][3] == 1728657000
+	assert isinstance(Route.decode(encoded).points[0][3], int)
+
+
+@pytest.mark.parametrize(
+	"route, lossless",
+	(
+		([[55.75123, 37.61756, 150, 1728657000], [55.75201, 37.61802, 151, 1728657001]], True),
+		([[55.75 + i * 1e-4, 37.61] for i in range(5)], True),
+		([[55.75, 37.61, 150], [55.75, 37.61, 150.5]], False),
+		([[55.123456789012, 37.61]], False),
+		([[1e-12, 37.61]], False),
+		([[55.75, 37.61, 0.1 + 0.2]], False),
+	),
+)
+def test_lossless_encoding_is_detected(route, lossless):
+	assert Route.from_json(route).is_lossless() is lossless
+	assert migration.encode_route(route)[1] is lossless
+
+
+def test_unknown_format_version_is_rejected():
+	with pytest.raises(ValueError):
+		Route.decode("list;latitude,longitude;_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+
+
+@pytest.mark.parametrize(
+	"route",
+	(
+		None,
+		[],
+		{"points": []},
+		"55.75,37.61",
+		[{"lat": 55.75, "lng": 37.61}],
+		[{"latitude": 55.75, "longitude": 37.61, "speed": 3}],
+		[{"latitude": 55.75, "longitude": 37.61}, {"latitude": 55.75}],
+		[[55.75]],
+		[[55.75, 37.61], [55.75, 37.61, 150]],
+		[[55.75, "37.61"]],
+		[[True, False]],
+	),
+)
+def test_unknown_route_format_is_not_parsed(route):
+	assert Route.from_json(route) is None
+
+
+def test_route_is_compact():
+	route = [
+		{"latitude": 55.75 + i * 1e-4, "longitude": 37.61 + i * 1e-4, "timestamp": 1728657000 + i} for i in range(1000)
+	]
+	assert len(Route.from_json(route).encode()) < len(str(route)) / 10
+
+
+def test_simplify_keeps_corners_and_drops_collinear_points():
+	# Отрезок на север и отрезок на восток, по 11 точек с шагом около 11 м.
+	points = [[55.75 + i * 1e-4, 37.61] for i in range(11)] + [[55.751, 37.61 + i * 1e-4] for i in range(1, 11)]
+	route = Route.from_json(points).simplify(1)
+	assert route.to_json() == [[55.75, 37.61], [55.751, 37.61], [55.751, 37.611]]
+
+
+def test_simplify_keeps_deviations_above_tolerance():
+	# Отклонение средней точки около 11 м.
+	points = [[55.75, 37.61], [55.7501, 37.6105], [55.75, 37.611]]
+	assert len(Route.from_json(points).simplify(5).points) == 3
+	assert len(Route.from_json(points).simplify(20).points) == 2
+
+
+def test_zero_tolerance_keeps_route():
+	route = Route.from_json([[55.75, 37.61], [55.75, 37.61], [55.75, 37.61]])
+	assert route.simplify(0) is route
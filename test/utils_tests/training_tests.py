@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from running.models import Day, History
+from utils.training import TRAINING_CATALOG, get_completed_days, get_training_catalog, is_day_completed
+
+
+@pytest.mark.django_db
+def test_training_catalog_is_ordered_by_day_number():
+	catalog = get_training_catalog()
+	assert [day["day_number"] for day in catalog] == list(range(1, 101))
+	assert set(catalog[0]) == {"day_number", "workout", "workout_info"}
+
+
+@pytest.mark.django_db
+def test_training_catalog_is_served_from_memory(django_assert_num_queries):
+	get_training_catalog()
+	with django_assert_num_queries(0):
+		get_training_catalog()
+
+
+@pytest.mark.django_db
+def test_training_catalog_is_invalidated_on_day_save(django_capture_on_commit_callbacks):
+	get_training_catalog()
+	old_version = cache.get(TRAINING_CATALOG.version_key)
+	day = Day.objects.get(day_number=1)
+	day.workout_info = "Новое описание"
+	with django_capture_on_commit_callbacks(execute=True):
+		day.save()
+		assert cache.get(TRAINING_CATALOG.version_key) == old_version
+	assert cache.get(TRAINING_CATALOG.version_key) != old_version
+	assert get_training_catalog()[0]["workout_info"] == "Новое описание"
+
+
+@pytest.mark.django_db
+def test_training_catalog_is_reloaded_after_redis_flush(django_assert_num_queries):
+	get_training_catalog()
+	cache.clear()
+	with django_assert_num_queries(1):
+		get_training_catalog()
+
+
+@pytest.mark.django_db
+def test_completed_days_bitmap(user, django_assert_num_queries):
+	assert get_completed_days(user) == 0
+	for day_number in (1, 2, 100):
+		History.objects.create(
+			training_start=timezone.localtime() - timedelta(days=101 - day_number),
+			training_end=timezone.localtime() - timedelta(days=101 - day_number),
+			training_day=Day.objects.get(day_number=day_number),
+			motivation_phrase="Тестовая фраза",
+			cities=["Moscow"],
+			distance=1,
+			max_speed=1,
+			avg_speed=1,
+			height_difference=1,
+			user_id=user,
+		)
+	with django_assert_num_queries(1):
+		completed_days = get_completed_days(user)
+	assert [day for day in range(1, 101) if is_day_completed(completed_days, day)] == [1, 2, 100]
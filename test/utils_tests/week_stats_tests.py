@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+from freezegun import freeze_time
+
+from running.models import Day, History
+from utils import week_stats
+
+
+def create_history(user, training_start, day_number=1):
+	return History.objects.create(
+		training_start=training_start,
+		training_end=training_start + timedelta(hours=1),
+		training_day=Day.objects.get(day_number=day_number),
+		motivation_phrase="Тестовая фраза",
+		cities=["Moscow"],
+		distance=1,
+		max_speed=1,
+		avg_speed=1,
+		height_difference=1,
+		user_id=user,
+	)
+
+
+@pytest.mark.django_db
+@freeze_time("2024-03-06 12:00:00")
+def test_week_counter_is_cached(user, django_assert_num_queries):
+	create_history(user, timezone.localtime() - timedelta(days=1))
+	create_history(user, timezone.localtime() - timedelta(days=7), day_number=2)
+	with django_assert_num_queries(1):
+		assert week_stats.get_count_training_week(user) == 1
+	with django_assert_num_queries(0):
+		assert week_stats.get_count_training_week(user) == 1
+	assert week_stats.get_count_training_week(user, weeks_ago=1) == 1
+
+
+@pytest.mark.django_db
+@freeze_time("2024-03-06 12:00:00")
+def test_register_training_increments_counter(user, django_assert_num_queries, django_capture_on_commit_callbacks):
+	assert week_stats.get_count_training_week(user) == 0
+	with django_capture_on_commit_callbacks(execute=True):
+		history = create_history(user, timezone.localtime())
+		week_stats.register_training(user, history)
+	with django_assert_num_queries(0):
+		assert week_stats.get_count_training_week(user) == 1
+
+
+@pytest.mark.django_db
+@freeze_time("2024-03-06 12:00:00")
+def test_register_training_overwrites_stale_counter(
+	user, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+	"""Счётчик, посчитанный параллельным запросом до тренировки, не остаётся в кэше."""
+	with django_capture_on_commit_callbacks(execute=True):
+		history = create_history(user, timezone.localtime())
+		week_stats.register_training(user, history)
+		cache.set(week_stats._get_key(user, week_stats._get_current_week_start(user)), 0)
+	with django_assert_num_queries(0):
+		assert week_stats.get_count_training_week(user) == 1
+
+
+@pytest.mark.django_db
+@freeze_time("2024-03-06 12:00:00")
+def test_reset_drops_counters(user):
+	assert week_stats.get_count_training_week(user) == 0
+	create_history(user, timezone.localtime())
+	week_stats.reset(user)
+	assert week_stats.get_count_training_week(user) == 1
+
+
+@pytest.mark.django_db
+@freeze_time("2024-03-03 21:30:00")
+def test_week_respects_user_timezone(user):
+	"""В Москве уже понедельник новой недели, а в UTC ещё воскресенье."""
+	create_history(user, timezone.localtime() - timedelta(minutes=90))
+	assert week_stats.get_count_training_week(user) == 0
+	assert week_stats.get_count_training_week(user, weeks_ago=1) == 1
+	user.timezone = "UTC"
+	assert week_stats.get_count_training_week(user) == 1